@@ -0,0 +1,171 @@
+"""
+End-to-end benchmark of the generation pipeline against a local stub LLM server.
+
+Creates a synthetic repository, points the selected bot at the stub, runs `github_test_coverage.main()` in FULL mode
+(without the final push) and reports throughput, per-file latency, prompt size, peak RSS and wall time.
+
+    python benchmarks/run_benchmark.py --files 200 --languages py:3,java:1,js:1 --concurrency 8 \\
+        --latency 0.5 --tokens-per-second 200 --output results.json --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'src'))
+
+from stub_llm_server import StubLlmConfig, StubLlmServer
+from synthetic_repo import create_synthetic_repo
+
+# Metrics where a higher value is better; every other metric is better when lower
+HIGHER_IS_BETTER = {"files_per_minute"}
+COMPARED_METRICS = ["files_per_minute", "file_p50_seconds", "file_p95_seconds", "prompt_bytes", "peak_rss_mb",
+                    "wall_seconds"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bot", default="ollama", choices=["ollama", "gemini", "chatgpt"])
+    parser.add_argument("--files", type=int, default=50, help="source files in the synthetic repository")
+    parser.add_argument("--languages", default="py", help="language mix, e.g. py:3,java:1,js:1")
+    parser.add_argument("--functions-per-file", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4, help="MAX_CONCURRENCY of the run")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="stub streaming rate (0 = instant)")
+    parser.add_argument("--output-tokens", type=int, default=200, help="stub tokens per answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.0, help="Retry-After seconds of the 429 answers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra environment variable of the run, e.g. CACHE_DIR=/tmp/cache")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare the results with a previous --output file")
+    parser.add_argument("--max-regression", type=float, default=0.0,
+                        help="exit with 1 when a compared metric is worse than the baseline by more than this percent")
+    return parser.parse_args(argv)
+
+
+def run_benchmark(args) -> dict:
+    stub = StubLlmServer(StubLlmConfig(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                                       output_tokens=args.output_tokens, error_rate=args.error_rate,
+                                       rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+                                       seed=args.seed))
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="ai-test-benchmark-") as repo, stub:
+        create_synthetic_repo(repo, args.files, args.languages, args.functions_per_file, args.seed)
+        os.environ.update(pipeline_env(args, stub.url))
+
+        import github_test_coverage
+        from git import Git
+        from instrumentation import Instrumentation
+
+        # The benchmark measures generation only; nothing is committed or pushed
+        Git.push_changes_to_github = staticmethod(lambda *args, **kwargs: None)
+        os.chdir(repo)
+        started = time.perf_counter()
+        try:
+            github_test_coverage.main()
+        finally:
+            os.chdir(previous_cwd)
+        wall_seconds = time.perf_counter() - started
+
+        # A batched file takes as long as its whole batch
+        durations = sorted([span["duration"] for span in Instrumentation.spans("file")
+                            if span["attributes"]["path"].startswith("src/")] +
+                           [span["duration"] for span in Instrumentation.spans("batch")
+                            for _ in span["attributes"]["paths"]])
+        requests = Instrumentation.spans("llm.request")
+        return {
+            "bot": args.bot,
+            "files": len(durations),
+            "concurrency": args.concurrency,
+            "files_per_minute": round(len(durations) / wall_seconds * 60, 1) if wall_seconds else 0.0,
+            "file_p50_seconds": round(Instrumentation.percentile(durations, 50), 3),
+            "file_p95_seconds": round(Instrumentation.percentile(durations, 95), 3),
+            "llm_requests": len(requests),
+            "prompt_bytes": sum(span["attributes"].get("prompt_bytes", 0) for span in requests),
+            "prompt_tokens": sum(span["attributes"].get("prompt_tokens", 0) for span in requests),
+            "completion_tokens": sum(span["attributes"].get("completion_tokens", 0) for span in requests),
+            "stub_requests": stub.requests,
+            "stub_errors": stub.errors,
+            "stub_rate_limited": stub.rate_limited,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "wall_seconds": round(wall_seconds, 3),
+        }
+
+
+def pipeline_env(args, stub_url: str) -> dict:
+    env = {
+        "BOT": args.bot,
+        "LLM_URL": stub_url,
+        "LLM_KEY": "stub-key",
+        "LLM_MODEL": "stub-model",
+        "GITHUB_TOKEN": "stub-token",
+        "REPO_OWNER": "benchmark",
+        "REPO_NAME": "synthetic",
+        "BRANCH_NAME": "main",
+        "MASTER_BRANCH_NAME": "main",
+        "TARGET_EXTENSIONS": "py,java,js",
+        "BUILD_TOOL": "none",
+        "GENERATE_MODE": "FULL",
+        "SRC_PATH": "src",
+        "TEST_PATH": "tests",
+        "MAX_CONCURRENCY": str(args.concurrency),
+        "RUN_AFFECTED_TESTS": "false",
+    }
+    if args.bot == "gemini":
+        env["LLM_URL"] = f"{stub_url}/v1beta/models"
+    elif args.bot == "chatgpt":
+        env["OPENAI_BASE_URL"] = f"{stub_url}/v1"
+    for item in args.env:
+        name, _, value = item.partition("=")
+        env[name] = value
+    return env
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> bool:
+    """Prints the change of each metric against the baseline; returns False when one regressed beyond the limit."""
+    passed = True
+    print(f"{'metric':<20}{'baseline':>12}{'current':>12}{'change':>10}")
+    for metric in COMPARED_METRICS:
+        before, after = baseline.get(metric), results.get(metric)
+        if not before or after is None:
+            continue
+        change = (after - before) / before * 100
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        flag = ""
+        if max_regression and worse > max_regression:
+            flag = "  REGRESSION"
+            passed = False
+        print(f"{metric:<20}{before:>12g}{after:>12g}{change:>+9.1f}%{flag}")
+    return passed
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run_benchmark(args)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
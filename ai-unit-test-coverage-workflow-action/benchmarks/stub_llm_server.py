@@ -0,0 +1,253 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+
+UNIT_TEST_FILE_PATH = re.compile(r'Unit Test File Path[^\n]*:\n(\S+)')
+BATCH_MARKER = "<<<UNIT TEST FILE: "
+BATCH_END_MARKER = "<<<END UNIT TEST FILE>>>"
+
+# Characters streamed per chunk, roughly four tokens
+CHUNK_SIZE = 16
+
+
+class StubLlmConfig(NamedTuple):
+    """Behaviour of the stub: seconds before the first token, streamed tokens/sec (0 = instant), tokens per answer,
+    and the fraction of requests answered with a 500 or a 429."""
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    output_tokens: int = 200
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 0.0
+    seed: int = 0
+
+
+class StubLlmServer:
+    """
+    Local stand-in for the Ollama `/api/chat`, Gemini `:generateContent` / `:streamGenerateContent` and OpenAI
+    `/chat/completions` endpoints. Answers with a syntactically valid test file for the language of the requested
+    unit test file path, streamed at the configured rate.
+    """
+
+    def __init__(self, config: StubLlmConfig = StubLlmConfig(), host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.cached_contents = {}
+        self.__lock = threading.Lock()
+        self.__random = random.Random(config.seed)
+        self.__server = ThreadingHTTPServer((host, port), self.__handler_class())
+        self.__server.daemon_threads = True
+        self.__thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def draw_failure(self) -> int:
+        """Returns the status code of an injected failure for the next request, or 0."""
+        with self.__lock:
+            self.requests += 1
+            roll = self.__random.random()
+            if roll < self.config.rate_limit_rate:
+                self.rate_limited += 1
+                return 429
+            if roll < self.config.rate_limit_rate + self.config.error_rate:
+                self.errors += 1
+                return 500
+            return 0
+
+    def __handler_class(self):
+        server = self
+
+        class Handler(StubLlmHandler):
+            stub = server
+
+        return Handler
+
+
+class StubLlmHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stub: StubLlmServer = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        payload = json.loads(body or b'{}')
+
+        status = self.stub.draw_failure()
+        if status:
+            headers = {"Retry-After": str(self.stub.config.retry_after)} if status == 429 else {}
+            self.__send_json(status, {"error": {"message": "injected failure", "code": status}}, headers)
+            return
+
+        path = self.path.split('?')[0]
+        if path.endswith("/api/chat"):
+            self.__ollama(payload)
+        elif path.endswith(":streamGenerateContent"):
+            self.__gemini(payload, stream=True)
+        elif path.endswith(":generateContent"):
+            self.__gemini(payload, stream=False)
+        elif path.endswith("/chat/completions"):
+            self.__openai(payload)
+        elif path.endswith("/cachedContents"):
+            self.__gemini_cache(payload)
+        else:
+            self.__send_json(404, {"error": f"unknown endpoint {path}"})
+
+    def __ollama(self, payload):
+        prompt = "".join(message.get("content", "") for message in payload.get("messages", []))
+        text = generate_test_file(prompt, self.stub.config.output_tokens)
+        usage = {"prompt_eval_count": len(prompt) // 4, "eval_count": len(text) // 4}
+        if not payload.get("stream", True):
+            self.__send_json(200, {"message": {"role": "assistant", "content": text}, "done": True, **usage})
+            return
+        self.__start_stream("application/x-ndjson")
+        for chunk in self.__paced_chunks(text):
+            self.__write_chunk(json.dumps({"message": {"role": "assistant", "content": chunk}, "done": False}) + "\n")
+        self.__write_chunk(json.dumps({"message": {"role": "assistant", "content": ""}, "done": True, **usage}) + "\n")
+        self.__end_stream()
+
+    def __gemini(self, payload, stream: bool):
+        if payload.get("cachedContent") and payload["cachedContent"] not in self.stub.cached_contents:
+            # Like an expired cached content
+            self.__send_json(403, {"error": {"message": "CachedContent not found (or permission denied)", "code": 403}})
+            return
+        prompt = "".join(part.get("text", "") for content in payload.get("contents", [])
+                         for part in content.get("parts", []))
+        text = generate_test_file(prompt, self.stub.config.output_tokens)
+        cached = self.stub.cached_contents.get(payload.get("cachedContent"), "")
+        usage = {"promptTokenCount": (len(cached) + len(prompt)) // 4, "candidatesTokenCount": len(text) // 4}
+        if cached:
+            usage["cachedContentTokenCount"] = len(cached) // 4
+        if not stream:
+            self.__send_json(200, {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}],
+                                   "usageMetadata": usage})
+            return
+        self.__start_stream("text/event-stream")
+        for chunk in self.__paced_chunks(text):
+            event = {"candidates": [{"content": {"role": "model", "parts": [{"text": chunk}]}}]}
+            self.__write_chunk(f"data: {json.dumps(event)}\r\n\r\n")
+        event = {"candidates": [{"content": {"role": "model", "parts": [{"text": ""}]}, "finishReason": "STOP"}],
+                 "usageMetadata": usage}
+        self.__write_chunk(f"data: {json.dumps(event)}\r\n\r\n")
+        self.__end_stream()
+
+    def __gemini_cache(self, payload):
+        name = f"cachedContents/stub-{len(self.stub.cached_contents)}"
+        self.stub.cached_contents[name] = "".join(part.get("text", "") for content in payload.get("contents", [])
+                                                  for part in content.get("parts", []))
+        self.__send_json(200, {"name": name, "model": payload.get("model")})
+
+    def __openai(self, payload):
+        prompt = "".join(str(message.get("content", "")) for message in payload.get("messages", []))
+        text = generate_test_file(prompt, self.stub.config.output_tokens)
+        model = payload.get("model", "stub")
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4,
+                 "total_tokens": (len(prompt) + len(text)) // 4}
+        if not payload.get("stream"):
+            self.__send_json(200, {"id": "stub", "object": "chat.completion", "created": int(time.time()),
+                                   "model": model, "usage": usage,
+                                   "choices": [{"index": 0, "finish_reason": "stop",
+                                                "message": {"role": "assistant", "content": text}}]})
+            return
+        self.__start_stream("text/event-stream")
+        for chunk in self.__paced_chunks(text):
+            event = {"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+            self.__write_chunk(f"data: {json.dumps(event)}\n\n")
+        if payload.get("stream_options", {}).get("include_usage"):
+            event = {"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [], "usage": usage}
+            self.__write_chunk(f"data: {json.dumps(event)}\n\n")
+        self.__write_chunk("data: [DONE]\n\n")
+        self.__end_stream()
+
+    def __paced_chunks(self, text: str):
+        config = self.stub.config
+        if config.latency:
+            time.sleep(config.latency)
+        for start in range(0, len(text), CHUNK_SIZE):
+            if config.tokens_per_second:
+                time.sleep(CHUNK_SIZE / 4 / config.tokens_per_second)
+            yield text[start:start + CHUNK_SIZE]
+
+    def __send_json(self, status: int, body: dict, headers: dict = None):
+        if self.stub.config.latency and status == 200:
+            time.sleep(self.stub.config.latency)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def __start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def __write_chunk(self, text: str):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def __end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def generate_test_file(prompt: str, output_tokens: int) -> str:
+    """
+    Returns a valid test file of about output_tokens tokens for the language of the requested test file path,
+    or one delimited block per requested path for batched prompts.
+    """
+    paths = UNIT_TEST_FILE_PATH.findall(prompt)
+    if BATCH_MARKER in prompt:
+        return "".join(f"{BATCH_MARKER}{path}>>>\n{_test_file(path, output_tokens)}{BATCH_END_MARKER}\n"
+                       for path in paths)
+    return _test_file(paths[0] if paths else "test_generated.py", output_tokens)
+
+
+def _test_file(path: str, output_tokens: int) -> str:
+    filler_count = max(0, output_tokens * 4 // 40)
+
+    if path.endswith('.py'):
+        lines = ["import unittest", "", "", "class TestGenerated(unittest.TestCase):"]
+        lines += [f"    def test_case_{i}(self):\n        self.assertEqual({i} + 1, {i + 1})"
+                  for i in range(max(1, filler_count // 2))]
+        return "\n".join(lines) + "\n"
+    if path.endswith(('.js', '.ts')):
+        cases = [f"  test('case {i}', () => {{ expect({i} + 1).toBe({i + 1}); }});"
+                 for i in range(max(1, filler_count))]
+        return "describe('generated', () => {\n" + "\n".join(cases) + "\n});\n"
+    name = re.sub(r'\W', '', path.rsplit('/', 1)[-1].split('.')[0]) or "GeneratedTest"
+    cases = [f"    @Test\n    void case{i}() {{ assertEquals({i + 1}, {i} + 1); }}"
+             for i in range(max(1, filler_count // 2))]
+    return f"class {name} {{\n" + "\n".join(cases) + "\n}\n"
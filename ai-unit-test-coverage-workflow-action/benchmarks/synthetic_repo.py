@@ -0,0 +1,109 @@
+import os
+import random
+import subprocess
+from typing import Dict
+
+EXTENSIONS = {'py': '.py', 'java': '.java', 'js': '.js'}
+
+
+def parse_language_mix(mix: str) -> Dict[str, int]:
+    """Parses a mix like "py:3,java:1,js:1" into relative weights."""
+    weights = {}
+    for item in mix.split(','):
+        language, _, weight = item.strip().partition(':')
+        if language not in EXTENSIONS:
+            raise ValueError(f"Unsupported language {language}, expected one of {', '.join(EXTENSIONS)}")
+        weights[language] = int(weight or 1)
+    return weights
+
+
+def create_synthetic_repo(root: str, files: int, language_mix: str = "py", functions_per_file: int = 10,
+                          seed: int = 0) -> Dict[str, str]:
+    """
+    Creates a git repository under root with `files` source files in src/ and one test file per three source files
+    in tests/. Each file imports its predecessor of the same language and the first file of that language, so the
+    dependency graph has both chains and a widely shared module.
+    Returns the source files by path.
+    """
+    rng = random.Random(seed)
+    weights = parse_language_mix(language_mix)
+    languages = rng.choices(list(weights), weights=list(weights.values()), k=files)
+
+    sources = {}
+    previous = {}
+    first = {}
+    for index, language in enumerate(languages):
+        name = f"module{index}"
+        path, content = _source_file(language, name, previous.get(language), first.get(language),
+                                     functions_per_file, rng)
+        sources[path] = content
+        previous[language] = name
+        first.setdefault(language, name)
+        _write(root, path, content)
+        if index % 3 == 0:
+            test_path, test_content = _test_file(language, name)
+            _write(root, test_path, test_content)
+
+    git = ["git", "-c", "user.name=benchmark", "-c", "user.email=benchmark@example.com"]
+    subprocess.run(["git", "init", "-q", "-b", "main", root], check=True)
+    subprocess.run(git + ["-C", root, "add", "-A"], check=True)
+    subprocess.run(git + ["-C", root, "commit", "-q", "-m", "Synthetic benchmark repository"], check=True)
+    subprocess.run(["git", "-C", root, "remote", "add", "origin", root], check=True)
+    return sources
+
+
+def _source_file(language: str, name: str, previous: str, first: str, functions: int, rng: random.Random):
+    constants = [rng.randint(1, 100) for _ in range(functions)]
+    shared = first if first != previous else None
+    if language == 'py':
+        header = f"from src.{previous} import function_0 as previous_function\n" if previous else ""
+        header += f"from src.{shared} import function_1 as shared_function\n" if shared else ""
+        header += "\n\n" if header else ""
+        body = "\n\n".join(f"def function_{i}(value):\n"
+                           f"    if value > {constant}:\n"
+                           f"        return value - {constant}\n"
+                           f"    return value * {constant}\n"
+                           for i, constant in enumerate(constants))
+        return f"src/{name}.py", header + body
+    if language == 'java':
+        class_name = name.capitalize()
+        uses = f"    private final {previous.capitalize()} previous = new {previous.capitalize()}();\n" if previous else ""
+        uses += f"    private final {shared.capitalize()} shared = new {shared.capitalize()}();\n" if shared else ""
+        uses += "\n" if uses else ""
+        body = "\n".join(f"    public int function{i}(int value) {{\n"
+                         f"        if (value > {constant}) {{\n"
+                         f"            return value - {constant};\n"
+                         f"        }}\n"
+                         f"        return value * {constant};\n"
+                         f"    }}\n"
+                         for i, constant in enumerate(constants))
+        return f"src/{class_name}.java", f"package bench;\n\npublic class {class_name} {{\n{uses}{body}}}\n"
+    header = f"const previous = require('./{previous}');\n" if previous else ""
+    header += f"const shared = require('./{shared}');\n" if shared else ""
+    header += "\n" if header else ""
+    body = "\n".join(f"function function{i}(value) {{\n"
+                     f"  return value > {constant} ? value - {constant} : value * {constant};\n"
+                     f"}}\n"
+                     for i, constant in enumerate(constants))
+    exports = ", ".join(f"function{i}" for i in range(functions))
+    return f"src/{name}.js", f"{header}{body}\nmodule.exports = {{ {exports} }};\n"
+
+
+def _test_file(language: str, name: str):
+    if language == 'py':
+        return (f"tests/test_{name}.py",
+                f"from src.{name} import function_0\n\n\ndef test_function_0():\n    assert function_0(0) == 0\n")
+    if language == 'java':
+        class_name = name.capitalize()
+        return (f"tests/{class_name}Test.java",
+                f"package bench;\n\nclass {class_name}Test {{\n    @Test\n    void function0() {{ }}\n}}\n")
+    return (f"tests/{name}.test.js",
+            f"const {{ function0 }} = require('../src/{name}');\n\n"
+            f"test('function0', () => {{ expect(function0(0)).toBe(0); }});\n")
+
+
+def _write(root: str, path: str, content: str):
+    full_path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'w') as f:
+        f.write(content)
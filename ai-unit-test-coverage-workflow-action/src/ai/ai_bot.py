@@ -1,7 +1,15 @@
+import hashlib
 from abc import ABC, abstractmethod
+from typing import List
+from batching import BATCH_FILE_BEGIN, BATCH_FILE_END, BatchItem
+from instrumentation import Instrumentation
+
+PROMPT_PREFIX_END = "\n" + "=" * 70 + "\n"
 
 class AiBot(ABC):
 
+    # The prompts start with everything that is shared between the requests of a run (instructions, then the
+    # context), and the per-file parts follow PROMPT_PREFIX_END, so provider prefix caches can reuse the start.
     __test_generation_prompt = """
 You are an expert software engineer specializing in testing.
 Your task is to generate a comprehensive unit test suite for the given code.
@@ -15,6 +23,42 @@ If no unit test file is provided, you should create a new one from scratch.
 
 Relevant Source Files:
 {all_source_files}
+{prefix_end}
+Unit Test File Path (use this to generate the correct package name):
+{unit_test_file_path}
+
+Existing Unit Test File (if any):
+{unit_test}
+
+Additional Instructions (if any):
+{hints}
+
+Source Code:
+{code}
+"""
+
+    __batch_test_generation_prompt = """
+You are an expert software engineer specializing in testing.
+Your task is to generate a comprehensive unit test suite for each of the source files below.
+If an existing unit test file is provided, you should add or improve the tests in it.
+If no unit test file is provided, you should create a new one from scratch.
+
+- Analyze the provided code to understand its functionality, inputs, and outputs.
+- Create test cases that cover all execution paths, including edge cases and error conditions.
+- Ensure the generated tests are well-structured, readable, and follow best practices for the language.
+- Return the complete code of one unit test file per source file, each wrapped exactly like this:
+{begin}<unit test file path>>>>
+<complete code of the unit test file>
+{end}
+- Do not include anything outside these blocks: no explanations, introductory text, or markdown formatting.
+
+Relevant Source Files:
+{all_source_files}
+{files}
+"""
+
+    __batch_file_section = """{prefix_end}
+File {index} of {count}
 
 Unit Test File Path (use this to generate the correct package name):
 {unit_test_file_path}
@@ -22,19 +66,63 @@ Unit Test File Path (use this to generate the correct package name):
 Existing Unit Test File (if any):
 {unit_test}
 
+Additional Instructions (if any):
+{hints}
+
 Source Code:
 {code}
 """
 
+    def ai_generate_test_coverage(self, code, unit_test, all_source_files, unit_test_file_path, hints="") -> str:
+        with Instrumentation.span("prompt.build") as span:
+            prompt = AiBot.build_test_generation_prompt(code=code, unit_test=unit_test, all_source_files=all_source_files, unit_test_file_path=unit_test_file_path, hints=hints)
+            span["prompt_bytes"] = len(prompt)
+        return self.ai_complete(prompt)
+
+    def ai_generate_batch_test_coverage(self, items: List[BatchItem], all_source_files) -> str:
+        """Asks for the unit tests of several files in one request; split the answer with split_batch_response."""
+        with Instrumentation.span("prompt.build", files=len(items)) as span:
+            prompt = AiBot.build_batch_test_generation_prompt(items, all_source_files)
+            span["prompt_bytes"] = len(prompt)
+        return self.ai_complete(prompt)
+
     @abstractmethod
-    def ai_generate_test_coverage(self, code, unit_test, all_source_files, unit_test_file_path) -> str:
+    def ai_complete(self, prompt) -> str:
         pass
 
     @staticmethod
-    def build_test_generation_prompt(code, unit_test, all_source_files, unit_test_file_path) -> str:
+    def build_test_generation_prompt(code, unit_test, all_source_files, unit_test_file_path, hints="") -> str:
         return AiBot.__test_generation_prompt.format(
             unit_test=unit_test,
             code=code,
             all_source_files=all_source_files,
-            unit_test_file_path=unit_test_file_path
+            unit_test_file_path=unit_test_file_path,
+            hints=hints,
+            prefix_end=PROMPT_PREFIX_END
         )
+
+    @staticmethod
+    def build_batch_test_generation_prompt(items: List[BatchItem], all_source_files) -> str:
+        files = "".join(AiBot.__batch_file_section.format(index=index, count=len(items), prefix_end=PROMPT_PREFIX_END,
+                                                          **item._asdict())
+                        for index, item in enumerate(items, 1))
+        return AiBot.__batch_test_generation_prompt.format(
+            begin=BATCH_FILE_BEGIN,
+            end=BATCH_FILE_END,
+            all_source_files=all_source_files,
+            files=files
+        )
+
+    @staticmethod
+    def prompt_version() -> str:
+        """Short hash of the prompt templates, which changes whenever the instructions sent to the bots change."""
+        templates = (AiBot.__test_generation_prompt, AiBot.__batch_test_generation_prompt, AiBot.__batch_file_section)
+        return hashlib.sha1("".join(templates).encode('utf-8')).hexdigest()[:12]
+
+    @staticmethod
+    def split_prompt(prompt: str):
+        """Splits a prompt into the prefix shared between requests and the per-file rest."""
+        index = prompt.find(PROMPT_PREFIX_END)
+        if index < 0:
+            return "", prompt
+        return prompt[:index], prompt[index:]
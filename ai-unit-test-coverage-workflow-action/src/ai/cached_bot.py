@@ -0,0 +1,32 @@
+from ai.ai_bot import AiBot
+from ai.gemini_bot import NO_VALID_RESPONSE
+from ai.response_cache import ResponseCache
+
+class CachedBot(AiBot):
+    """
+    Wraps another bot and answers repeated prompts from a ResponseCache,
+    skipping the HTTP call entirely on a cache hit. Empty and placeholder answers are not cached.
+    """
+
+    def __init__(self, bot: AiBot, cache: ResponseCache, bot_type: str, model: str):
+        self.bot = bot
+        self.cache = cache
+        self.bot_type = bot_type
+        self.model = model
+
+    def ai_complete(self, prompt):
+        key = ResponseCache.make_key(self.bot_type, self.model, prompt)
+        response = self.cache.get(key)
+        # Placeholders cached by earlier versions are asked again
+        if CachedBot.__cacheable(response):
+            return response
+
+        response = self.bot.ai_complete(prompt)
+        if CachedBot.__cacheable(response):
+            self.cache.put(key, self.bot_type, self.model, response)
+        return response
+
+    @staticmethod
+    def __cacheable(response) -> bool:
+        # e.g. a temporary failure answered with Gemini's placeholder must not be served from the cache later
+        return bool(response and response.strip() and response != NO_VALID_RESPONSE)
@@ -1,26 +1,64 @@
-import os
+import hashlib
+import httpx
 from openai import OpenAI
 from ai.ai_bot import AiBot
+from ai.http_transport import HttpTransport
+from ai.stream_guard import StreamGuard
+from instrumentation import Instrumentation
+from tokens import estimate_tokens
 
 class ChatGPT(AiBot):
+    """
+    Streams chat completions. With a cache_ttl, requests whose prompt prefix has at least cache_min_tokens tokens carry
+    a prompt_cache_key and ask for the usage (and cached tokens) in the stream; otherwise only standard fields are sent,
+    for OpenAI-compatible servers that reject unknown ones.
+    """
 
-    def __init__(self, token, model):
+    def __init__(self, token, model, transport: HttpTransport = None, max_output_tokens=0, generation_timeout=0,
+                 cache_ttl=0, cache_min_tokens=1024):
         self.__chat_gpt_model = model
-        self.__client = OpenAI(api_key = token)
+        self.cache_ttl = cache_ttl
+        self.cache_min_tokens = cache_min_tokens
+        self.__max_output_tokens = max_output_tokens
+        self.__generation_timeout = generation_timeout
+        # The OpenAI SDK keeps its own pooled client; reuse the transport's retry, timeout and rate-limit settings
+        self.__transport = transport or HttpTransport()
+        connect_timeout, read_timeout = self.__transport.timeout
+        self.__client = OpenAI(api_key = token, max_retries=self.__transport.max_retries,
+                               timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
 
-    def ai_generate_test_coverage(self, code, unit_test, all_source_files, unit_test_file_path):
-        stream = self.__client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": AiBot.build_test_generation_prompt(code=code, unit_test=unit_test, all_source_files=all_source_files, unit_test_file_path=unit_test_file_path),
-                }
-            ],
-            model=self.__chat_gpt_model,
-            stream=True,
-        )
-        content = []
-        for chunk in stream:
-            if chunk.choices[0].delta.content:
-                content.append(chunk.choices[0].delta.content)
-        return "".join(content)
+    def ai_complete(self, prompt):
+        self.__transport.rate_limiter.acquire(estimate_tokens(prompt))
+        options = {"max_tokens": self.__max_output_tokens} if self.__max_output_tokens else {}
+        prefix, _ = AiBot.split_prompt(prompt)
+        if self.cache_ttl and prefix and estimate_tokens(prefix) >= self.cache_min_tokens:
+            # OpenAI caches prompt prefixes automatically; the key routes requests sharing a prefix to the same cache
+            options["prompt_cache_key"] = hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:32]
+            options["stream_options"] = {"include_usage": True}
+        with Instrumentation.span("llm.request", bot="chatgpt", model=self.__chat_gpt_model,
+                                  prompt_bytes=len(prompt)) as span:
+            guard = StreamGuard(self.__max_output_tokens, self.__generation_timeout, estimate_tokens(prompt))
+            stream = self.__client.chat.completions.create(
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt,
+                    }
+                ],
+                model=self.__chat_gpt_model,
+                stream=True,
+                **options,
+            )
+            try:
+                for chunk in stream:
+                    if chunk.usage:
+                        details = chunk.usage.prompt_tokens_details
+                        guard.set_usage(chunk.usage.prompt_tokens, chunk.usage.completion_tokens,
+                                        details.cached_tokens if details else 0)
+                    if chunk.choices and not guard.add(chunk.choices[0].delta.content):
+                        break
+            finally:
+                stream.close()
+            content = guard.finish()
+            span.update(guard.metrics())
+        return content
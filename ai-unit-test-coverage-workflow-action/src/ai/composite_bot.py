@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Optional, Tuple
+from ai.ai_bot import AiBot
+from ai.gemini_bot import NO_VALID_RESPONSE
+from ai.stream_guard import StreamGuard
+from instrumentation import Instrumentation
+from log import Log
+from tokens import estimate_tokens
+
+# Requests of a backend needed before its latency percentile is used for hedging and routing
+MIN_SAMPLES = 5
+
+# A backend that failed more than half of its last requests is tried after the others
+HEALTH_WINDOW = 10
+
+# HTTP retries of each backend behind a composite; the next backend is a better retry than a long backoff
+BACKEND_MAX_RETRIES = 1
+
+
+class EmptyCompletion(Exception):
+    """A backend answered without content: empty, aborted by its stream guard, or a placeholder."""
+
+
+class BackendStats:
+    """Latencies and outcomes of the recent requests of one backend."""
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.__latencies = deque(maxlen=100)
+        self.__outcomes = deque(maxlen=HEALTH_WINDOW)
+        self.__lock = threading.Lock()
+
+    def record(self, latency: float, success: bool):
+        with self.__lock:
+            self.requests += 1
+            self.failures += 0 if success else 1
+            self.__outcomes.append(success)
+            if success:
+                self.__latencies.append(latency)
+
+    def latency_percentile(self, percent: float) -> Optional[float]:
+        """The latency percentile of the recent successful requests, or None before MIN_SAMPLES of them."""
+        with self.__lock:
+            latencies = sorted(self.__latencies)
+        if len(latencies) < MIN_SAMPLES:
+            return None
+        return Instrumentation.percentile(latencies, percent)
+
+    @property
+    def healthy(self) -> bool:
+        with self.__lock:
+            outcomes = list(self.__outcomes)
+        return len(outcomes) < 3 or outcomes.count(False) * 2 <= len(outcomes)
+
+
+class CompositeBot(AiBot):
+    """
+    Sends each prompt to one of several backends, in order of preference:
+    - with route_tokens, prompts above that many tokens go to the second backend first, e.g. small files to a local
+      Ollama and large ones to a cloud model; otherwise, once every backend has enough samples, the backend with the
+      lowest median latency goes first;
+    - backends failing most of their recent requests are tried last.
+    When the first backend has not answered within its hedge_percentile latency, a hedged duplicate goes to the next
+    one and the first answer wins. A backend that fails, or answers without content, is replaced by the next one.
+    """
+
+    def __init__(self, backends: List[Tuple[str, AiBot]], route_tokens: int = 0, hedge_percentile: float = 95,
+                 max_workers: int = 2):
+        self.backends = backends
+        self.route_tokens = route_tokens
+        self.hedge_percentile = hedge_percentile
+        self.stats = {name: BackendStats() for name, _ in backends}
+        self.__executor = ThreadPoolExecutor(max_workers=max(2, max_workers), thread_name_prefix="backend")
+
+    def candidates(self, prompt: str) -> List[Tuple[str, AiBot]]:
+        candidates = list(self.backends)
+        if self.route_tokens:
+            if len(candidates) > 1 and estimate_tokens(prompt) > self.route_tokens:
+                candidates = candidates[1:] + candidates[:1]
+        else:
+            medians = [self.stats[name].latency_percentile(50) for name, _ in candidates]
+            if None not in medians:
+                candidates = [backend for _, backend in sorted(zip(medians, candidates), key=lambda item: item[0])]
+        return sorted(candidates, key=lambda backend: not self.stats[backend[0]].healthy)
+
+    def ai_complete(self, prompt):
+        remaining = self.candidates(prompt)
+        primary = remaining[0][0]
+        pending = {self.__submit(remaining.pop(0), prompt)}
+        started = time.monotonic()
+        hedged = False
+        error = None
+        while pending:
+            timeout = None
+            hedge_delay = self.stats[primary].latency_percentile(self.hedge_percentile) if self.hedge_percentile else None
+            if not hedged and remaining and hedge_delay is not None:
+                timeout = max(0.0, started + hedge_delay - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                Log.print_yellow(f"{primary} slower than its p{self.hedge_percentile:g} of {hedge_delay:.1f}s, "
+                                 f"hedging with {remaining[0][0]}")
+                Instrumentation.increment("bot.hedges")
+                pending.add(self.__submit(remaining.pop(0), prompt))
+                continue
+            for future in done:
+                try:
+                    content, guard = future.result()
+                except Exception as e:
+                    error = e
+                    Log.print_yellow(f"{future.backend} failed:", e)
+                    if not pending and remaining:
+                        Log.print_yellow(f"Failing over to {remaining[0][0]}")
+                        Instrumentation.increment("bot.failovers")
+                        pending.add(self.__submit(remaining.pop(0), prompt))
+                    continue
+                # The slower duplicate of a hedged request is left to finish in the background, and ignored
+                StreamGuard.set_last(guard)
+                return content
+        if isinstance(error, EmptyCompletion):
+            # As from a single backend: no content, rather than an error
+            return ""
+        raise error
+
+    def log_stats(self):
+        for name, stats in self.stats.items():
+            median = stats.latency_percentile(50)
+            Log.print_green(f"Backend {name}: {stats.requests} requests, {stats.failures} failed"
+                            + (f", median latency {median:.1f}s" if median is not None else ""))
+
+    def __submit(self, backend: Tuple[str, AiBot], prompt: str):
+        name, bot = backend
+        future = self.__executor.submit(self.__complete, name, bot, prompt)
+        future.backend = name
+        return future
+
+    def __complete(self, name: str, bot: AiBot, prompt: str):
+        started = time.monotonic()
+        StreamGuard.pop_last()
+        try:
+            content = bot.ai_complete(prompt)
+            if not content or not content.strip() or content == NO_VALID_RESPONSE:
+                raise EmptyCompletion(f"{name} returned no content")
+        except Exception:
+            self.stats[name].record(time.monotonic() - started, False)
+            raise
+        self.stats[name].record(time.monotonic() - started, True)
+        return content, StreamGuard.pop_last()
@@ -1,29 +1,147 @@
-import os
+import hashlib
+import json
+import threading
+import time
 import requests
 from ai.ai_bot import AiBot
+from ai.http_transport import HttpTransport
+from ai.stream_guard import StreamGuard
+from instrumentation import Instrumentation
+from log import Log
+from tokens import estimate_tokens
+
+# Returned when Gemini answered without any text
+NO_VALID_RESPONSE = "[Gemini API: No valid response]"
+
+# Cached contents are created again this long before their TTL runs out, so requests never reference an expired one
+CACHE_EXPIRY_MARGIN = 30
 
 class GeminiBot(AiBot):
-    def __init__(self, url, api_key, model="gemini-pro"):
+    """
+    Streams from `streamGenerateContent`. With a cache_ttl, a prompt prefix (instructions and context) seen a second
+    time is uploaded once as cached content, and later requests sharing it only send the per-file rest. Expired cached
+    contents are created again, and a request whose cached content is rejected is sent again with the full prompt.
+    """
+
+    def __init__(self, url, api_key, model="gemini-pro", transport: HttpTransport = None,
+                 max_output_tokens=0, generation_timeout=0, cache_ttl=0, cache_min_tokens=1024):
         self.url = url
         self.api_key = api_key
         self.model = model
-        self.base_url = f"{self.url}/{self.model}:generateContent"
+        self.transport = transport or HttpTransport()
+        self.max_output_tokens = max_output_tokens
+        self.generation_timeout = generation_timeout
+        self.cache_ttl = cache_ttl
+        self.cache_min_tokens = cache_min_tokens
+        self.base_url = f"{self.url}/{self.model}:streamGenerateContent?alt=sse"
+        # LLM_URL points at ".../v1beta/models"; cached contents live next to the models
+        self.cache_url = f"{self.url.rstrip('/').rsplit('/', 1)[0]}/cachedContents"
+        self.__cached_contents = {}
+        self.__cache_lock = threading.Lock()
         self.headers = {
             "Content-Type": "application/json",
             "x-goog-api-key": self.api_key
         }
 
-    def ai_generate_test_coverage(self, code, unit_test, all_source_files, unit_test_file_path):
-        prompt = AiBot.build_test_generation_prompt(code=code, unit_test=unit_test, all_source_files=all_source_files, unit_test_file_path=unit_test_file_path)
+    def ai_complete(self, prompt):
+        prefix, rest = AiBot.split_prompt(prompt)
+        cached_content = self.__cached_content(prefix) if self.cache_ttl else None
+        if cached_content:
+            try:
+                return self.__generate(prompt, rest, cached_content)
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else 0
+                if not 400 <= status < 500 or status == 429:
+                    raise
+                Log.print_yellow(f"Gemini rejected cached content {cached_content}, sending the full prompt:", e)
+                self.__forget_cached_content(prefix, cached_content)
+        return self.__generate(prompt, prompt, None)
+
+    def __generate(self, prompt: str, text: str, cached_content):
+        """Streams the answer to prompt, sending text with cached_content when given, else the whole prompt."""
         payload = {
             "contents": [
-                {"role": "user", "parts": [{"text": prompt}]}
+                {"role": "user", "parts": [{"text": text}]}
             ]
         }
-        response = requests.post(self.base_url, headers=self.headers, json=payload)
-        response.raise_for_status()
-        data = response.json()
+        if cached_content:
+            payload["cachedContent"] = cached_content
+        if self.max_output_tokens:
+            payload["generationConfig"] = {"maxOutputTokens": self.max_output_tokens}
+
+        prompt_tokens = estimate_tokens(prompt)
+        with Instrumentation.span("llm.request", bot="gemini", model=self.model, prompt_bytes=len(prompt)) as span:
+            guard = StreamGuard(self.max_output_tokens, self.generation_timeout, prompt_tokens)
+            response = self.transport.post(self.base_url, tokens=prompt_tokens, headers=self.headers,
+                                           json=payload, stream=True)
+            try:
+                # Server-sent events, one GenerateContentResponse per "data:" line
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = json.loads(line[len("data:"):])
+                    usage = data.get("usageMetadata", {})
+                    guard.set_usage(usage.get("promptTokenCount", 0), usage.get("candidatesTokenCount", 0),
+                                    usage.get("cachedContentTokenCount", 0))
+                    try:
+                        parts = data["candidates"][0]["content"]["parts"]
+                    except (KeyError, IndexError):
+                        continue
+                    if not guard.add("".join(part.get("text", "") for part in parts)):
+                        break
+            finally:
+                response.close()
+
+            content = guard.finish()
+            span.update(guard.metrics())
+        if not content and not guard.aborted:
+            return NO_VALID_RESPONSE
+        return content
+
+    def __cached_content(self, prefix: str):
+        """
+        Returns the name of the cached content holding prefix, creating it the second time the prefix is used.
+        Prefixes below cache_min_tokens, or rejected by the API, are not cached.
+        """
+        if estimate_tokens(prefix) < self.cache_min_tokens:
+            return None
+        key = hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+        with self.__cache_lock:
+            state = self.__cached_contents.get(key)
+            if isinstance(state, tuple):
+                name, expires_at = state
+                if time.monotonic() < expires_at:
+                    return name
+                state = "seen"
+            if state != "seen":
+                # None (first use), "pending" (being created by another thread) or False (rejected)
+                if state is None:
+                    self.__cached_contents[key] = "seen"
+                return None
+            self.__cached_contents[key] = "pending"
+
+        payload = {
+            "model": f"models/{self.model}",
+            "contents": [{"role": "user", "parts": [{"text": prefix}]}],
+            "ttl": f"{int(self.cache_ttl)}s",
+        }
+        name = False
+        expires_at = time.monotonic() + max(0, self.cache_ttl - CACHE_EXPIRY_MARGIN)
         try:
-            return data["candidates"][0]["content"]["parts"][0]["text"]
-        except Exception:
-            return "[Gemini API: No valid response]"
+            with Instrumentation.span("llm.cache_create", bot="gemini", prefix_bytes=len(prefix)):
+                response = self.transport.post(self.cache_url, tokens=estimate_tokens(prefix), headers=self.headers,
+                                               json=payload)
+                name = response.json().get("name") or False
+        except (requests.RequestException, ValueError) as e:
+            Log.print_yellow("Could not create Gemini cached content, sending full prompts:", e)
+        with self.__cache_lock:
+            self.__cached_contents[key] = (name, expires_at) if name else False
+        return name or None
+
+    def __forget_cached_content(self, prefix: str, name: str):
+        """Drops a rejected cached content, e.g. deleted or expired early, so the next use of prefix creates it again."""
+        key = hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+        with self.__cache_lock:
+            state = self.__cached_contents.get(key)
+            if isinstance(state, tuple) and state[0] == name:
+                self.__cached_contents[key] = "seen"
@@ -0,0 +1,126 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from log import Log
+
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    Client-side token-bucket limiter for requests per minute and tokens per minute.
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.__request_allowance = float(requests_per_minute)
+        self.__token_allowance = float(tokens_per_minute)
+        self.__last_refill = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0):
+        """Blocks until one request of the given number of tokens fits in both buckets."""
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+        # A single request larger than the whole bucket only has to wait for a full bucket
+        tokens = min(tokens, self.tokens_per_minute) if self.tokens_per_minute else 0
+        while True:
+            with self.__lock:
+                self.__refill()
+                wait = max(self.__wait_for(self.__request_allowance, 1, self.requests_per_minute),
+                           self.__wait_for(self.__token_allowance, tokens, self.tokens_per_minute))
+                if wait <= 0:
+                    self.__request_allowance -= 1
+                    self.__token_allowance -= tokens
+                    return
+            time.sleep(wait)
+
+    def __refill(self):
+        now = time.monotonic()
+        elapsed = now - self.__last_refill
+        self.__last_refill = now
+        self.__request_allowance = min(self.requests_per_minute,
+                                       self.__request_allowance + elapsed * self.requests_per_minute / 60)
+        self.__token_allowance = min(self.tokens_per_minute,
+                                     self.__token_allowance + elapsed * self.tokens_per_minute / 60)
+
+    @staticmethod
+    def __wait_for(allowance: float, needed: int, per_minute: int) -> float:
+        if not per_minute or allowance >= needed:
+            return 0
+        return (needed - allowance) * 60 / per_minute
+
+
+class HttpTransport:
+    """
+    HTTP transport shared by all bots: pooled keep-alive connections, timeouts,
+    retries with exponential backoff and jitter that honour Retry-After, and a client-side rate limiter.
+    """
+
+    def __init__(self, connect_timeout: float = 10, read_timeout: float = 300, max_retries: int = 5,
+                 backoff_base: float = 1, backoff_max: float = 60, pool_size: int = 10,
+                 rate_limiter: RateLimiter = None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def post(self, url: str, tokens: int = 0, **kwargs) -> requests.Response:
+        """
+        POSTs to url, retrying connection errors and retryable status codes.
+        tokens is the estimated size of the request, charged against the tokens-per-minute limit.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(tokens)
+            try:
+                response = self.session.post(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.__backoff(attempt)
+                reason = type(e).__name__
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response
+                delay = self.__retry_after(response)
+                if delay is None:
+                    delay = self.__backoff(attempt)
+                reason = f"HTTP {response.status_code}"
+                response.close()
+
+            attempt += 1
+            Log.print_yellow(f"{reason} from {url}, retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def __backoff(self, attempt: int) -> float:
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def __retry_after(response: requests.Response):
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -1,13 +1,22 @@
-import requests
 from ai.ai_bot import AiBot
+from ai.http_transport import HttpTransport
+from ai.stream_guard import StreamGuard
+from instrumentation import Instrumentation
+from tokens import estimate_tokens
 import json
 
 class OllamaBot(AiBot):
-    def __init__(self, base_url, model):
+    def __init__(self, base_url, model, transport: HttpTransport = None, max_output_tokens=0, generation_timeout=0,
+                 keep_alive=0):
         self.base_url = base_url.rstrip('/')
+        # Keeps the model, and the KV cache of the shared prompt prefix, loaded between requests
+        self.keep_alive = keep_alive
         self.model = model
+        self.transport = transport or HttpTransport()
+        self.max_output_tokens = max_output_tokens
+        self.generation_timeout = generation_timeout
 
-    def ai_generate_test_coverage(self, code, unit_test, all_source_files, unit_test_file_path):
+    def ai_complete(self, prompt):
         url = f"{self.base_url}/api/chat"
         payload = {
             "model": self.model,
@@ -18,16 +27,32 @@ class OllamaBot(AiBot):
                 },
                 {
                     "role": "user",
-                    "content": AiBot.build_test_generation_prompt(code=code, unit_test=unit_test, all_source_files=all_source_files, unit_test_file_path=unit_test_file_path),
+                    "content": prompt,
                 }
             ],
-            "stream": False
+            "stream": True
         }
-        response = requests.post(url, json=payload, stream=False)
-        response.raise_for_status()
-        content = []
-        for line in response.iter_lines():
-            if line:
-                json_object = json.loads(line.decode('utf-8'))
-                content.append(json_object["message"]["content"])
-        return "".join(content)
+        if self.max_output_tokens:
+            payload["options"] = {"num_predict": self.max_output_tokens}
+        if self.keep_alive:
+            payload["keep_alive"] = f"{int(self.keep_alive)}s"
+
+        prompt_tokens = estimate_tokens(prompt)
+        with Instrumentation.span("llm.request", bot="ollama", model=self.model, prompt_bytes=len(prompt)) as span:
+            guard = StreamGuard(self.max_output_tokens, self.generation_timeout, prompt_tokens)
+            response = self.transport.post(url, tokens=prompt_tokens, json=payload, stream=True)
+            try:
+                # NDJSON, one chat chunk per line; the last one carries the eval counts
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    json_object = json.loads(line.decode('utf-8'))
+                    if not guard.add(json_object.get("message", {}).get("content", "")):
+                        break
+                    if json_object.get("done"):
+                        guard.set_usage(json_object.get("prompt_eval_count", 0), json_object.get("eval_count", 0))
+            finally:
+                response.close()
+            content = guard.finish()
+            span.update(guard.metrics())
+        return content
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from instrumentation import Instrumentation
+from log import Log
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of LLM responses.
+    Entries are keyed by a hash of the bot type, the model and the fully built prompt, so a
+    response is reused only when nothing that went into the request has changed.
+    The directory is self-contained and can be restored between CI runs with actions/cache.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, max_age_seconds: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(bot_type: str, model: str, prompt: str) -> str:
+        digest = hashlib.sha256()
+        for part in (bot_type, model, prompt):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def __entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str):
+        path = self.__entry_path(key)
+        try:
+            if time.time() - os.stat(path).st_mtime > self.max_age_seconds:
+                self.__remove(path)
+                self.__count(hit=False)
+                return None
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.__count(hit=False)
+            return None
+
+        # Touch the entry so eviction drops the least recently used responses first
+        os.utime(path)
+        self.__count(hit=True)
+        return entry["response"]
+
+    def put(self, key: str, bot_type: str, model: str, response: str):
+        entry = {
+            "bot": bot_type,
+            "model": model,
+            "created": time.time(),
+            "response": response
+        }
+        path = self.__entry_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """
+        Drops entries not used for max_age_seconds, then the least recently used entries
+        until the cache fits in max_bytes. Only the entries at the top of cache_dir are considered; other users of
+        the directory keep their files in subdirectories.
+        """
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                self.__remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            self.__remove(path)
+            total_size -= size
+            evicted += 1
+        if evicted:
+            Log.print_yellow(f"Response cache evicted {evicted} entries to stay under {self.max_bytes} bytes")
+
+    def log_stats(self):
+        Log.print_green(f"Response cache: {self.hits} hits, {self.misses} misses")
+
+    def __count(self, hit: bool):
+        with self.__lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        Instrumentation.increment("cache.hits" if hit else "cache.misses")
+
+    @staticmethod
+    def __remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
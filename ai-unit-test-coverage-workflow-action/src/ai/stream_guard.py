@@ -0,0 +1,102 @@
+import threading
+import time
+from instrumentation import Instrumentation
+from log import Log
+from tokens import estimate_tokens
+
+class StreamGuard:
+    """
+    Collects the streamed chunks of one generation, records time to first token and tokens/sec,
+    and tells the bot to stop once max_output_tokens or timeout_seconds is exceeded (0 disables a limit).
+    The tokens of every finished generation are added to the llm.tokens counter: the provider's counts when it
+    reported them, else prompt_tokens as estimated by the bot and the estimated tokens of the streamed text.
+    """
+
+    __local = threading.local()
+
+    def __init__(self, max_output_tokens: int = 0, timeout_seconds: float = 0, prompt_tokens: int = 0):
+        self.max_output_tokens = max_output_tokens
+        self.timeout_seconds = timeout_seconds
+        self.started = time.monotonic()
+        self.first_token_at = None
+        self.finished_at = None
+        self.prompt_tokens = prompt_tokens
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.aborted = ""
+        self.__chunks = []
+        self.__chars = 0
+
+    def add(self, text: str) -> bool:
+        """Adds a chunk and returns False when the generation must be aborted."""
+        if not text:
+            return True
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.__chunks.append(text)
+        self.__chars += len(text)
+        self.output_tokens = self.__chars // 4
+
+        if self.max_output_tokens and self.output_tokens > self.max_output_tokens:
+            self.aborted = f"exceeded {self.max_output_tokens} output tokens"
+        elif self.timeout_seconds and time.monotonic() - self.started > self.timeout_seconds:
+            self.aborted = f"exceeded {self.timeout_seconds}s"
+        return not self.aborted
+
+    def set_usage(self, prompt_tokens: int = 0, output_tokens: int = 0, cached_tokens: int = 0):
+        """
+        Records the token counts reported by the provider, replacing the estimates.
+        cached_tokens is the part of the prompt served from the provider's prefix cache.
+        """
+        if prompt_tokens:
+            self.prompt_tokens = prompt_tokens
+        if cached_tokens:
+            self.cached_tokens = cached_tokens
+        if output_tokens:
+            self.output_tokens = output_tokens
+
+    def finish(self) -> str:
+        """Returns the generated text, or an empty string when the generation was aborted."""
+        self.finished_at = time.monotonic()
+        if not self.output_tokens and self.__chars:
+            self.output_tokens = estimate_tokens("".join(self.__chunks))
+        StreamGuard.__local.last = self
+        Instrumentation.increment("llm.tokens", self.prompt_tokens + self.output_tokens)
+        if self.aborted:
+            Log.print_yellow(f"Aborted generation after {self.output_tokens} tokens: {self.aborted}")
+            return ""
+        return "".join(self.__chunks)
+
+    @property
+    def time_to_first_token(self) -> float:
+        return (self.first_token_at or self.finished_at or time.monotonic()) - self.started
+
+    @property
+    def tokens_per_second(self) -> float:
+        if self.first_token_at is None or self.finished_at is None or self.finished_at <= self.first_token_at:
+            return 0.0
+        return self.output_tokens / (self.finished_at - self.first_token_at)
+
+    def metrics(self) -> dict:
+        """Metrics of the generation for the instrumentation span of the request."""
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.output_tokens,
+            "response_bytes": self.__chars,
+            "ttft_seconds": round(self.time_to_first_token, 3),
+            "tokens_per_second": round(self.tokens_per_second, 1),
+            "aborted": self.aborted,
+        }
+
+    @staticmethod
+    def set_last(guard):
+        """Hands the guard of a generation finished on another thread over to this one."""
+        StreamGuard.__local.last = guard
+
+    @staticmethod
+    def pop_last():
+        """Returns the guard of the last generation finished on this thread, if any, and clears it."""
+        guard = getattr(StreamGuard.__local, "last", None)
+        StreamGuard.__local.last = None
+        return guard
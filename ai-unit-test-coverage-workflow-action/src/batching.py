@@ -0,0 +1,53 @@
+import re
+from typing import Dict, List, NamedTuple
+from unit_test_validator import strip_markdown_fences
+
+BATCH_FILE_BEGIN = "<<<UNIT TEST FILE: "
+BATCH_FILE_END = "<<<END UNIT TEST FILE>>>"
+BATCH_FILE_BLOCK = re.compile(re.escape(BATCH_FILE_BEGIN) + r'(.+?)>>>[ \t]*\n(.*?)\n?' + re.escape(BATCH_FILE_END),
+                              re.DOTALL)
+
+
+class BatchItem(NamedTuple):
+    """One target file of a batched request."""
+    code: str
+    unit_test: str
+    unit_test_file_path: str
+    hints: str
+
+
+def plan_batches(files: List[str], file_tokens: Dict[str, int], token_budget: int, max_files: int) -> List[List[str]]:
+    """
+    Packs the files listed in file_tokens into batches of up to max_files files and token_budget tokens, in the order
+    of files. Files missing from file_tokens (too large, or not batchable) get a batch of their own.
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for file in files:
+        tokens = file_tokens.get(file)
+        if tokens is None:
+            batches.append([file])
+            continue
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_files):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(file)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def split_batch_response(response: str, unit_test_file_paths: List[str]) -> Dict[str, str]:
+    """
+    Splits the answer to a batched request into the unit test file of each requested path.
+    Paths whose block is missing or empty are left out, so the caller can retry them one by one.
+    """
+    expected = set(unit_test_file_paths)
+    contents = {}
+    for match in BATCH_FILE_BLOCK.finditer(response or ""):
+        path = match.group(1).strip()
+        content = strip_markdown_fences(match.group(2)).strip()
+        if path in expected and content:
+            contents[path] = content + "\n"
+    return contents
@@ -0,0 +1,54 @@
+import os
+import shlex
+from typing import List
+from log import Log
+
+
+def get_test_class_name(test_file: str) -> str:
+    return os.path.splitext(os.path.basename(test_file))[0]
+
+
+def get_test_file_command(build_tool: str, test_file: str) -> str:
+    """Returns the command running only the tests of test_file with the build tool's test selector."""
+    build_tool = (build_tool or "").lower()
+    test_class = get_test_class_name(test_file)
+    if build_tool == 'mvn':
+        return f'mvn -q test -Dtest={test_class} -Dsurefire.failIfNoSpecifiedTests=false'
+    elif build_tool == 'gradle':
+        return f'./gradlew test --tests "*{test_class}"'
+    elif build_tool == 'npm':
+        return f'npm test -- {shlex.quote(test_file)}'
+    elif build_tool == 'pytest':
+        return f'pytest -q {shlex.quote(test_file)}'
+    elif build_tool == 'swift':
+        return f'swift test --filter {test_class}'
+    elif build_tool == 'sbt':
+        return f'sbt "testOnly *{test_class}"'
+    else:
+        Log.print_yellow(f"Unknown build tool: {build_tool}. Generated tests will not be run.")
+        return ""
+
+
+def get_affected_tests_command(build_tool: str, test_files: List[str]) -> str:
+    """
+    Returns the command running only test_files, with coverage, through the build tool's test selector.
+    It does not clean, so incremental compilation and build caches are kept.
+    """
+    build_tool = (build_tool or "").lower()
+    test_classes = [get_test_class_name(test_file) for test_file in test_files]
+    paths = " ".join(shlex.quote(test_file) for test_file in test_files)
+    if build_tool == 'mvn':
+        return f'mvn verify -Dtest={",".join(test_classes)} -Dsurefire.failIfNoSpecifiedTests=false'
+    elif build_tool == 'gradle':
+        return './gradlew test ' + " ".join(f'--tests "*{test_class}"' for test_class in test_classes)
+    elif build_tool == 'npm':
+        return f'npm test -- --coverage {paths}'
+    elif build_tool == 'pytest':
+        return f'pytest --cov=src --cov-report=term --cov-report=xml {paths}'
+    elif build_tool == 'swift':
+        return f'swift test --enable-code-coverage --filter "{"|".join(test_classes)}"'
+    elif build_tool == 'sbt':
+        return 'sbt coverage "testOnly ' + " ".join(f'*{test_class}' for test_class in test_classes) + '"'
+    else:
+        Log.print_yellow(f"Unknown build tool: {build_tool}. No build will be run.")
+        return ""
@@ -0,0 +1,140 @@
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import List, NamedTuple, Optional
+from log import Log
+
+# Lines of output kept in memory for the result; the rest is only streamed (and written to the log file)
+TAIL_LINES = 200
+
+# Failing tests kept in the result
+MAX_FAILING_TESTS = 200
+
+# Seconds between SIGTERM and SIGKILL of a build that timed out
+KILL_GRACE_SECONDS = 10
+
+COVERAGE_PATTERNS = [
+    re.compile(r'^TOTAL\s.*?(\d+(?:\.\d+)?)%\s*$'),                    # pytest-cov
+    re.compile(r'^All files\s*\|\s*(\d+(?:\.\d+)?)\s*\|'),             # jest / istanbul, statements
+    re.compile(r'Statement coverage\.*:\s*(\d+(?:\.\d+)?)%'),          # sbt-scoverage
+]
+
+FAILING_TEST_PATTERNS = [
+    re.compile(r'^FAILED (\S+)'),                                       # pytest
+    re.compile(r'^\[ERROR\]\s+(\S+?)\s+Time elapsed:.*<<< (?:FAILURE|ERROR)!'),  # maven surefire
+    re.compile(r'^(\S.*? > .+?) FAILED\s*$'),                           # gradle
+    re.compile(r'^\s*● (.+? › .+?)\s*$'),                               # jest
+    re.compile(r"Test Case '(.+?)' failed"),                            # swift XCTest
+    re.compile(r'^\[info\] - (.+?) \*\*\* FAILED \*\*\*'),              # sbt / scalatest
+]
+
+
+class BuildResult(NamedTuple):
+    """Outcome of a build, with the coverage summary and failing tests found in its output."""
+    command: str
+    return_code: int
+    timed_out: bool
+    duration: float
+    coverage_percent: Optional[float]
+    failing_tests: List[str]
+    output_tail: str
+
+    @property
+    def passed(self) -> bool:
+        return self.return_code == 0 and not self.timed_out
+
+
+class BuildOutputParser:
+    """Extracts the coverage summary and the failing tests from build output, one line at a time."""
+
+    def __init__(self):
+        self.coverage_percent = None
+        self.failing_tests = []
+        self.__seen = set()
+
+    def feed(self, line: str):
+        line = line.rstrip('\r\n')
+        for pattern in COVERAGE_PATTERNS:
+            match = pattern.search(line)
+            if match:
+                # The last summary of the output is the overall one
+                self.coverage_percent = float(match.group(1))
+                break
+        for pattern in FAILING_TEST_PATTERNS:
+            match = pattern.search(line)
+            if match:
+                test = match.group(1).strip()
+                if test not in self.__seen and len(self.failing_tests) < MAX_FAILING_TESTS:
+                    self.__seen.add(test)
+                    self.failing_tests.append(test)
+                break
+
+
+def run_build(command: str, timeout: float = 0, log_path: str = "", echo: bool = True) -> BuildResult:
+    """
+    Runs command in its own process group, streaming its output line by line: printed when echo is set,
+    written to log_path when given, and parsed for coverage and failing tests. Only the last TAIL_LINES lines are
+    kept in memory. After timeout seconds (0 = no limit) the whole process group is terminated, then killed.
+    """
+    # Opened before the build starts: a log that cannot be written must not stop the reader draining the output
+    log_file = None
+    if log_path:
+        try:
+            log_file = open(log_path, 'w')
+        except OSError as e:
+            Log.print_yellow(f"Cannot write build log {log_path}, continuing without it:", e)
+    started = time.monotonic()
+    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                               errors='replace', bufsize=1, start_new_session=True)
+    parser = BuildOutputParser()
+    tail = deque(maxlen=TAIL_LINES)
+
+    def read_output():
+        nonlocal log_file
+        try:
+            for line in process.stdout:
+                tail.append(line)
+                parser.feed(line)
+                if log_file:
+                    try:
+                        log_file.write(line)
+                    except OSError as e:
+                        Log.print_yellow(f"Cannot write build log {log_path}, continuing without it:", e)
+                        log_file.close()
+                        log_file = None
+                if echo:
+                    # Printed as is, to keep the build's own formatting
+                    print(line, end='', flush=True)
+        finally:
+            if log_file:
+                log_file.close()
+
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+    timed_out = False
+    try:
+        process.wait(timeout=timeout or None)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        Log.print_red(f"{command} timed out after {timeout}s, stopping it")
+        _kill_process_group(process, reader)
+    reader.join(timeout=KILL_GRACE_SECONDS)
+    return BuildResult(command, process.returncode, timed_out, time.monotonic() - started, parser.coverage_percent,
+                       parser.failing_tests, "".join(tail))
+
+
+def _kill_process_group(process: subprocess.Popen, reader: threading.Thread):
+    # The output pipe closes once every process of the group has exited, including children of the shell
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            break
+        reader.join(timeout=KILL_GRACE_SECONDS)
+        if not reader.is_alive():
+            break
+    process.wait()
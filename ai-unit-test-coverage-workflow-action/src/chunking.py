@@ -0,0 +1,55 @@
+import os
+from typing import List, NamedTuple
+from code_symbols import find_symbols, symbol_source
+from diff_scope import find_related_tests
+from skeleton_index import extract_skeleton
+from tokens import estimate_tokens
+
+
+class Chunk(NamedTuple):
+    """A group of functions of a large source file, sent in one request, and the existing tests exercising them."""
+    code: str
+    unit_test: str
+    symbols: List[str]
+
+
+class ChunkPlan(NamedTuple):
+    """The chunks of a large source file, and its outline shared by all of them."""
+    outline: str
+    chunks: List[Chunk]
+
+
+def split_into_chunks(file: str, content: str, test_content: str, max_tokens: int) -> ChunkPlan:
+    """
+    Splits a source file into groups of consecutive top-level functions and methods of about max_tokens each.
+    The outline (skeleton) of the whole file is kept apart, to be sent as context with every chunk.
+    Returns None when the file has fewer than two groups.
+    """
+    extension = os.path.splitext(file)[1]
+    functions = [symbol for symbol in find_symbols(content, extension) if symbol.kind == 'function']
+    functions = [symbol for symbol in functions
+                 if not any(other is not symbol and other.start <= symbol.start and symbol.end <= other.end
+                            for other in functions)]
+
+    groups, current, current_tokens = [], [], 0
+    for symbol in functions:
+        tokens = estimate_tokens(symbol_source(content, symbol))
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(symbol)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    if len(groups) < 2:
+        return None
+
+    comment = '#' if extension == '.py' else '//'
+    chunks = []
+    for group in groups:
+        code = "\n\n".join(f"{comment} {symbol.qualified_name} (lines {symbol.start}-{symbol.end} of {file})\n"
+                           f"{symbol_source(content, symbol)}" for symbol in group)
+        names = sorted({symbol.name for symbol in group})
+        chunks.append(Chunk(code, find_related_tests(test_content, extension, names),
+                            [symbol.qualified_name for symbol in group]))
+    return ChunkPlan(extract_skeleton(content, extension), chunks)
@@ -0,0 +1,139 @@
+import ast
+import re
+from typing import List, NamedTuple
+
+CLASS_DECLARATION = re.compile(r'\b(?:class|interface|object|struct|enum|protocol|extension|trait)\s+([A-Za-z_]\w*)')
+TEST_BLOCK = re.compile(r'\b(?:describe|it|test)\s*\(\s*([\'"`])(.+?)\1')
+FUNCTION_DECLARATION = re.compile(r'([A-Za-z_]\w*)\s*(?:<[^>()]*>)?\s*\([^;]*$')
+STRING_LITERAL = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`')
+CONTROL_KEYWORDS = {'if', 'for', 'while', 'switch', 'catch', 'return', 'else', 'do', 'try', 'synchronized',
+                    'when', 'guard', 'foreach', 'sizeof', 'new', 'super', 'this', 'throw', 'assert', 'with'}
+
+# A declaration whose opening brace has not been seen within this many lines is dropped
+MAX_DECLARATION_LINES = 4
+
+
+class Symbol(NamedTuple):
+    """A class or function of a source file. Lines are 1-based and inclusive."""
+    name: str
+    kind: str
+    start: int
+    end: int
+    parent: str
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.parent}.{self.name}" if self.parent else self.name
+
+
+def find_symbols(content: str, extension: str) -> List[Symbol]:
+    """
+    Finds the classes and functions of a source file, outer symbols first.
+    Python is parsed with ast; the other supported languages with a brace-matching scanner.
+    """
+    if extension == '.py':
+        return _find_python_symbols(content)
+    return _find_brace_symbols(content)
+
+
+def symbol_source(content: str, symbol: Symbol) -> str:
+    return "\n".join(content.splitlines()[symbol.start - 1:symbol.end])
+
+
+def _find_python_symbols(content: str) -> List[Symbol]:
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return []
+
+    symbols = []
+
+    def visit(body, parent):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+                kind = 'class' if isinstance(node, ast.ClassDef) else 'function'
+                symbols.append(Symbol(node.name, kind, start, node.end_lineno, parent))
+                if kind == 'class':
+                    visit(node.body, f"{parent}.{node.name}" if parent else node.name)
+
+    visit(tree.body, "")
+    return symbols
+
+
+def _find_brace_symbols(content: str) -> List[Symbol]:
+    lines = content.splitlines()
+    symbols = []
+    stack = []
+    depth = 0
+    pending = None
+    in_block_comment = False
+    for line_number, line in enumerate(lines, 1):
+        # Test blocks are named by their string argument, so match them before strings are removed
+        test_block = TEST_BLOCK.search(line)
+        code, in_block_comment = strip_comments(STRING_LITERAL.sub('""', line), in_block_comment)
+
+        if pending and line_number - pending[2] > MAX_DECLARATION_LINES:
+            pending = None
+        declaration = _match_declaration(code, test_block)
+        if declaration:
+            pending = declaration + (line_number,)
+
+        for char in code:
+            if char == '{':
+                depth += 1
+                if pending:
+                    parent = ".".join(entry[0][0] for entry in stack if entry[0][1] == 'class')
+                    stack.append((pending, depth, parent))
+                    pending = None
+            elif char == '}':
+                if stack and stack[-1][1] == depth:
+                    (name, kind, start), _, parent = stack.pop()
+                    symbols.append(Symbol(name, kind, _include_annotations(lines, start), line_number, parent))
+                depth = max(0, depth - 1)
+        if pending and code.rstrip().endswith(';'):
+            # A prototype or abstract declaration without a body
+            pending = None
+
+    return sorted(symbols, key=lambda symbol: (symbol.start, -symbol.end))
+
+
+def _match_declaration(code: str, test_block):
+    class_match = CLASS_DECLARATION.search(code)
+    if class_match:
+        return class_match.group(1), 'class'
+    if test_block:
+        return test_block.group(2), 'function'
+    function_match = FUNCTION_DECLARATION.search(code)
+    if function_match and function_match.group(1) not in CONTROL_KEYWORDS \
+            and not code.lstrip().startswith(('.', ')', '}')) and '=' not in code[:function_match.start()]:
+        return function_match.group(1), 'function'
+    return None
+
+
+def strip_comments(line: str, in_block_comment: bool):
+    """Removes // and /* */ comments from one line. Returns the code and whether a block comment is still open."""
+    code = []
+    index = 0
+    while index < len(line):
+        if in_block_comment:
+            end = line.find('*/', index)
+            if end < 0:
+                return "".join(code), True
+            index = end + 2
+            in_block_comment = False
+        elif line.startswith('/*', index):
+            in_block_comment = True
+            index += 2
+        elif line.startswith('//', index):
+            break
+        else:
+            code.append(line[index])
+            index += 1
+    return "".join(code), in_block_comment
+
+
+def _include_annotations(lines: List[str], start: int) -> int:
+    while start > 1 and lines[start - 2].strip().startswith('@'):
+        start -= 1
+    return start
@@ -0,0 +1,189 @@
+import glob
+import json
+import os
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, List, Set
+from log import Log
+
+DEFAULT_REPORT_PATHS = {
+    'pytest': ['coverage.xml', 'coverage.json'],
+    'mvn': ['target/site/jacoco/jacoco.xml'],
+    'gradle': ['build/reports/jacoco/test/jacocoTestReport.xml'],
+    'npm': ['coverage/lcov.info'],
+    # swift test --enable-code-coverage exports llvm-cov JSON named after the package
+    'swift': ['.build/debug/codecov/*.json', '.build/*/debug/codecov/*.json', 'coverage.json', 'coverage.lcov'],
+}
+
+
+class FileCoverage:
+    """Line coverage of one source file."""
+
+    def __init__(self, path: str, covered_lines: Set[int], uncovered_lines: Set[int]):
+        self.path = path
+        self.covered_lines = covered_lines
+        self.uncovered_lines = uncovered_lines - covered_lines
+
+    @property
+    def percent(self) -> float:
+        total = len(self.covered_lines) + len(self.uncovered_lines)
+        return 100.0 if total == 0 else 100.0 * len(self.covered_lines) / total
+
+    def uncovered_ranges(self) -> str:
+        """Formats the uncovered lines as ranges, e.g. "3-5, 9"."""
+        ranges = []
+        for line in sorted(self.uncovered_lines):
+            if ranges and ranges[-1][1] == line - 1:
+                ranges[-1][1] = line
+            else:
+                ranges.append([line, line])
+        return ", ".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+
+class CoverageReport:
+    """
+    Line coverage parsed from the reports the supported build tools produce:
+    coverage.py XML/JSON, JaCoCo XML, lcov and llvm-cov JSON (Swift).
+    """
+
+    def __init__(self, files: Dict[str, FileCoverage]):
+        self.files = files
+        self.__by_name: Dict[str, List[FileCoverage]] = {}
+        for coverage in files.values():
+            self.__by_name.setdefault(os.path.basename(coverage.path), []).append(coverage)
+
+    def find(self, source_path: str):
+        """
+        Returns the coverage of source_path, or None when the report does not cover it.
+        Report paths may be absolute or relative to a source root, so they are matched by path suffix.
+        """
+        source_path = source_path.replace('\\', '/')
+        for coverage in self.__by_name.get(os.path.basename(source_path), []):
+            report_path = coverage.path.replace('\\', '/')
+            if report_path == source_path or report_path.endswith('/' + source_path) \
+                    or source_path.endswith('/' + report_path):
+                return coverage
+        return None
+
+    @staticmethod
+    def find_report(build_tool: str, report_path: str = "") -> str:
+        """Returns report_path, or the first existing default report of the build tool."""
+        if report_path:
+            return report_path if os.path.exists(report_path) else ""
+        for pattern in DEFAULT_REPORT_PATHS.get((build_tool or "").lower(), []):
+            matches = sorted(glob.glob(pattern))
+            if matches:
+                return matches[0]
+        return ""
+
+    @staticmethod
+    def load(path: str) -> 'CoverageReport':
+        with open(path, 'r') as f:
+            content = f.read()
+        stripped = content.lstrip()
+        if stripped.startswith('<'):
+            root = ElementTree.fromstring(content)
+            if root.tag == 'report':
+                files = CoverageReport.__parse_jacoco(root)
+            else:
+                files = CoverageReport.__parse_cobertura(root)
+        elif stripped.startswith('{'):
+            data = json.loads(content)
+            if 'data' in data:
+                files = CoverageReport.__parse_llvm_cov(data)
+            else:
+                files = CoverageReport.__parse_coverage_py_json(data)
+        else:
+            files = CoverageReport.__parse_lcov(content)
+        Log.print_green(f"Loaded coverage of {len(files)} files from {path}")
+        return CoverageReport(files)
+
+    @staticmethod
+    def __parse_cobertura(root) -> Dict[str, FileCoverage]:
+        # coverage.py XML: <class filename="..."><lines><line number="1" hits="0"/></lines></class>
+        files = {}
+        for class_element in root.iter('class'):
+            path = class_element.get('filename')
+            coverage = files.setdefault(path, FileCoverage(path, set(), set()))
+            for line in class_element.iter('line'):
+                number = int(line.get('number'))
+                if int(line.get('hits', '0')) > 0:
+                    coverage.covered_lines.add(number)
+                    coverage.uncovered_lines.discard(number)
+                elif number not in coverage.covered_lines:
+                    coverage.uncovered_lines.add(number)
+        return files
+
+    @staticmethod
+    def __parse_jacoco(root) -> Dict[str, FileCoverage]:
+        # JaCoCo XML: <package name="com/acme"><sourcefile name="Calc.java"><line nr="3" mi="0" ci="2"/>
+        files = {}
+        for package in root.iter('package'):
+            for source_file in package.iter('sourcefile'):
+                path = f"{package.get('name')}/{source_file.get('name')}"
+                covered, uncovered = set(), set()
+                for line in source_file.iter('line'):
+                    number = int(line.get('nr'))
+                    if int(line.get('ci', '0')) > 0:
+                        covered.add(number)
+                    elif int(line.get('mi', '0')) > 0:
+                        uncovered.add(number)
+                files[path] = FileCoverage(path, covered, uncovered)
+        return files
+
+    @staticmethod
+    def __parse_coverage_py_json(data) -> Dict[str, FileCoverage]:
+        return {path: FileCoverage(path, set(info.get('executed_lines', [])), set(info.get('missing_lines', [])))
+                for path, info in data.get('files', {}).items()}
+
+    @staticmethod
+    def __parse_llvm_cov(data) -> Dict[str, FileCoverage]:
+        files = {}
+        for export in data.get('data', []):
+            for file_data in export.get('files', []):
+                path = file_data['filename']
+                covered, uncovered = CoverageReport.__llvm_cov_lines(file_data.get('segments', []))
+                files[path] = FileCoverage(path, covered, uncovered)
+        return files
+
+    @staticmethod
+    def __llvm_cov_lines(segments):
+        """
+        Line coverage from llvm-cov export segments, [line, column, count, has_count, is_region_entry, is_gap_region],
+        the way llvm-cov computes it: a line is executable when a counted region starts on it or the region active
+        at its start is counted, and its count is the highest of these regions.
+        """
+        covered, uncovered = set(), set()
+        if not segments:
+            return covered, uncovered
+        wrapped = None
+        index = 0
+        for line in range(segments[0][0], segments[-1][0] + 1):
+            line_segments = []
+            while index < len(segments) and segments[index][0] == line:
+                line_segments.append(segments[index])
+                index += 1
+            starts = [segment for segment in line_segments
+                      if segment[3] and segment[4] and not (len(segment) > 5 and segment[5])]
+            skipped = line_segments and not line_segments[0][3] and line_segments[0][4]
+            if not skipped and (starts or (wrapped and wrapped[3])):
+                count = max([wrapped[2] if wrapped else 0] + [segment[2] for segment in starts])
+                (covered if count > 0 else uncovered).add(line)
+            if line_segments:
+                wrapped = line_segments[-1]
+        return covered, uncovered
+
+    @staticmethod
+    def __parse_lcov(content: str) -> Dict[str, FileCoverage]:
+        files = {}
+        path, covered, uncovered = None, set(), set()
+        for line in content.splitlines():
+            line = line.strip()
+            if line.startswith('SF:'):
+                path, covered, uncovered = line[len('SF:'):], set(), set()
+            elif line.startswith('DA:') and path:
+                number, hits = line[len('DA:'):].split(',')[:2]
+                (covered if int(hits) > 0 else uncovered).add(int(number))
+            elif line == 'end_of_record' and path:
+                files[path] = FileCoverage(path, covered, uncovered)
+                path = None
+        return files
@@ -0,0 +1,50 @@
+"""
+Entry point of the action. Runs the pipeline in this process, or, when GENERATION_DAEMON_URL is set, submits it as
+a job to a running generation_daemon.py with this working directory and environment, streams the job log and exits
+with the job's status.
+"""
+import os
+import sys
+import time
+import requests
+from log import Log
+
+POLL_SECONDS = 1.0
+
+
+def run_job(daemon_url: str) -> int:
+    daemon_url = daemon_url.rstrip('/')
+    response = requests.post(f"{daemon_url}/jobs", json={"repo": os.getcwd(), "env": dict(os.environ)}, timeout=30)
+    response.raise_for_status()
+    job = response.json()
+    Log.print_green(f"Submitted job {job['id']} to {daemon_url}")
+
+    offset = 0
+    while True:
+        job = requests.get(f"{daemon_url}/jobs/{job['id']}", timeout=30).json()
+        log = requests.get(f"{daemon_url}/jobs/{job['id']}/log", params={"offset": offset}, timeout=30).content
+        if log:
+            sys.stdout.write(log.decode('utf-8', errors='replace'))
+            sys.stdout.flush()
+            offset += len(log)
+        if job["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(POLL_SECONDS)
+
+    if job["status"] == "failed":
+        Log.print_red(f"Job {job['id']} failed: {job['error']}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    daemon_url = os.getenv('GENERATION_DAEMON_URL', '')
+    if daemon_url:
+        return run_job(daemon_url)
+    import github_test_coverage
+    github_test_coverage.main()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import ast
+import os
+import posixpath
+import re
+from collections import Counter, deque
+from typing import Dict, List, Set
+from tokens import estimate_tokens
+
+JVM_IMPORT = re.compile(r'^\s*import\s+(static\s+)?([\w.]+(?:\.\*)?)', re.MULTILINE)
+JS_IMPORT = re.compile(r'''(?:import|export)\s[^'"]*?from\s+['"]([^'"]+)['"]|import\s+['"]([^'"]+)['"]|require\(\s*['"]([^'"]+)['"]\s*\)''')
+C_INCLUDE = re.compile(r'^\s*#\s*include\s+"([^"]+)"', re.MULTILINE)
+TYPE_DECLARATION = re.compile(r'\b(?:class|interface|enum|object|record|struct|protocol|typealias)\s+([A-Z]\w*)')
+TYPE_REFERENCE = re.compile(r'\b[A-Z]\w*\b')
+
+JS_EXTENSIONS = ['.ts', '.tsx', '.js', '.jsx']
+
+
+class DependencyGraph:
+    """
+    Dependency graph of the source files, built from the imports and type references of the
+    supported languages (py, java, kt, js, ts, swift, c, h).
+    Used to give each prompt only the files the target file depends on instead of the whole repository.
+    """
+
+    def __init__(self, files: Dict[str, str], context_files: Dict[str, str] = None):
+        """files are parsed for dependencies; context_files (e.g. skeletons) are what build_context sends, if given."""
+        self.files = files
+        self.context_files = context_files or files
+        self.edges: Dict[str, Set[str]] = {file: set() for file in files}
+        self.__python_modules = self.__index_python_modules()
+        self.__declared_types = self.__index_declared_types()
+        for file, content in files.items():
+            self.edges[file] = self.__find_dependencies(file, content) - {file}
+        self.dependents = Counter(dependency for dependencies in self.edges.values() for dependency in dependencies)
+
+    def neighbourhood(self, file: str, max_depth: int) -> List[str]:
+        """Returns the transitive dependencies of file up to max_depth, nearest first."""
+        visited = {file}
+        ordered = []
+        queue = deque([(file, 0)])
+        while queue:
+            current, depth = queue.popleft()
+            if depth >= max_depth:
+                continue
+            for dependency in sorted(self.edges.get(current, ())):
+                if dependency not in visited:
+                    visited.add(dependency)
+                    ordered.append(dependency)
+                    queue.append((dependency, depth + 1))
+        return ordered
+
+    def build_context(self, file: str, max_depth: int, token_budget: int, separator: str) -> str:
+        """
+        Concatenates the neighbourhood of file, picked nearest first while they fit in token_budget.
+        The picked files are emitted most depended-upon first, so prompts of different files share long prefixes
+        for provider-side prompt caching.
+        """
+        return self.__join_context(self.neighbourhood(file, max_depth), token_budget, separator)
+
+    def build_batch_context(self, files: List[str], max_depth: int, token_budget: int, separator: str) -> str:
+        """Like build_context, for the union of the neighbourhoods of files; the files themselves are left out."""
+        dependencies = []
+        for file in files:
+            dependencies += [dependency for dependency in self.neighbourhood(file, max_depth)
+                             if dependency not in files and dependency not in dependencies]
+        return self.__join_context(dependencies, token_budget, separator)
+
+    def __join_context(self, dependencies: List[str], token_budget: int, separator: str) -> str:
+        context = []
+        used_tokens = 0
+        for dependency in dependencies:
+            entry = f'File: {dependency}{separator}{self.context_files.get(dependency, self.files[dependency])}'
+            tokens = estimate_tokens(entry)
+            if used_tokens + tokens > token_budget:
+                continue
+            context.append((dependency, entry))
+            used_tokens += tokens
+        context.sort(key=lambda item: (-self.dependents[item[0]], item[0]))
+        return separator.join(entry for _, entry in context)
+
+    def __find_dependencies(self, file: str, content: str) -> Set[str]:
+        extension = os.path.splitext(file)[1]
+        if extension == '.py':
+            return self.__python_dependencies(file, content)
+        elif extension in ('.java', '.kt'):
+            return self.__jvm_dependencies(file, content) | self.__type_references(file, content, same_package=True)
+        elif extension in JS_EXTENSIONS:
+            return self.__js_dependencies(file, content)
+        elif extension == '.swift':
+            # Swift files of a module see each other without imports
+            return self.__type_references(file, content, same_package=False)
+        elif extension in ('.c', '.h'):
+            return self.__c_dependencies(file, content)
+        return set()
+
+    def __index_python_modules(self) -> Dict[str, str]:
+        modules = {}
+        for file in self.files:
+            if not file.endswith('.py'):
+                continue
+            parts = file[:-len('.py')].split('/')
+            if parts[-1] == '__init__':
+                parts = parts[:-1]
+            # Register every suffix so both "src.pkg.mod" and "pkg.mod" resolve
+            for start in range(len(parts)):
+                modules.setdefault('.'.join(parts[start:]), file)
+        return modules
+
+    def __index_declared_types(self) -> Dict[str, Set[str]]:
+        declared_types = {}
+        for file, content in self.files.items():
+            if os.path.splitext(file)[1] not in ('.java', '.kt', '.swift'):
+                continue
+            for name in TYPE_DECLARATION.findall(content):
+                declared_types.setdefault(name, set()).add(file)
+        return declared_types
+
+    def __python_dependencies(self, file: str, content: str) -> Set[str]:
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError):
+            return set()
+
+        package = posixpath.dirname(file).split('/') if posixpath.dirname(file) else []
+        candidates = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                candidates.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                module_parts = node.module.split('.') if node.module else []
+                if node.level:
+                    base = package[:len(package) - (node.level - 1)] if node.level > 1 else package
+                    module_parts = base + module_parts
+                module = '.'.join(module_parts)
+                candidates.append(module)
+                # "from pkg import mod" imports a module, not just a name
+                candidates.extend(f'{module}.{alias.name}' if module else alias.name
+                                  for alias in node.names if alias.name != '*')
+        return {self.__python_modules[candidate] for candidate in candidates if candidate in self.__python_modules}
+
+    def __jvm_dependencies(self, file: str, content: str) -> Set[str]:
+        dependencies = set()
+        for is_static, imported in JVM_IMPORT.findall(content):
+            path = imported.replace('.', '/')
+            if path.endswith('/*'):
+                candidates = [posixpath.dirname(path)] if is_static else []
+                directory = path[:-len('/*')]
+                dependencies.update(other for other in self.files
+                                    if self.__has_path_suffix(posixpath.dirname(other), directory))
+            else:
+                # Static imports name a member, so the file is named after the enclosing class
+                candidates = [posixpath.dirname(path)] if is_static else [path]
+            for candidate in candidates:
+                dependencies.update(other for other in self.files
+                                    if self.__has_path_suffix(os.path.splitext(other)[0], candidate))
+        return dependencies
+
+    @staticmethod
+    def __has_path_suffix(path: str, suffix: str) -> bool:
+        return path == suffix or path.endswith('/' + suffix)
+
+    def __type_references(self, file: str, content: str, same_package: bool) -> Set[str]:
+        dependencies = set()
+        directory = posixpath.dirname(file)
+        for name in set(TYPE_REFERENCE.findall(content)):
+            for other in self.__declared_types.get(name, ()):
+                if not same_package or posixpath.dirname(other) == directory:
+                    dependencies.add(other)
+        return dependencies
+
+    def __js_dependencies(self, file: str, content: str) -> Set[str]:
+        dependencies = set()
+        directory = posixpath.dirname(file)
+        for groups in JS_IMPORT.findall(content):
+            specifier = next(group for group in groups if group)
+            if not specifier.startswith('.'):
+                continue
+            base = posixpath.normpath(posixpath.join(directory, specifier))
+            candidates = [base] + [base + ext for ext in JS_EXTENSIONS] + \
+                         [f'{base}/index{ext}' for ext in JS_EXTENSIONS]
+            for candidate in candidates:
+                if candidate in self.files:
+                    dependencies.add(candidate)
+                    break
+        return dependencies
+
+    def __c_dependencies(self, file: str, content: str) -> Set[str]:
+        dependencies = set()
+        directory = posixpath.dirname(file)
+        for include in C_INCLUDE.findall(content):
+            local = posixpath.normpath(posixpath.join(directory, include))
+            if local in self.files:
+                dependencies.add(local)
+            else:
+                dependencies.update(other for other in self.files if other.endswith('/' + include))
+        # A source file depends on the header declaring it
+        header = os.path.splitext(file)[0] + '.h'
+        if file.endswith('.c') and header in self.files:
+            dependencies.add(header)
+        return dependencies
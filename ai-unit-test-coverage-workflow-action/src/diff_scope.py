@@ -0,0 +1,113 @@
+import os
+import re
+from typing import Dict, List, NamedTuple, Set
+from code_symbols import Symbol, find_symbols, symbol_source
+
+HUNK_HEADER = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@')
+DIFF_FILE_HEADER = re.compile(r'^diff --git a/(.+?) b/(.+)$', re.MULTILINE)
+
+# Above this share of the file, sending the changed symbols is not worth it
+MAX_SCOPED_RATIO = 0.8
+
+
+class DiffScope(NamedTuple):
+    """The part of a source file and of its unit test that a PR touches."""
+    code: str
+    unit_test: str
+    symbols: List[str]
+
+
+def split_diff_by_file(diff: str) -> Dict[str, str]:
+    """Splits the output of a multi-file git diff into one diff per (new) file path."""
+    diffs = {}
+    headers = list(DIFF_FILE_HEADER.finditer(diff))
+    for index, header in enumerate(headers):
+        end = headers[index + 1].start() if index + 1 < len(headers) else len(diff)
+        diffs[header.group(2)] = diff[header.start():end]
+    return diffs
+
+
+def parse_changed_lines(diff: str) -> Set[int]:
+    """
+    Returns the line numbers of the new file touched by the diff: added lines,
+    and the line following each deletion.
+    """
+    changed_lines = set()
+    new_line = None
+    for line in diff.splitlines():
+        hunk = HUNK_HEADER.match(line)
+        if hunk:
+            new_line = int(hunk.group(1))
+            continue
+        if new_line is None or line.startswith('\\'):
+            continue
+        if line.startswith('+'):
+            changed_lines.add(new_line)
+            new_line += 1
+        elif line.startswith('-'):
+            changed_lines.add(new_line)
+        else:
+            new_line += 1
+    return changed_lines
+
+
+def find_changed_symbols(symbols: List[Symbol], changed_lines: Set[int]) -> List[Symbol]:
+    """Maps changed lines to their innermost enclosing functions, in file order."""
+    functions = [symbol for symbol in symbols if symbol.kind == 'function']
+    changed = []
+    for line in sorted(changed_lines):
+        enclosing = [symbol for symbol in functions if symbol.start <= line <= symbol.end]
+        if not enclosing:
+            continue
+        innermost = min(enclosing, key=lambda symbol: symbol.end - symbol.start)
+        if innermost not in changed:
+            changed.append(innermost)
+    return sorted(changed, key=lambda symbol: symbol.start)
+
+
+def find_related_tests(test_content: str, extension: str, names: List[str]) -> str:
+    """
+    Returns the header (imports, fixtures) of the test file followed by the tests that mention any of names.
+    """
+    if not test_content:
+        return ""
+    symbols = find_symbols(test_content, extension)
+    if not symbols:
+        return test_content
+
+    lines = test_content.splitlines()
+    header = "\n".join(lines[:symbols[0].start - 1]).rstrip()
+    pattern = re.compile(r'\b(?:' + "|".join(re.escape(name) for name in names) + r')\b', re.IGNORECASE)
+    related = [symbol_source(test_content, symbol) for symbol in symbols
+               if symbol.kind == 'function' and pattern.search(symbol_source(test_content, symbol))
+               and not _is_nested_in_function(symbol, symbols)]
+    return "\n\n".join([header] + related) if header else "\n\n".join(related)
+
+
+def build_diff_scope(file: str, content: str, diff: str, test_content: str):
+    """
+    Builds the prompt inputs for a PR change: only the functions enclosing the diff hunks
+    and the existing tests that exercise them. Returns None when the whole file should be sent instead.
+    """
+    changed_lines = parse_changed_lines(diff)
+    if not changed_lines:
+        return None
+
+    extension = os.path.splitext(file)[1]
+    changed = find_changed_symbols(find_symbols(content, extension), changed_lines)
+    if not changed:
+        return None
+    if sum(symbol.end - symbol.start + 1 for symbol in changed) > MAX_SCOPED_RATIO * len(content.splitlines()):
+        return None
+
+    comment = '#' if extension == '.py' else '//'
+    code = "\n\n".join(f"{comment} {symbol.qualified_name} (lines {symbol.start}-{symbol.end} of {file})\n"
+                       f"{symbol_source(content, symbol)}" for symbol in changed)
+    names = sorted({symbol.name for symbol in changed})
+    return DiffScope(code, find_related_tests(test_content, extension, names),
+                     [symbol.qualified_name for symbol in changed])
+
+
+def _is_nested_in_function(symbol: Symbol, symbols: List[Symbol]) -> bool:
+    return any(other is not symbol and other.kind == 'function' and other.start <= symbol.start
+               and symbol.end <= other.end for other in symbols)
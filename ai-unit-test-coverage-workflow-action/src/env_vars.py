@@ -21,10 +21,73 @@ class EnvVars:
         self.generate_mode = os.getenv('GENERATE_MODE')
         self.src_path = os.getenv('SRC_PATH')
         self.test_path = os.getenv('TEST_PATH')
+        self.max_concurrency = int(os.getenv('MAX_CONCURRENCY', '1'))
+        self.context_depth = int(os.getenv('CONTEXT_DEPTH', '2'))
+        self.context_token_budget = int(os.getenv('CONTEXT_TOKEN_BUDGET', '16000'))
+        self.context_skeletons = os.getenv('CONTEXT_SKELETONS', 'true').lower() == 'true'
+        self.http_connect_timeout = float(os.getenv('HTTP_CONNECT_TIMEOUT', '10'))
+        self.http_read_timeout = float(os.getenv('HTTP_READ_TIMEOUT', '300'))
+        self.http_max_retries = int(os.getenv('HTTP_MAX_RETRIES', '5'))
+        self.rate_limit_rpm = int(os.getenv('RATE_LIMIT_RPM', '0'))
+        self.rate_limit_tpm = int(os.getenv('RATE_LIMIT_TPM', '0'))
+        self.max_output_tokens = int(os.getenv('MAX_OUTPUT_TOKENS', '0'))
+        self.generation_timeout = float(os.getenv('GENERATION_TIMEOUT', '0'))
+        self.diff_scoped = os.getenv('DIFF_SCOPED', 'true').lower() == 'true'
+        self.coverage_report = os.getenv('COVERAGE_REPORT', '')
+        self.coverage_threshold = float(os.getenv('COVERAGE_THRESHOLD', '80'))
+        self.validate_tests = os.getenv('VALIDATE_TESTS', 'true').lower() == 'true'
+        # By default only for build tools that run one test file in seconds; mvn, gradle, sbt and swift would run a
+        # whole build tool invocation per generated file
+        run_affected_tests = os.getenv('RUN_AFFECTED_TESTS', '')
+        self.run_affected_tests = (run_affected_tests.lower() == 'true' if run_affected_tests
+                                   else (self.build_tool or '').lower() in ('pytest', 'npm'))
+        self.max_repair_attempts = int(os.getenv('MAX_REPAIR_ATTEMPTS', '2'))
+        self.validation_timeout = float(os.getenv('VALIDATION_TIMEOUT', '600'))
+        self.build_scope = os.getenv('BUILD_SCOPE', 'affected').lower()
+        self.build_timeout = float(os.getenv('BUILD_TIMEOUT', '3600'))
+        self.build_log = os.getenv('BUILD_LOG', '')
+        self.cache_dir = os.getenv('CACHE_DIR', '')
+        self.cache_max_mb = int(os.getenv('CACHE_MAX_MB', '512'))
+        self.cache_max_age_days = int(os.getenv('CACHE_MAX_AGE_DAYS', '30'))
+        self.chunk_token_threshold = int(os.getenv('CHUNK_TOKEN_THRESHOLD', '8000'))
+        self.chunk_tokens = int(os.getenv('CHUNK_TOKENS', '3000'))
+        self.batch_token_budget = int(os.getenv('BATCH_TOKEN_BUDGET', '0'))
+        self.batch_max_files = int(os.getenv('BATCH_MAX_FILES', '8'))
+        self.batch_max_file_tokens = int(os.getenv('BATCH_MAX_FILE_TOKENS', '1000'))
+        self.prompt_cache_ttl = int(os.getenv('PROMPT_CACHE_TTL', '0'))
+        self.prompt_cache_min_tokens = int(os.getenv('PROMPT_CACHE_MIN_TOKENS', '1024'))
+        self.run_report = os.getenv('RUN_REPORT', '')
+        self.run_report_format = os.getenv('RUN_REPORT_FORMAT', 'json').lower()
+        self.shard_index = int(os.getenv('SHARD_INDEX', '0'))
+        self.shard_total = int(os.getenv('SHARD_TOTAL', '1'))
+        self.shard_dir = os.getenv('SHARD_DIR', '.ai-unit-test-shard')
+        self.journal_dir = os.getenv('JOURNAL_DIR', '')
+        self.push_every = int(os.getenv('PUSH_EVERY', '0'))
+        self.skip_unchanged = os.getenv('SKIP_UNCHANGED', 'true').lower() == 'true'
+        self.max_tokens = int(os.getenv('MAX_TOKENS', '0'))
+        self.deadline_seconds = float(os.getenv('DEADLINE_SECONDS', '0'))
+        self.bots = [bot.strip().lower() for bot in self.bot.split(",") if bot.strip()]
+        self.bot_route_tokens = int(os.getenv('BOT_ROUTE_TOKENS', '0'))
+        self.hedge_percentile = float(os.getenv('HEDGE_PERCENTILE', '95'))
 
         if len(self.target_extensions) == 0:
             raise ValueError(f"Please specify TARGET_EXTENSIONS. Coma separated, could be, like: kt,java,py,js,swift,c,h. Only these files will be reviewed")
 
+        if len(self.bots) == 0:
+            raise ValueError("Please specify BOT, e.g. gemini, or a comma-separated list of backends like ollama,gemini")
+
+        if self.max_concurrency < 1:
+            raise ValueError(f"MAX_CONCURRENCY must be at least 1, got {self.max_concurrency}")
+
+        if self.build_scope not in ('affected', 'full'):
+            raise ValueError(f"BUILD_SCOPE must be affected or full, got {self.build_scope}")
+
+        if self.run_report_format not in ('json', 'chrome'):
+            raise ValueError(f"RUN_REPORT_FORMAT must be json or chrome, got {self.run_report_format}")
+
+        if self.shard_total < 1 or not 0 <= self.shard_index < self.shard_total:
+            raise ValueError(f"SHARD_INDEX must be between 0 and SHARD_TOTAL - 1, got {self.shard_index} of {self.shard_total}")
+
         self.env_vars = {
             "owner" : self.owner,
             "repo" : self.repo,
@@ -39,6 +102,12 @@ class EnvVars:
             "test_path" : self.test_path
         }
 
+    def backend(self, bot: str):
+        """URL, key and model of one backend of BOT: {BOT}_URL, {BOT}_KEY and {BOT}_MODEL, or the LLM_* defaults."""
+        prefix = bot.upper()
+        return (os.getenv(f'{prefix}_URL') or self.llm_url, os.getenv(f'{prefix}_KEY') or self.llm_token,
+                os.getenv(f'{prefix}_MODEL') or self.llm_model)
+
     def check_vars(self):
         missing_vars = [var for var, value in self.env_vars.items() if not value]
         if missing_vars:
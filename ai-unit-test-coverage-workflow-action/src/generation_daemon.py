@@ -0,0 +1,307 @@
+"""
+Long-running generation server for self-hosted runners.
+
+Accepts jobs (a repository path and the environment of the action) over localhost HTTP, and runs
+`github_test_coverage.main()` for them in a pool of worker processes. Each worker keeps its bot clients, HTTP pools,
+skeleton index and dependency graphs warm between jobs. Queued jobs are taken round-robin across repositories, with
+at most one running job per repository and --workers jobs overall.
+
+    python src/generation_daemon.py --port 8765 --workers 4 --log-dir /tmp/ai-unit-test-jobs
+
+`daemon_client.py` submits a job with its working directory and environment, streams the job log and exits with
+the job's status.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from log import Log
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    def __init__(self, job_id: str, repo: str, env: Dict[str, str], log_path: str):
+        self.id = job_id
+        self.repo = repo
+        self.env = env
+        self.log_path = log_path
+        self.status = QUEUED
+        self.error = ""
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "repo": self.repo, "status": self.status, "error": self.error,
+                "submitted": self.submitted, "started": self.started, "finished": self.finished}
+
+
+class FairQueue:
+    """Queued jobs per repository, taken round-robin across the repositories that have no running job."""
+
+    def __init__(self):
+        self.__queues: Dict[str, deque] = OrderedDict()
+
+    def push(self, job: Job):
+        self.__queues.setdefault(job.repo, deque()).append(job)
+
+    def pop(self, busy_repos) -> Optional[Job]:
+        for repo in list(self.__queues):
+            if repo in busy_repos:
+                continue
+            queue = self.__queues.pop(repo)
+            job = queue.popleft()
+            if queue:
+                # Back of the rotation, behind the repositories that waited
+                self.__queues[repo] = queue
+            return job
+        return None
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.__queues.values())
+
+
+class GenerationDaemon:
+    """Runs submitted jobs in `workers` long-lived worker processes, fairly across repositories."""
+
+    def __init__(self, workers: int, log_dir: str):
+        self.workers = workers
+        self.log_dir = log_dir
+        self.__jobs: Dict[str, Job] = {}
+        self.__queue = FairQueue()
+        self.__running: Dict[str, Job] = {}
+        self.__ids = itertools.count(1)
+        self.__lock = threading.Lock()
+        # Worker processes and their task queues, by index
+        self.__workers = []
+        self.__tasks = []
+        # Job assigned to each busy worker, by index; set on dispatch, so a worker that dies always fails its job
+        self.__worker_jobs: Dict[int, Job] = {}
+        os.makedirs(log_dir, exist_ok=True)
+
+    def start(self):
+        # Workers are spawned rather than forked, since the server threads are already running. They are not
+        # daemonic processes, so a job can still start its syntax-check process pool.
+        self.__context = multiprocessing.get_context("spawn")
+        self.__results = self.__context.Queue()
+        self.__tasks = [self.__context.Queue() for _ in range(self.workers)]
+        self.__workers = [self.__start_worker(index) for index in range(self.workers)]
+        self.__collector = threading.Thread(target=self.__collect, daemon=True)
+        self.__collector.start()
+        return self
+
+    def stop(self):
+        for tasks in self.__tasks:
+            tasks.put(None)
+        for worker in self.__workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self.__results.put(None)
+        self.__collector.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def submit(self, repo: str, env: Dict[str, str]) -> Job:
+        with self.__lock:
+            job_id = f"{next(self.__ids)}-{int(time.time())}"
+            job = Job(job_id, os.path.realpath(repo), env, os.path.join(self.log_dir, f"{job_id}.log"))
+            self.__jobs[job_id] = job
+            self.__queue.push(job)
+            Log.print_green(f"Queued job {job_id} for {job.repo} ({len(self.__queue)} queued)")
+        self.__dispatch()
+        return job
+
+    def job(self, job_id: str) -> Optional[Job]:
+        with self.__lock:
+            return self.__jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        with self.__lock:
+            return list(self.__jobs.values())
+
+    def __dispatch(self):
+        with self.__lock:
+            idle = [index for index in range(len(self.__workers)) if index not in self.__worker_jobs]
+            while idle:
+                job = self.__queue.pop(self.__running.keys())
+                if not job:
+                    return
+                index = idle.pop(0)
+                job.status = RUNNING
+                job.started = time.time()
+                self.__running[job.repo] = job
+                self.__worker_jobs[index] = job
+                Log.print_green(f"Starting job {job.id} for {job.repo} on worker {index}")
+                self.__tasks[index].put((job.id, job.repo, job.env, job.log_path))
+
+    def __start_worker(self, index: int):
+        worker = self.__context.Process(target=_worker_loop, args=(index, self.__tasks[index], self.__results),
+                                        daemon=False)
+        worker.start()
+        return worker
+
+    def __collect(self):
+        while True:
+            try:
+                message = self.__results.get(timeout=1)
+            except queue.Empty:
+                self.__replace_dead_workers()
+                continue
+            if message is None:
+                return
+            index, error = message
+            with self.__lock:
+                job = self.__worker_jobs.pop(index)
+            self.__finish(job, error)
+
+    def __replace_dead_workers(self):
+        for index, worker in enumerate(self.__workers):
+            if worker.is_alive():
+                continue
+            Log.print_red(f"Worker {index} exited with {worker.exitcode}, starting a new one")
+            with self.__lock:
+                # A fresh queue: the dead worker may have left the old one in an unusable state
+                self.__tasks[index] = self.__context.Queue()
+                self.__workers[index] = self.__start_worker(index)
+                job = self.__worker_jobs.pop(index, None)
+            if job:
+                # Not requeued: a job that crashed its worker would likely crash the next one
+                self.__finish(job, f"worker exited with {worker.exitcode}")
+
+    def __finish(self, job: Job, error: str):
+        with self.__lock:
+            job.status = FAILED if error else SUCCEEDED
+            job.error = error or ""
+            job.finished = time.time()
+            del self.__running[job.repo]
+            Log.print_green(f"Job {job.id} {job.status} in {job.finished - job.started:.1f}s")
+        self.__dispatch()
+
+
+def _worker_loop(index: int, tasks, results):
+    # Imported once per worker; later jobs reuse the imported SDKs and the objects kept in WarmCache
+    import github_test_coverage  # noqa: F401
+    from warm_cache import WarmCache
+    WarmCache.enabled = True
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        _, repo, env, log_path = task
+        results.put((index, _run_job(repo, env, log_path)))
+
+
+def _run_job(repo: str, env: Dict[str, str], log_path: str) -> str:
+    """Runs the pipeline in repo with the job's environment; returns an error message, or an empty string."""
+    import github_test_coverage
+    os.environ.clear()
+    os.environ.update(env)
+    Log.json_lines = os.getenv('LOG_FORMAT', '').lower() == 'json'
+    with open(log_path, 'w', buffering=1) as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            os.chdir(repo)
+            github_test_coverage.main()
+            return ""
+        except BaseException as e:
+            traceback.print_exc()
+            return f"{type(e).__name__}: {e}"
+
+
+def make_handler(daemon: GenerationDaemon):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if urlparse(self.path).path != "/jobs":
+                return self.__reply(404, {"error": "not found"})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                repo, env = body["repo"], body.get("env", {})
+            except (ValueError, KeyError) as e:
+                return self.__reply(400, {"error": f"invalid job: {e}"})
+            if not os.path.isdir(repo):
+                return self.__reply(400, {"error": f"repository {repo} does not exist"})
+            self.__reply(202, daemon.submit(repo, env).to_dict())
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            if parts == ["jobs"]:
+                return self.__reply(200, [job.to_dict() for job in daemon.jobs()])
+            job = daemon.job(parts[1]) if len(parts) >= 2 and parts[0] == "jobs" else None
+            if not job:
+                return self.__reply(404, {"error": "not found"})
+            if parts[2:] == ["log"]:
+                offset = int(parse_qs(url.query).get("offset", ["0"])[0])
+                return self.__reply_log(job, offset)
+            self.__reply(200, job.to_dict())
+
+        def __reply(self, status: int, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def __reply_log(self, job: Job, offset: int):
+            data = b""
+            if os.path.exists(job.log_path):
+                with open(job.log_path, 'rb') as f:
+                    f.seek(offset)
+                    data = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on; jobs carry tokens, keep it local")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="jobs running at the same time")
+    parser.add_argument("--log-dir", default=os.path.join(os.getcwd(), "ai-unit-test-jobs"), help="job logs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with GenerationDaemon(args.workers, args.log_dir) as daemon:
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(daemon))
+        server.daemon_threads = True
+        Log.print_green(f"Generation daemon listening on http://{args.host}:{server.server_address[1]} "
+                        f"with {args.workers} workers")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
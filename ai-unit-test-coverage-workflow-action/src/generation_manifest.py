@@ -0,0 +1,81 @@
+import json
+import os
+from typing import Dict, NamedTuple
+from log import Log
+
+# Kept in TEST_PATH and committed with the unit tests, so the next run of any runner finds it in its checkout
+MANIFEST_FILE = ".ai-unit-test-manifest.json"
+
+MANIFEST_VERSION = 1
+
+
+class ManifestEntry(NamedTuple):
+    """The inputs a unit test was generated from: source and unit test blob SHAs, bot, model and prompt version."""
+    test_file: str
+    source_sha: str
+    test_sha: str
+    bot: str
+    model: str
+    prompt_version: str
+
+
+class GenerationManifest:
+    """
+    The unit tests generated for each source file, with the inputs they were generated from. A FULL run only
+    generates again the files whose source or unit test changed since, or that were generated by another bot, model
+    or prompt version.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.unchanged = 0
+        self.__entries: Dict[str, ManifestEntry] = self.__load(path)
+        self.__recorded: Dict[str, ManifestEntry] = {}
+
+    def is_current(self, file: str, entry: ManifestEntry) -> bool:
+        """True when the unit test of file was generated from the same inputs as entry."""
+        if self.__entries.get(file) != entry:
+            return False
+        self.unchanged += 1
+        return True
+
+    def record(self, file: str, entry: ManifestEntry):
+        self.__entries[file] = entry
+        self.__recorded[file] = entry
+
+    def merge(self, path: str):
+        """Adds the entries recorded by another run, e.g. the shard jobs of a sharded run."""
+        for file, entry in self.__load(path).items():
+            self.record(file, entry)
+
+    def save(self, path: str = None, recorded_only: bool = False):
+        """Writes the manifest to path (its own path by default), sorted so unchanged entries give no diff."""
+        path = path or self.path
+        if recorded_only:
+            entries = self.__recorded
+        else:
+            # Drops the source files deleted since they were generated
+            entries = {file: entry for file, entry in self.__entries.items() if os.path.exists(file)}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({"version": MANIFEST_VERSION,
+                       "files": {file: entries[file]._asdict() for file in sorted(entries)}}, f, indent=2)
+            f.write("\n")
+        Log.print_green(f"Generation manifest: {self.unchanged} files unchanged, {len(self.__recorded)} files "
+                        f"recorded, saved to {path}")
+
+    @staticmethod
+    def __load(path: str) -> Dict[str, ManifestEntry]:
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get("version") != MANIFEST_VERSION:
+                Log.print_yellow(f"Ignoring generation manifest {path} of version {manifest.get('version')}")
+                return {}
+            return {file: ManifestEntry(**entry) for file, entry in manifest["files"].items()}
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            # e.g. a merge conflict left in the committed file; every file is generated again
+            Log.print_yellow(f"Ignoring unreadable generation manifest {path}:", e)
+            return {}
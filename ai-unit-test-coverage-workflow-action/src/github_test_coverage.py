@@ -1,9 +1,39 @@
+import contextlib
+import hashlib
 import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from ai.ai_bot import AiBot
+from ai.http_transport import HttpTransport, RateLimiter
+from ai.stream_guard import StreamGuard
+from batching import BatchItem, plan_batches, split_batch_response
+from build_commands import get_affected_tests_command
+from build_runner import BuildResult, run_build
+from chunking import ChunkPlan, split_into_chunks
+from coverage_report import CoverageReport
+from dependency_graph import DependencyGraph
+from diff_scope import DiffScope, build_diff_scope, split_diff_by_file
 from env_vars import EnvVars
+from generation_manifest import MANIFEST_FILE, GenerationManifest, ManifestEntry
 from git import Git
+from instrumentation import Instrumentation
 from log import Log
+from repo_snapshot import RepoSnapshot
+from run_journal import RunJournal
+from scheduler import Scheduler, WorkEstimate
+from sharding import export_shard, import_shards, shard_files, shard_manifest_path, shard_manifests
+from skeleton_index import SkeletonIndex, git_blob_sha
+from tokens import estimate_tokens
+from unit_test_merge import merge_test_files
+from unit_test_validator import check_syntax, run_test_file, strip_markdown_fences, without_candidates_in_tree
+from warm_cache import WarmCache
 
+snapshot = None
+# Bounds the LLM requests in flight to MAX_CONCURRENCY, including the chunks of large files and the repairs
+llm_slots = contextlib.nullcontext()
 separator = "\n\n----------------------------------------------------------------------\n\n"
 def get_unit_test_file_path(file_path: str, src_path: str, test_path: str) -> str:
     if not file_path.startswith(src_path):
@@ -32,9 +62,12 @@ def get_unit_test_file_path(file_path: str, src_path: str, test_path: str) -> st
 
 def overwrite_unit_test_file(file_path: str, content: str):
     Log.print_green("Overwriting unit test file", file_path)
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, 'w') as f:
-        f.write(content)
+    with Instrumentation.span("file.write", path=file_path, bytes=len(content)):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as f:
+            f.write(content)
+    if snapshot:
+        snapshot.invalidate(file_path)
 
 def get_build_and_test_command(build_tool: str) -> str:
     build_tool = build_tool.lower()
@@ -45,7 +78,7 @@ def get_build_and_test_command(build_tool: str) -> str:
     elif build_tool == 'npm':
         return 'npm test -- --coverage'
     elif build_tool == 'pytest':
-        return 'pytest --cov=src tests/'
+        return 'pytest --cov=src --cov-report=term --cov-report=xml tests/'
     elif build_tool == 'swift':
         return 'swift test --enable-code-coverage'
     elif build_tool == 'sbt':
@@ -54,34 +87,44 @@ def get_build_and_test_command(build_tool: str) -> str:
         Log.print_yellow(f"Unknown build tool: {build_tool}. No build will be run.")
         return ""
 
-def build_and_run_unit_tests_coverage():
+def build_and_run_unit_tests_coverage(test_files: List[str] = None) -> Optional[BuildResult]:
+    """
+    Runs the unit tests with coverage. With BUILD_SCOPE=affected and test_files given, only those test files run,
+    without cleaning; with BUILD_SCOPE=full, the whole clean build.
+    """
     Log.print_green("Building and running unit tests coverage...")
-    command = get_build_and_test_command(vars.build_tool)
+    if vars.build_scope == "affected" and test_files is not None:
+        if not test_files:
+            Log.print_yellow("No unit test files written, skipping the build")
+            return None
+        command = get_affected_tests_command(vars.build_tool, sorted(set(test_files)))
+    else:
+        command = get_build_and_test_command(vars.build_tool)
     if not command:
-        return
-
-    report_file = "coverage_report.txt"
-    full_command = f"{command} > {report_file} 2>&1"
+        return None
 
-    Log.print_green(f"Using build command: {full_command}")
-    return_code = os.system(full_command)
+    Log.print_green(f"Using build command: {command}")
+    with Instrumentation.span("build", command=command) as span:
+        result = run_build(command, vars.build_timeout, vars.build_log)
+        span.update(return_code=result.return_code, timed_out=result.timed_out,
+                    coverage_percent=result.coverage_percent, failing_tests=len(result.failing_tests))
 
-    if os.path.exists(report_file):
-        with open(report_file, 'r') as f:
-            coverage_report = f.read()
-        Log.print_green("--- Coverage Report ---")
-        # We use print directly here to preserve formatting
-        print(coverage_report)
-        Log.print_green("-----------------------")
-        os.remove(report_file)  # Clean up
-
-    if return_code != 0:
+    if result.coverage_percent is not None:
+        Log.print_green(f"Coverage: {result.coverage_percent:.1f}%")
+    if result.failing_tests:
+        Log.print_red(f"{len(result.failing_tests)} failing tests:", ", ".join(result.failing_tests))
+    if result.timed_out:
+        Log.print_red(f"Build timed out after {vars.build_timeout}s.")
+    elif not result.passed:
         Log.print_red("Unit tests failed or coverage failed.")
     else:
         Log.print_green("Unit tests passed.")
+    return result
 
 def get_file_content(file)-> str:
     try:
+        if snapshot:
+            return snapshot.read_file(file)
         with open(file, 'r') as file_opened:
             file_content = file_opened.read()
             return file_content
@@ -89,81 +132,657 @@ def get_file_content(file)-> str:
         Log.print_yellow("File not found in the PR.", file)
         return ""
 
-def main():
-    global vars
-    vars = EnvVars()
-    vars.check_vars()
+def validate_and_repair(ai, unit_test_file: str, content: str, code: str, all_source_files_content: str,
+                        hints: List[str], syntax_checker: Executor, existing_unit_test: str = None) -> str:
+    """
+    Strips markdown fences, checks the syntax in a worker process and runs only the affected test file.
+    Failures are fed back to the bot up to MAX_REPAIR_ATTEMPTS times; returns "" when the file stays broken.
+    With an existing_unit_test (diff-scoped results), repaired replies are merged into it like the first reply.
+    """
+    for attempt in range(vars.max_repair_attempts + 1):
+        content = strip_markdown_fences(content)
+        with Instrumentation.span("validate.syntax", path=unit_test_file):
+            error = syntax_checker.submit(check_syntax, unit_test_file, content).result()
+        if not error and vars.run_affected_tests:
+            with Instrumentation.span("validate.run", path=unit_test_file):
+                error = run_test_file(vars.build_tool, unit_test_file, content, vars.validation_timeout)
+        if not error:
+            return content
+
+        Log.print_yellow(f"Validation of {unit_test_file} failed (attempt {attempt + 1}):", error.strip().splitlines()[-1])
+        if attempt == vars.max_repair_attempts:
+            break
+        repair_hints = hints + [f"The previous version of the unit test file failed validation with:\n{error}\n" +
+                                ("Fix it and return the corrected tests." if existing_unit_test is not None else
+                                 "Fix it and return the complete corrected unit test file.")]
+        with llm_slots:
+            content = ai.ai_generate_test_coverage(code=code, unit_test=content, all_source_files=all_source_files_content, unit_test_file_path=unit_test_file, hints="\n".join(repair_hints))
+        if content and existing_unit_test is not None:
+            content = merge_test_files(existing_unit_test, strip_markdown_fences(content),
+                                       os.path.splitext(unit_test_file)[1])
+        if not content:
+            break
+
+    Log.print_red(f"Dropping {unit_test_file}, it still fails validation")
+    return ""
+
+class UnitTestRequest(NamedTuple):
+    """A source file prepared for generation: what is sent to the bot, and the existing test the result replaces."""
+    file: str
+    unit_test_file: str
+    existing_unit_test: str
+    code: str
+    unit_test: str
+    hints: List[str]
+    diff_scope: Optional[DiffScope]
+    chunk_plan: Optional[ChunkPlan] = None
+
+def prepare_unit_test_request(file: str, diff: str = "", coverage_report: CoverageReport = None) -> Optional[UnitTestRequest]:
+    """
+    Reads a source file and its existing unit test, and decides what to send for it.
+    When a diff is given, only the changed symbols are sent and the result is merged into the existing test.
+    When a coverage report is given, well-covered files are skipped and uncovered lines are pointed out.
+    Returns None when the file is skipped.
+    """
+    Log.print_green("Checking file", file)
+
+    _, file_extension = os.path.splitext(file)
+    file_extension = file_extension.lstrip('.')
+    if file_extension not in vars.target_extensions:
+        Log.print_yellow(f"Skipping, unsupported extension {file_extension} file {file}")
+        return None
+
+    file_coverage = coverage_report.find(file) if coverage_report else None
+    if file_coverage and file_coverage.percent >= vars.coverage_threshold:
+        Log.print_yellow(f"Skipping {file}, coverage {file_coverage.percent:.1f}% is above {vars.coverage_threshold}%")
+        return None
+
+    file_content = get_file_content(file)
+    if not file_content:
+        return None
+
+    unit_test_file_content=""
+    unit_test_file = get_unit_test_file_path(file_path=file, src_path=vars.src_path, test_path=vars.test_path)
+    if not unit_test_file:
+        Log.print_yellow("Could not determine test file path for", file)
+        return None
+    else:
+        unit_test_file_content = get_file_content(unit_test_file)
+
+    if not unit_test_file_content:
+        Log.print_yellow("Unit test file does not exist or is empty", unit_test_file)
+        unit_test_file_content = "" # Start with an empty string if no test file
+
+    code, unit_test, hints = file_content, unit_test_file_content, []
+    if file_coverage and file_coverage.uncovered_lines:
+        hints.append(f"The existing tests cover {file_coverage.percent:.1f}% of the source file. "
+                     f"Focus new tests on the uncovered lines: {file_coverage.uncovered_ranges()}.")
+    diff_scope = build_diff_scope(file, file_content, diff, unit_test_file_content) if diff else None
+    if diff_scope:
+        Log.print_green(f"Sending only the changed symbols of {file}:", ", ".join(diff_scope.symbols))
+        code, unit_test = diff_scope.code, diff_scope.unit_test
+        hints.append("Only the functions changed by this pull request are shown, with the existing tests that exercise them. "
+                     "Return the imports and the new or updated tests for these functions only; "
+                     "they will be merged into the existing unit test file.")
+    chunk_plan = None
+    if not diff_scope and vars.chunk_token_threshold and estimate_tokens(file_content) > vars.chunk_token_threshold:
+        chunk_plan = split_into_chunks(file, file_content, unit_test_file_content, vars.chunk_tokens)
+        if chunk_plan:
+            Log.print_green(f"Splitting {file} into {len(chunk_plan.chunks)} chunks")
+    return UnitTestRequest(file, unit_test_file, unit_test_file_content, code, unit_test, hints, diff_scope, chunk_plan)
+
+def request_unit_test(ai, request: UnitTestRequest, all_source_files_content: str) -> str:
+    Log.print_green(f"Asking AI for test coverage for {request.file}")
+    StreamGuard.pop_last()
+    with llm_slots, Instrumentation.span("generate", path=request.file, context_bytes=len(all_source_files_content)):
+        new_unit_test_file_content = ai.ai_generate_test_coverage(code=request.code, unit_test=request.unit_test, all_source_files=all_source_files_content, unit_test_file_path=request.unit_test_file, hints="\n".join(request.hints))
+    stream_guard = StreamGuard.pop_last()
+    if stream_guard:
+        Log.print_green(f"Generated {stream_guard.output_tokens} tokens for {request.file}: "
+                        f"time to first token {stream_guard.time_to_first_token:.2f}s, "
+                        f"{stream_guard.tokens_per_second:.1f} tokens/s, "
+                        f"{stream_guard.cached_tokens} of {stream_guard.prompt_tokens} prompt tokens cached")
+    return new_unit_test_file_content
+
+def finish_unit_test(ai, request: UnitTestRequest, content: str, all_source_files_content: str,
+                     syntax_checker: Executor = None) -> str:
+    """Merges diff-scoped results into the existing test and, when a syntax_checker is given, validates them."""
+    if request.diff_scope and content:
+        content = merge_test_files(request.existing_unit_test, strip_markdown_fences(content),
+                                   os.path.splitext(request.file)[1])
+        if content is None:
+            Log.print_yellow(f"Could not merge the tests generated for {request.file}, keeping {request.unit_test_file}")
+            return ""
+    if syntax_checker and content:
+        # A chunked file is too large to resend whole; repairs get its outline instead
+        code = request.chunk_plan.outline if request.chunk_plan else request.code
+        existing_unit_test = request.existing_unit_test if request.diff_scope else None
+        content = validate_and_repair(ai, request.unit_test_file, content, code,
+                                      all_source_files_content, request.hints, syntax_checker, existing_unit_test)
+    return content
+
+def generate_chunked_unit_test(ai, request: UnitTestRequest, all_source_files_content: str) -> str:
+    """
+    Generates the tests of each chunk of a large file in parallel, with the outline of the file as shared context,
+    and merges them into the existing unit test, deduplicating imports and fixtures. Parts whose tests cannot be merged
+    are skipped. Returns "" when every chunk failed.
+    """
+    outline = f"File: {request.file} (outline){separator}{request.chunk_plan.outline}"
+    context = separator.join(part for part in (outline, all_source_files_content) if part)
+    chunks = request.chunk_plan.chunks
+
+    def generate_chunk(index):
+        chunk = chunks[index]
+        hint = (f"The source file is too large to test at once. Part {index + 1} of {len(chunks)} is shown: "
+                f"{', '.join(chunk.symbols)}, with the existing tests that exercise it; the outline of the whole file "
+                "is among the relevant source files. Return the imports, fixtures and tests for these functions only; "
+                "they will be merged with the tests of the other parts into one unit test file.")
+        chunk_request = request._replace(code=chunk.code, unit_test=chunk.unit_test, hints=request.hints + [hint])
+        with Instrumentation.span("chunk", path=request.file, index=index + 1):
+            return request_unit_test(ai, chunk_request, context)
 
-    # Select AI Bot based on the BOT environment variable (case-insensitive)
-    bot_type = vars.bot.strip().lower()
+    # Each chunk request waits for a slot of llm_slots, shared with the requests of the other files
+    with ThreadPoolExecutor(max_workers=max(1, min(len(chunks), vars.max_concurrency))) as executor:
+        results = list(executor.map(generate_chunk, range(len(chunks))))
+
+    content = request.existing_unit_test
+    extension = os.path.splitext(request.file)[1]
+    merged_chunks = 0
+    for index, result in enumerate(results):
+        merged = merge_test_files(content, strip_markdown_fences(result), extension) if result else None
+        if not merged:
+            # A failed part is skipped; the existing tests and the parts merged so far are kept
+            Log.print_yellow(f"No tests generated for part {index + 1} of {request.file}" if not result else
+                             f"Skipping the tests of part {index + 1} of {request.file}, they cannot be merged")
+            continue
+        content = merged
+        merged_chunks += 1
+    return content if merged_chunks else ""
+
+def generate_unit_test_for_file(ai, file: str, dependency_graph: DependencyGraph, diff: str = "",
+                                coverage_report: CoverageReport = None, syntax_checker: Executor = None):
+    """
+    Asks the AI bot for the unit test of a single source file.
+    When a syntax_checker is given, the result is validated and repaired before it is returned.
+    Returns a (unit_test_file, content) tuple, or None when the file is skipped.
+    """
+    request = prepare_unit_test_request(file, diff, coverage_report)
+    if not request:
+        return None
+
+    with Instrumentation.span("context.build", path=file):
+        all_source_files_content = dependency_graph.build_context(file, vars.context_depth, vars.context_token_budget, separator)
+    if request.chunk_plan:
+        new_unit_test_file_content = generate_chunked_unit_test(ai, request, all_source_files_content)
+    else:
+        new_unit_test_file_content = request_unit_test(ai, request, all_source_files_content)
+    new_unit_test_file_content = finish_unit_test(ai, request, new_unit_test_file_content, all_source_files_content,
+                                                  syntax_checker)
+    return request.unit_test_file, new_unit_test_file_content
+
+def generate_unit_test_batch(ai, files: List[str], dependency_graph: DependencyGraph, diffs: Dict[str, str],
+                             coverage_report: CoverageReport = None, syntax_checker: Executor = None) -> List[tuple]:
+    """
+    Asks the AI bot for the unit tests of several small source files in one request sharing one context.
+    Files missing from the answer, or the whole batch when the answer cannot be parsed, fall back to one request
+    per file. Returns one (unit_test_file, content) tuple or None per file.
+    """
+    requests = [prepare_unit_test_request(file, diffs.get(file, ""), coverage_report) for file in files]
+    batched = [request for request in requests if request]
+    if len(batched) < 2:
+        return [generate_unit_test_for_file(ai, file, dependency_graph, diffs.get(file, ""), coverage_report,
+                                            syntax_checker) if request else None
+                for file, request in zip(files, requests)]
+
+    with Instrumentation.span("context.build", files=len(batched)):
+        all_source_files_content = dependency_graph.build_batch_context([request.file for request in batched],
+                                                                        vars.context_depth, vars.context_token_budget,
+                                                                        separator)
+    Log.print_green(f"Asking AI for test coverage for {len(batched)} files in one request:",
+                    ", ".join(request.file for request in batched))
+    items = [BatchItem(request.code, request.unit_test, request.unit_test_file, "\n".join(request.hints))
+             for request in batched]
+    with llm_slots, Instrumentation.span("generate.batch", files=len(batched),
+                                         context_bytes=len(all_source_files_content)):
+        response = ai.ai_generate_batch_test_coverage(items, all_source_files_content)
+    contents = split_batch_response(response, [request.unit_test_file for request in batched])
+    Instrumentation.increment("batch.files", len(contents))
+
+    results = []
+    for request in requests:
+        if not request:
+            results.append(None)
+            continue
+        content = contents.get(request.unit_test_file)
+        context = all_source_files_content
+        if not content:
+            Log.print_yellow(f"Batched answer has no unit test for {request.file}, retrying it alone")
+            Instrumentation.increment("batch.fallbacks")
+            context = dependency_graph.build_context(request.file, vars.context_depth, vars.context_token_budget, separator)
+            content = request_unit_test(ai, request, context)
+        results.append((request.unit_test_file, finish_unit_test(ai, request, content, context, syntax_checker)))
+    return results
+
+def plan_generation_batches(changed_files: List[str]) -> List[List[str]]:
+    """Groups the small changed source files into batches when BATCH_TOKEN_BUDGET is set; other files go alone."""
+    if not vars.batch_token_budget:
+        return [[file] for file in changed_files]
+
+    file_tokens = {}
+    for file in changed_files:
+        if os.path.splitext(file)[1].lstrip('.') not in vars.target_extensions:
+            continue
+        unit_test_file = get_unit_test_file_path(file_path=file, src_path=vars.src_path, test_path=vars.test_path)
+        if not unit_test_file:
+            continue
+        source_tokens = estimate_tokens(get_file_content(file))
+        if vars.chunk_token_threshold and source_tokens > vars.chunk_token_threshold:
+            continue
+        tokens = source_tokens + estimate_tokens(get_file_content(unit_test_file))
+        if tokens <= vars.batch_max_file_tokens:
+            file_tokens[file] = tokens
+    return plan_batches(changed_files, file_tokens, vars.batch_token_budget, vars.batch_max_files)
+
+def select_shard_files(changed_files: List[str]) -> List[str]:
+    """
+    Returns the target source files of this runner's shard when SHARD_TOTAL is above 1.
+    Shards are balanced by the estimated tokens of each source file and its existing unit test.
+    """
+    if vars.shard_total <= 1:
+        return changed_files
+
+    costs = {}
+    for file in changed_files:
+        if os.path.splitext(file)[1].lstrip('.') not in vars.target_extensions:
+            continue
+        unit_test_file = get_unit_test_file_path(file_path=file, src_path=vars.src_path, test_path=vars.test_path)
+        if unit_test_file:
+            costs[file] = estimate_tokens(get_file_content(file)) + estimate_tokens(get_file_content(unit_test_file))
+    files = shard_files(list(costs), costs, vars.shard_index, vars.shard_total)
+    Log.print_green(f"Shard {vars.shard_index + 1} of {vars.shard_total}: {len(files)} of {len(costs)} files, "
+                    f"about {sum(costs[file] for file in files)} tokens")
+    return files
+
+def estimate_work(file: str, dependency_graph: DependencyGraph, coverage_report: CoverageReport = None) -> WorkEstimate:
+    """
+    Estimates the tokens of generating the unit test of a file, and its coverage gain: the uncovered lines of the
+    coverage report, or else the source lines, halved when the file already has a unit test.
+    Files that will be skipped cost nothing.
+    """
+    if os.path.splitext(file)[1].lstrip('.') not in vars.target_extensions:
+        return WorkEstimate(0, 0, 0)
+    unit_test_file = get_unit_test_file_path(file_path=file, src_path=vars.src_path, test_path=vars.test_path)
+    file_coverage = coverage_report.find(file) if coverage_report else None
+    if not unit_test_file or (file_coverage and file_coverage.percent >= vars.coverage_threshold):
+        return WorkEstimate(0, 0, 0)
+
+    source = get_file_content(file)
+    unit_test = get_file_content(unit_test_file)
+    source_tokens, unit_test_tokens = estimate_tokens(source), estimate_tokens(unit_test)
+    context = dependency_graph.build_context(file, vars.context_depth, vars.context_token_budget, separator)
+    if file_coverage:
+        value = len(file_coverage.uncovered_lines)
+    else:
+        value = sum(1 for line in source.splitlines() if line.strip())
+        value = value / 2 if unit_test.strip() else value
+    return WorkEstimate(source_tokens + unit_test_tokens + estimate_tokens(context),
+                        max(source_tokens, unit_test_tokens), value)
+
+def resume_unit_test(journal: RunJournal, file: str) -> Optional[str]:
+    """Restores the unit test of a file finished by an earlier run of the journal; returns its path, or None."""
+    unit_test_file = get_unit_test_file_path(file_path=file, src_path=vars.src_path, test_path=vars.test_path)
+    if not unit_test_file or os.path.splitext(file)[1].lstrip('.') not in vars.target_extensions:
+        return None
+    unit_test = get_file_content(unit_test_file)
+    output = journal.resume(file, get_file_content(file), unit_test_file, unit_test)
+    if output is None:
+        return None
+    if output != unit_test:
+        overwrite_unit_test_file(unit_test_file, output)
+    Log.print_green(f"Resuming {file} from the run journal")
+    return unit_test_file
+
+def record_unit_test(journal: RunJournal, file: str, output: Optional[str]):
+    unit_test_file = get_unit_test_file_path(file_path=file, src_path=vars.src_path, test_path=vars.test_path)
+    if journal and unit_test_file:
+        journal.record(file, get_file_content(file), unit_test_file, get_file_content(unit_test_file), output)
+
+def manifest_entry(file: str) -> Optional[ManifestEntry]:
+    """The inputs the unit test of file is generated from in this run, or None when file has no unit test."""
+    unit_test_file = get_unit_test_file_path(file_path=file, src_path=vars.src_path, test_path=vars.test_path)
+    if not unit_test_file or os.path.splitext(file)[1].lstrip('.') not in vars.target_extensions:
+        return None
+    unit_test_sha = git_blob_sha(get_file_content(unit_test_file)) if os.path.exists(unit_test_file) else ""
+    return ManifestEntry(unit_test_file, git_blob_sha(get_file_content(file)), unit_test_sha, ",".join(vars.bots),
+                         ",".join(vars.backend(bot_type)[2] or "" for bot_type in vars.bots), AiBot.prompt_version())
+
+def select_changed_since_generation(files: List[str], manifest: GenerationManifest) -> List[str]:
+    """Drops the files whose unit test an earlier run generated from the same inputs."""
+    with Instrumentation.span("manifest", files=len(files)):
+        changed = []
+        for file in files:
+            entry = manifest_entry(file)
+            if entry and manifest.is_current(file, entry):
+                Instrumentation.increment("files.unchanged")
+            else:
+                changed.append(file)
+    Log.print_green(f"{len(files) - len(changed)} files unchanged since their unit test was generated")
+    return changed
+
+def record_generation(manifest: GenerationManifest, files: List[str], written: List[str],
+                      diffs: Dict[str, str] = None):
+    """
+    Records the inputs of the unit tests written for files. Files generated from their diff only got tests for the
+    changed functions, so they are not recorded and a later FULL run generates them again.
+    """
+    written = set(written)
+    for file in files:
+        if diffs and file in diffs:
+            continue
+        entry = manifest_entry(file)
+        if entry and entry.test_file in written:
+            manifest.record(file, entry)
+
+def push_progress(files_done: int, files_total: int):
+    commit_message = (f'feat: Add AI-generated unit test coverage for branch #{vars.branch_name} '
+                      f'({files_done} of {files_total} files)')
+    # Validations running in other threads temporarily write unvalidated candidates into TEST_PATH
+    with without_candidates_in_tree(), Instrumentation.span("push", files_done=files_done):
+        Git.push_changes_to_github(vars.branch_name, commit_message, vars.owner, vars.repo, vars.token,
+                                   vars.test_path+"/*")
+
+def generate_unit_tests(ai, changed_files: List[str], dependency_graph: DependencyGraph, max_concurrency: int,
+                        diffs: Dict[str, str] = None, coverage_report: CoverageReport = None,
+                        journal: RunJournal = None, push_every: int = 0, scheduler: Scheduler = None):
+    """
+    Generates unit tests for the changed files using up to max_concurrency parallel AI requests.
+    Results are written in the order of changed_files, or of the scheduler, and a failing file does not abort the
+    run.
+    diffs maps files to their PR diff for diff-scoped generation.
+    With a journal, files finished by an earlier run are restored instead of generated, and every finished file is
+    recorded. With push_every, the written unit tests are pushed after every push_every written files.
+    With a scheduler, the files expected to gain the most coverage per token go first, and files that no longer fit
+    in its token budget or deadline are deferred.
+    Returns the unit test files written.
+    """
+    global llm_slots
+    llm_slots = threading.BoundedSemaphore(max_concurrency)
+    diffs = diffs or {}
+    written = []
+    files_total = len(changed_files)
+    if journal:
+        pending = []
+        for file in changed_files:
+            unit_test_file = resume_unit_test(journal, file)
+            if unit_test_file:
+                written.append(unit_test_file)
+                Instrumentation.increment("files.resumed")
+            else:
+                pending.append(file)
+        changed_files = pending
+    files_done = files_total - len(changed_files)
+    pushed = len(written)
+    Log.print_green(f"Generating unit tests for {len(changed_files)} files with concurrency {max_concurrency}")
+
+    def generate(files):
+        if not scheduler:
+            return generate_files(files)
+        estimate = WorkEstimate.combine([estimates[file] for file in files])
+        if not scheduler.admit(estimate):
+            Log.print_yellow(f"Deferring {', '.join(files)}: token budget or deadline reached")
+            Instrumentation.increment("files.deferred", len(files))
+            return [None] * len(files)
+        started = time.perf_counter()
+        try:
+            return generate_files(files)
+        finally:
+            scheduler.release(estimate, time.perf_counter() - started)
+
+    def generate_files(files):
+        if len(files) > 1:
+            with Instrumentation.span("batch", files=len(files), paths=files):
+                return generate_unit_test_batch(ai, files, dependency_graph, diffs, coverage_report, syntax_checker)
+        with Instrumentation.span("file", path=files[0]):
+            return [generate_unit_test_for_file(ai, files[0], dependency_graph, diffs.get(files[0], ""),
+                                                coverage_report, syntax_checker)]
+
+    batches = plan_generation_batches(changed_files)
+    estimates = {}
+    if scheduler:
+        with Instrumentation.span("schedule", files=len(changed_files)):
+            estimates = {file: estimate_work(file, dependency_graph, coverage_report) for file in changed_files}
+            batches = Scheduler.order(batches, estimates)
+    syntax_checker = None
+    if vars.validate_tests:
+        syntax_checker = ProcessPoolExecutor(max_workers=max(1, min(max_concurrency, os.cpu_count() or 1)))
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = [executor.submit(generate, files) for files in batches]
+            for files, future in zip(batches, futures):
+                Instrumentation.increment("files.processed", len(files))
+                files_done += len(files)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    Log.print_red(f"Failed to generate unit test for {', '.join(files)}:", e)
+                    for file in files:
+                        record_unit_test(journal, file, None)
+                    continue
+
+                for file, result in zip(files, results):
+                    if not result:
+                        continue
+
+                    unit_test_file, new_unit_test_file_content = result
+                    if new_unit_test_file_content:
+                        record_unit_test(journal, file, new_unit_test_file_content)
+                        overwrite_unit_test_file(unit_test_file, new_unit_test_file_content)
+                        Instrumentation.increment("files.written")
+                        written.append(unit_test_file)
+                    else:
+                        record_unit_test(journal, file, None)
+                        Log.print_yellow("AI did not return unit test content for", file)
+
+                if push_every and len(written) - pushed >= push_every:
+                    push_progress(files_done, files_total)
+                    pushed = len(written)
+    finally:
+        if syntax_checker:
+            syntax_checker.shutdown()
+    if scheduler:
+        scheduler.log_stats()
+    return written
+
+def build_and_push(test_files: List[str] = None):
+    build_and_run_unit_tests_coverage(test_files)
+    commit_message = f'feat: Add AI-generated unit test coverage for branch #{vars.branch_name}'
+    with Instrumentation.span("push"):
+        Git.push_changes_to_github(vars.branch_name, commit_message, vars.owner, vars.repo, vars.token,
+                                   vars.test_path+"/*")
+
+def backend_settings() -> tuple:
+    """The settings a bot and its transport are built with, besides its URL, key and model."""
+    return (vars.max_output_tokens, vars.generation_timeout, vars.prompt_cache_ttl, vars.prompt_cache_min_tokens,
+            vars.http_connect_timeout, vars.http_read_timeout, vars.http_max_retries, vars.max_concurrency,
+            vars.rate_limit_rpm, vars.rate_limit_tpm)
+
+def create_backend(bot_type: str, max_retries: int):
+    transport = HttpTransport(connect_timeout=vars.http_connect_timeout, read_timeout=vars.http_read_timeout,
+                              max_retries=max_retries, pool_size=max(10, vars.max_concurrency),
+                              rate_limiter=RateLimiter(vars.rate_limit_rpm, vars.rate_limit_tpm))
+    return create_bot(bot_type, *vars.backend(bot_type), transport)
+
+def create_bot(bot_type: str, url: str, key: str, model: str, transport: HttpTransport):
     if bot_type == "gemini":
         from ai.gemini_bot import GeminiBot
-        ai = GeminiBot(vars.llm_url, vars.llm_token, vars.llm_model)
+        return GeminiBot(url, key, model, transport, vars.max_output_tokens, vars.generation_timeout,
+                         vars.prompt_cache_ttl, vars.prompt_cache_min_tokens)
     elif bot_type == "ollama":
         from ai.ollama_bot import OllamaBot
-        ai = OllamaBot(vars.llm_url, vars.llm_model)
+        return OllamaBot(url, model, transport, vars.max_output_tokens, vars.generation_timeout, vars.prompt_cache_ttl)
     elif bot_type == "chatgpt":
         from ai.chat_gpt import ChatGPT
-        ai = ChatGPT(vars.llm_token, vars.llm_model)
-    else:
-        raise ValueError(f"Unsupported BOT type: {vars.bot}")
+        return ChatGPT(key, model, transport, vars.max_output_tokens, vars.generation_timeout,
+                       vars.prompt_cache_ttl, vars.prompt_cache_min_tokens)
+    raise ValueError(f"Unsupported BOT type: {bot_type}")
 
-    remote_name = Git.get_remote_name()
+def source_fingerprint() -> Optional[str]:
+    """Hash of the paths and blob SHAs of the source files, or None when some are not tracked by git."""
+    digest = hashlib.sha1()
+    for file in snapshot.list_files():
+        if file.startswith(vars.src_path):
+            blob_sha = snapshot.get_blob_sha(file)
+            if not blob_sha:
+                return None
+            digest.update(f"{file}\0{blob_sha}\n".encode('utf-8'))
+    return digest.hexdigest()
 
-    all_source_files_content = []
-    for file in Git.get_all_files():
+def build_dependency_graph(skeleton_index: Optional[SkeletonIndex]) -> DependencyGraph:
+    source_files = {}
+    for file in snapshot.list_files():
         if file.startswith(vars.src_path):
-            all_source_files_content.append(f'File: {file}{separator}{get_file_content(file)}')
-    all_source_files_content = separator.join(all_source_files_content)
+            source_files[file] = get_file_content(file)
+    context_files = source_files
+    if skeleton_index:
+        with Instrumentation.span("skeletons", files=len(source_files)):
+            context_files = {file: skeleton_index.skeleton(file, content, snapshot.get_blob_sha(file))
+                             for file, content in source_files.items()}
+    with Instrumentation.span("dependency_graph", files=len(source_files)):
+        return DependencyGraph(source_files, context_files)
 
-    Log.print_green("Remote is", remote_name)
-    changed_files = []
-    if vars.generate_mode.lower() == "full":
-        changed_files = Git.get_all_files()
-    else :
-        changed_files = Git.get_diff_files(remote_name=remote_name, head_ref=vars.branch_name, base_ref=vars.base_ref)
+def finish_run():
+    Instrumentation.print_summary()
+    if vars.run_report:
+        Instrumentation.write_report(vars.run_report, vars.run_report_format)
 
-    Log.print_green("Found changes in files", changed_files)
-    if len(changed_files) == 0: 
-        Log.print_red("No changes between branch")
+def main():
+    global vars, snapshot
+    vars = EnvVars()
+    vars.check_vars()
+    Instrumentation.reset()
+    scheduler = None
+    if vars.max_tokens or vars.deadline_seconds:
+        scheduler = Scheduler(vars.max_tokens, vars.deadline_seconds)
 
-    for file in changed_files:
-        Log.print_green("Checking file", file)
+    manifest = None
+    if vars.skip_unchanged:
+        manifest = GenerationManifest(os.path.join(vars.test_path, MANIFEST_FILE))
 
-        _, file_extension = os.path.splitext(file)
-        file_extension = file_extension.lstrip('.')
-        if file_extension not in vars.target_extensions:
-            Log.print_yellow(f"Skipping, unsupported extension {file_extension} file {file}")
-            continue
+    # The merge job of a sharded run builds and pushes the unit tests generated by all shards at once
+    if vars.generate_mode.lower() == "merge":
+        test_files = import_shards(vars.shard_dir)
+        if manifest:
+            for path in shard_manifests(vars.shard_dir):
+                manifest.merge(path)
+            manifest.save()
+        build_and_push(test_files)
+        finish_run()
+        return
 
-        file_content = get_file_content(file)
-        if not file_content:
-            continue
+    snapshot = RepoSnapshot()
+    try:
 
-        unit_test_file_content=""
-        unit_test_file = get_unit_test_file_path(file_path=file, src_path=vars.src_path, test_path=vars.test_path)
-        if not unit_test_file:
-            Log.print_yellow("Could not determine test file path for", file)
-            continue
+        # Select AI Bot based on the BOT environment variable (case-insensitive); a list combines several backends,
+        # each with its own connection pool and rate limit. A daemon worker keeps them warm between jobs.
+        max_retries = vars.http_max_retries
+        if len(vars.bots) > 1:
+            # Behind a composite, a failing backend is soon replaced by the next one instead of backing off
+            from ai.composite_bot import BACKEND_MAX_RETRIES
+            max_retries = min(max_retries, BACKEND_MAX_RETRIES)
+        backends = [(bot_type, WarmCache.get(("bot", bot_type), lambda: create_backend(bot_type, max_retries),
+                                             (vars.backend(bot_type), backend_settings(), max_retries)))
+                    for bot_type in vars.bots]
+        composite_bot = None
+        if len(backends) == 1:
+            ai = backends[0][1]
         else:
-            unit_test_file_content = get_file_content(unit_test_file)
+            from ai.composite_bot import CompositeBot
+            composite_bot = WarmCache.get(("composite", tuple(vars.bots)),
+                                          lambda: CompositeBot(backends, vars.bot_route_tokens, vars.hedge_percentile,
+                                                               vars.max_concurrency * len(backends)),
+                                          (tuple(id(bot) for _, bot in backends), vars.bot_route_tokens,
+                                           vars.hedge_percentile, vars.max_concurrency))
+            ai = composite_bot
+
+        response_cache = None
+        if vars.cache_dir:
+            from ai.cached_bot import CachedBot
+            from ai.response_cache import ResponseCache
+            response_cache = ResponseCache(vars.cache_dir, vars.cache_max_mb * 1024 * 1024,
+                                           vars.cache_max_age_days * 24 * 60 * 60)
+            ai = CachedBot(ai, response_cache, ",".join(vars.bots),
+                           ",".join(vars.backend(bot_type)[2] for bot_type in vars.bots))
+
+        remote_name = Git.get_remote_name()
 
-        if not unit_test_file_content:
-            Log.print_yellow("Unit test file does not exist or is empty", unit_test_file)
-            unit_test_file_content = "" # Start with an empty string if no test file
-        
-        Log.print_green(f"Asking AI for test coverage for {file}")
-        new_unit_test_file_content = ai.ai_generate_test_coverage(code=file_content, unit_test=unit_test_file_content, all_source_files=all_source_files_content, unit_test_file_path=unit_test_file)
+        skeleton_index = None
+        if vars.context_skeletons:
+            # In a subdirectory, so the response cache does not count or evict it as one of its entries
+            skeleton_path = os.path.join(vars.cache_dir, "skeletons", "skeletons.json") if vars.cache_dir else ""
+            # Per repository: a relative CACHE_DIR, or the same one, must not share an index between repositories
+            skeleton_key = ("skeletons", os.getcwd(), os.path.abspath(skeleton_path) if skeleton_path else "")
+            skeleton_index = WarmCache.get(skeleton_key, lambda: SkeletonIndex(skeleton_path))
+        # A daemon worker reuses the graph of a repository while its source files are unchanged
+        dependency_graph = WarmCache.get(("dependency_graph", os.getcwd()),
+                                         lambda: build_dependency_graph(skeleton_index),
+                                         (source_fingerprint(), vars.src_path, vars.context_skeletons))
 
-        if new_unit_test_file_content:
-            overwrite_unit_test_file(unit_test_file, new_unit_test_file_content)
+        Log.print_green("Remote is", remote_name)
+        changed_files = []
+        diffs = {}
+        if vars.generate_mode.lower() == "full":
+            changed_files = snapshot.list_files()
+            if manifest:
+                # Only the files whose source, unit test, bot, model or prompt changed since their last generation
+                changed_files = select_changed_since_generation(changed_files, manifest)
+        else :
+            changed_files = Git.get_diff_files(remote_name=remote_name, head_ref=vars.branch_name, base_ref=vars.base_ref)
+            if vars.diff_scoped:
+                diffs = split_diff_by_file(Git.get_diff(remote_name=remote_name, head_ref=vars.branch_name, base_ref=vars.base_ref))
+
+        Log.print_green("Found changes in files", changed_files)
+        if len(changed_files) == 0: 
+            Log.print_red("No changes between branch")
+        changed_files = select_shard_files(changed_files)
+
+        coverage_report = None
+        coverage_report_path = CoverageReport.find_report(vars.build_tool, vars.coverage_report)
+        if coverage_report_path:
+            coverage_report = CoverageReport.load(coverage_report_path)
         else:
-            Log.print_yellow("AI did not return unit test content for", file)
+            Log.print_yellow("No coverage report found, generating tests for all files")
 
-    build_and_run_unit_tests_coverage()
-    commit_message = f'feat: Add AI-generated unit test coverage for branch #{vars.branch_name}'
-    Git.push_changes_to_github(vars.branch_name, commit_message, vars.owner, vars.repo, vars.token,
-                               vars.test_path+"/*")
+        journal = RunJournal(vars.journal_dir) if vars.journal_dir else None
+        # Shard jobs leave their unit tests to the merge job instead of pushing
+        push_every = vars.push_every if vars.shard_total <= 1 else 0
+        with Instrumentation.span("generate_all", files=len(changed_files)):
+            written = generate_unit_tests(ai, changed_files, dependency_graph, vars.max_concurrency, diffs,
+                                          coverage_report, journal, push_every, scheduler)
+        if journal:
+            journal.close()
+        if composite_bot:
+            composite_bot.log_stats()
+        if skeleton_index:
+            skeleton_index.save()
+        if response_cache:
+            response_cache.log_stats()
+            response_cache.evict()
+        if manifest:
+            record_generation(manifest, changed_files, written, diffs)
+            if vars.shard_total > 1:
+                manifest.save(shard_manifest_path(vars.shard_dir, vars.shard_index), recorded_only=True)
+            else:
+                manifest.save()
+    finally:
+        # A daemon worker runs many jobs; a failing one must not leak its git cat-file process
+        snapshot.close()
+
+    if vars.shard_total > 1:
+        # Left for the merge job, which builds and pushes once for all shards
+        export_shard(written, vars.shard_dir)
+    else:
+        build_and_push(written)
+    finish_run()
 
 if __name__ == "__main__":
     main()
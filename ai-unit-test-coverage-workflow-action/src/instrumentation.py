@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+from log import Log
+
+# Span attributes that add up over the spans of a phase; other numeric attributes are only averaged when they are
+# rates or latencies, and dropped from the summary otherwise (e.g. index, return_code)
+ADDITIVE_SUFFIXES = ("_tokens", "_bytes")
+ADDITIVE_ATTRIBUTES = {"bytes", "files", "failing_tests"}
+AVERAGED_ATTRIBUTES = {"ttft_seconds", "tokens_per_second", "coverage_percent"}
+
+
+class Instrumentation:
+    """
+    Process-wide timing spans and counters of a run: git calls, prompt building, LLM requests,
+    file writes and the build step. Written at the end of the run as a JSON or Chrome-trace report.
+    """
+
+    __lock = threading.Lock()
+    __spans: List[dict] = []
+    __counters: Dict[str, float] = {}
+    __thread_ids: Dict[int, int] = {}
+    __started = time.perf_counter()
+    __started_at = time.time()
+
+    @staticmethod
+    def reset():
+        with Instrumentation.__lock:
+            Instrumentation.__spans = []
+            Instrumentation.__counters = {}
+            Instrumentation.__thread_ids = {}
+            Instrumentation.__started = time.perf_counter()
+            Instrumentation.__started_at = time.time()
+
+    @staticmethod
+    @contextmanager
+    def span(name: str, **attributes):
+        """
+        Times the enclosed block. The yielded dict can be updated with metrics known only at the end,
+        e.g. token counts of an LLM request.
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attributes
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            if error:
+                attributes["error"] = error
+            Instrumentation.__add_span(name, start, time.perf_counter() - start, attributes)
+
+    @staticmethod
+    def increment(name: str, value: float = 1):
+        with Instrumentation.__lock:
+            Instrumentation.__counters[name] = Instrumentation.__counters.get(name, 0) + value
+
+    @staticmethod
+    def counter(name: str) -> float:
+        with Instrumentation.__lock:
+            return Instrumentation.__counters.get(name, 0)
+
+    @staticmethod
+    def spans(name: str = None) -> List[dict]:
+        with Instrumentation.__lock:
+            return [span for span in Instrumentation.__spans if name is None or span["name"] == name]
+
+    @staticmethod
+    def summary() -> Dict[str, dict]:
+        """
+        Aggregates the spans by name: count, total/p50/p95/max seconds, sums of the additive attributes (token and
+        byte counts) and averages of the rates and latencies, as "<attribute>_avg".
+        """
+        by_name = {}
+        for span in Instrumentation.spans():
+            by_name.setdefault(span["name"], []).append(span)
+
+        summary = {}
+        for name, spans in sorted(by_name.items()):
+            durations = sorted(span["duration"] for span in spans)
+            entry = {
+                "count": len(spans),
+                "total_seconds": round(sum(durations), 3),
+                "p50_seconds": round(Instrumentation.percentile(durations, 50), 3),
+                "p95_seconds": round(Instrumentation.percentile(durations, 95), 3),
+                "max_seconds": round(durations[-1], 3),
+            }
+            averaged = {}
+            for span in spans:
+                for key, value in span["attributes"].items():
+                    if not isinstance(value, (int, float)) or isinstance(value, bool):
+                        continue
+                    if key in ADDITIVE_ATTRIBUTES or key.endswith(ADDITIVE_SUFFIXES):
+                        entry[key] = entry.get(key, 0) + value
+                    elif key in AVERAGED_ATTRIBUTES:
+                        averaged.setdefault(key, []).append(value)
+            for key, values in sorted(averaged.items()):
+                entry[f"{key}_avg"] = round(sum(values) / len(values), 3)
+            summary[name] = entry
+        return summary
+
+    @staticmethod
+    def percentile(sorted_values: List[float], percent: float) -> float:
+        if not sorted_values:
+            return 0.0
+        index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+        return sorted_values[index]
+
+    @staticmethod
+    def print_summary():
+        wall_time = time.perf_counter() - Instrumentation.__started
+        Log.print_green(f"--- Run summary ({wall_time:.1f}s wall time) ---")
+        Log.print_green(f"{'phase':<24}{'count':>7}{'total s':>10}{'p50 s':>9}{'p95 s':>9}{'max s':>9}")
+        for name, entry in Instrumentation.summary().items():
+            Log.print_green(f"{name:<24}{entry['count']:>7}{entry['total_seconds']:>10.2f}"
+                            f"{entry['p50_seconds']:>9.2f}{entry['p95_seconds']:>9.2f}{entry['max_seconds']:>9.2f}")
+        for name, value in sorted(Instrumentation.__counters.items()):
+            Log.print_green(f"{name:<24}{value:>7g}")
+        Log.event("run_summary", wall_time=round(wall_time, 3), phases=Instrumentation.summary(),
+                  counters=dict(Instrumentation.__counters))
+
+    @staticmethod
+    def write_report(path: str, report_format: str = "json"):
+        """Writes the run report as plain JSON, or as Chrome trace events (chrome://tracing, Perfetto)."""
+        spans = Instrumentation.spans()
+        if report_format.lower() == "chrome":
+            report = {
+                "traceEvents": [{
+                    "name": span["name"],
+                    "ph": "X",
+                    "ts": round(span["start"] * 1_000_000),
+                    "dur": round(span["duration"] * 1_000_000),
+                    "pid": 1,
+                    "tid": span["thread"],
+                    "args": span["attributes"],
+                } for span in spans],
+                "displayTimeUnit": "ms",
+            }
+        else:
+            report = {
+                "started_at": Instrumentation.__started_at,
+                "wall_time": time.perf_counter() - Instrumentation.__started,
+                "summary": Instrumentation.summary(),
+                "counters": dict(Instrumentation.__counters),
+                "spans": spans,
+            }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        Log.print_green("Run report written to", path)
+
+    @staticmethod
+    def __add_span(name: str, start: float, duration: float, attributes: dict):
+        with Instrumentation.__lock:
+            thread = Instrumentation.__thread_ids.setdefault(threading.get_ident(),
+                                                             len(Instrumentation.__thread_ids) + 1)
+            span = {
+                "name": name,
+                "start": start - Instrumentation.__started,
+                "duration": duration,
+                "thread": thread,
+                "attributes": dict(attributes),
+            }
+            Instrumentation.__spans.append(span)
+        Log.event("span", name=name, duration=round(duration, 4), **span["attributes"])
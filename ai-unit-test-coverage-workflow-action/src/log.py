@@ -1,3 +1,7 @@
+import json
+import os
+import time
+
 class Log:
     # ANSI escape codes for some colors
     RED = '\033[31m'
@@ -5,17 +9,31 @@ class Log:
     YELLOW = '\033[33m'
     RESET = '\033[0m'
 
+    # LOG_FORMAT=json prints one JSON object per line instead of colored text, so CI can aggregate runs
+    json_lines = os.getenv('LOG_FORMAT', '').lower() == 'json'
+
     @staticmethod
     def print_red(*args):
-        text = ' '.join(str(arg) for arg in args)
-        print(f"{Log.RED}{text}{Log.RESET}")
+        Log.__print(Log.RED, "error", args)
 
     @staticmethod
     def print_green(*args):
-        text = ' '.join(str(arg) for arg in args)
-        print(f"{Log.GREEN}{text}{Log.RESET}")
+        Log.__print(Log.GREEN, "info", args)
 
     @staticmethod
     def print_yellow(*args):
+        Log.__print(Log.YELLOW, "warning", args)
+
+    @staticmethod
+    def event(event, /, **fields):
+        """Emits a structured event. Only printed in JSON lines mode."""
+        if Log.json_lines:
+            print(json.dumps({"ts": time.time(), "event": event, **fields}, default=str), flush=True)
+
+    @staticmethod
+    def __print(color, level, args):
         text = ' '.join(str(arg) for arg in args)
-        print(f"{Log.YELLOW}{text}{Log.RESET}")
+        if Log.json_lines:
+            print(json.dumps({"ts": time.time(), "level": level, "message": text}), flush=True)
+        else:
+            print(f"{color}{text}{Log.RESET}")
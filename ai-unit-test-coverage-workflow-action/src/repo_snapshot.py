@@ -0,0 +1,98 @@
+import subprocess
+import threading
+from typing import Dict, List
+from instrumentation import Instrumentation
+from log import Log
+
+REGULAR_FILE_MODES = ("100644", "100755")
+
+
+class RepoSnapshot:
+    """
+    Read-only view of the repository: files are listed once with `git ls-files -z -s`, and blob contents are
+    streamed through a single long-lived `git cat-file --batch` process and cached in memory by blob SHA.
+    Files written during the run are invalidated so later reads see them on disk.
+    """
+
+    def __init__(self):
+        self.__files: Dict[str, str] = None
+        self.__blobs: Dict[str, str] = {}
+        self.__written = set()
+        self.__process = None
+        self.__lock = threading.Lock()
+
+    def list_files(self) -> List[str]:
+        return list(self.__index())
+
+    def get_blob_sha(self, path: str) -> str:
+        """Returns the SHA of the indexed blob of path, or None for untracked files."""
+        return self.__index().get(path)
+
+    def read_file(self, path: str) -> str:
+        """Returns the content of a file of the checkout; raises FileNotFoundError when it does not exist."""
+        sha = self.__index().get(path)
+        if sha is None or path in self.__written:
+            with open(path, 'r') as f:
+                return f.read()
+        content = self.__read_object(sha)
+        if content is None:
+            raise FileNotFoundError(path)
+        return content
+
+    def read_at(self, ref: str, path: str) -> str:
+        """Returns the content of path at ref without checking it out, or None when it does not exist there."""
+        return self.__read_object(f"{ref}:{path}")
+
+    def invalidate(self, path: str):
+        """Marks path as written by this run, so it is read from disk from now on."""
+        self.__written.add(path)
+
+    def close(self):
+        with self.__lock:
+            if self.__process:
+                self.__process.stdin.close()
+                self.__process.wait()
+                self.__process = None
+
+    def __index(self) -> Dict[str, str]:
+        if self.__files is None:
+            command = ["git", "ls-files", "-z", "-s"]
+            Log.print_green(command)
+            with Instrumentation.span("git", command="ls-files"):
+                output = subprocess.run(command, capture_output=True, check=True).stdout.decode('utf-8')
+            files = {}
+            for entry in output.split('\0'):
+                if not entry:
+                    continue
+                info, path = entry.split('\t', 1)
+                mode, sha, _ = info.split(' ')
+                if mode in REGULAR_FILE_MODES:
+                    files[path] = sha
+            self.__files = files
+        return self.__files
+
+    def __read_object(self, name: str):
+        cached = self.__blobs.get(name)
+        if cached is not None:
+            return cached
+
+        with self.__lock:
+            if self.__process is None:
+                self.__process = subprocess.Popen(["git", "cat-file", "--batch"],
+                                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self.__process.stdin.write(name.encode('utf-8') + b'\n')
+            self.__process.stdin.flush()
+            header = self.__process.stdout.readline().decode('utf-8').rstrip('\n')
+            if header.endswith((" missing", " ambiguous")):
+                # "<name> missing" or "<name> ambiguous", where the name may contain spaces
+                return None
+            sha, object_type, size = header.split(' ')
+            data = self.__process.stdout.read(int(size))
+            self.__process.stdout.read(1)
+
+        Instrumentation.increment("git.cat_file.bytes", int(size))
+        if object_type != "blob":
+            return None
+        content = data.decode('utf-8', errors='replace')
+        self.__blobs[sha] = content
+        return content
@@ -0,0 +1,102 @@
+import json
+import os
+from typing import Dict, NamedTuple, Optional
+from log import Log
+from skeleton_index import git_blob_sha
+
+STATUS_WRITTEN = "written"
+STATUS_FAILED = "failed"
+
+
+class JournalEntry(NamedTuple):
+    """A finished source file: the SHAs of its source and of the unit test before and after generation."""
+    file: str
+    source_sha: str
+    test_file: str
+    test_sha: str
+    output_sha: str
+    status: str
+
+
+class RunJournal:
+    """
+    Append-only JSON lines journal of the files finished by a run, kept in directory with the unit test outputs
+    stored by SHA. A later run with the same journal skips the files whose source and unit test are unchanged since
+    they were written, and restores their output instead of asking the AI again.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.resumed = 0
+        self.__path = os.path.join(directory, "journal.jsonl")
+        self.__entries: Dict[str, JournalEntry] = {}
+        os.makedirs(os.path.join(directory, "outputs"), exist_ok=True)
+        if os.path.exists(self.__path):
+            with open(self.__path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = JournalEntry(**json.loads(line))
+                    except (TypeError, ValueError):
+                        # The last line of a journal whose run was killed may be cut short
+                        continue
+                    self.__entries[entry.file] = entry
+            Log.print_green(f"Loaded run journal {self.__path} with {len(self.__entries)} files")
+        self.__journal = open(self.__path, 'a')
+
+    def resume(self, file: str, source: str, test_file: str, test: str) -> Optional[str]:
+        """
+        Returns the unit test an earlier run wrote for file from the same source, when test is that output or the
+        unit test it was generated from; otherwise None, and the file is generated again.
+        """
+        entry = self.__entries.get(file)
+        if not entry or entry.status != STATUS_WRITTEN or entry.test_file != test_file:
+            return None
+        if entry.source_sha != git_blob_sha(source):
+            return None
+        test_sha = git_blob_sha(test)
+        if test_sha == entry.output_sha:
+            self.resumed += 1
+            return test
+        if test_sha != entry.test_sha:
+            return None
+        output = self.__read_output(entry.output_sha)
+        if output is not None:
+            self.resumed += 1
+        return output
+
+    def record(self, file: str, source: str, test_file: str, test: str, output: Optional[str]):
+        """Records a finished file; output is the unit test written, or None when the file failed."""
+        output_sha = ""
+        if output is not None:
+            output_sha = git_blob_sha(output)
+            output_path = os.path.join(self.directory, "outputs", output_sha)
+            if not os.path.exists(output_path):
+                with open(output_path, 'w') as f:
+                    f.write(output)
+        entry = JournalEntry(file, git_blob_sha(source), test_file, git_blob_sha(test), output_sha,
+                             STATUS_WRITTEN if output is not None else STATUS_FAILED)
+        self.__entries[file] = entry
+        self.__journal.write(json.dumps(entry._asdict()) + "\n")
+        self.__journal.flush()
+
+    def close(self):
+        """Rewrites the journal with the last entry of each file and removes the outputs no longer referenced."""
+        self.__journal.close()
+        temp_path = f"{self.__path}.tmp"
+        with open(temp_path, 'w') as f:
+            for entry in self.__entries.values():
+                f.write(json.dumps(entry._asdict()) + "\n")
+        os.replace(temp_path, self.__path)
+        used = {entry.output_sha for entry in self.__entries.values()}
+        outputs = os.path.join(self.directory, "outputs")
+        for name in os.listdir(outputs):
+            if name not in used:
+                os.remove(os.path.join(outputs, name))
+        Log.print_green(f"Run journal: {self.resumed} files resumed, {len(self.__entries)} files recorded")
+
+    def __read_output(self, output_sha: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, "outputs", output_sha), 'r') as f:
+                return f.read()
+        except OSError:
+            return None
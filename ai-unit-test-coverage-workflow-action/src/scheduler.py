@@ -0,0 +1,84 @@
+import threading
+import time
+from typing import Dict, List, NamedTuple
+from instrumentation import Instrumentation
+from log import Log
+
+
+class WorkEstimate(NamedTuple):
+    """Estimated tokens of generating the unit test of a file, and the coverage it is expected to gain in lines."""
+    prompt_tokens: int
+    completion_tokens: int
+    value: float
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @staticmethod
+    def combine(estimates: List['WorkEstimate']) -> 'WorkEstimate':
+        return WorkEstimate(sum(estimate.prompt_tokens for estimate in estimates),
+                            sum(estimate.completion_tokens for estimate in estimates),
+                            sum(estimate.value for estimate in estimates))
+
+
+class Scheduler:
+    """
+    Orders work units (lists of files) by expected coverage gain per token, and admits them while the LLM tokens
+    used so far plus the estimates of the units in flight fit in max_tokens, and the average unit duration still fits
+    before the deadline. A unit that does not fit is deferred; smaller units after it may still be admitted.
+    Units estimated at zero tokens (files that will be skipped) are always admitted. Zero disables a limit.
+    """
+
+    def __init__(self, max_tokens: int = 0, deadline_seconds: float = 0, started: float = None):
+        self.max_tokens = max_tokens
+        self.deadline_seconds = deadline_seconds
+        self.deferred = 0
+        self.__started = time.monotonic() if started is None else started
+        self.__reserved = 0
+        self.__durations = []
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def order(units: List[List[str]], estimates: Dict[str, WorkEstimate]) -> List[List[str]]:
+        """Sorts the units by value per estimated token, highest first; ties keep their order."""
+        def priority(unit):
+            estimate = WorkEstimate.combine([estimates[file] for file in unit if file in estimates])
+            return -estimate.value / max(1, estimate.tokens)
+        return sorted(units, key=priority)
+
+    def admit(self, estimate: WorkEstimate) -> bool:
+        """Reserves the tokens of a unit and returns True when it fits in the budget and before the deadline."""
+        if not estimate.tokens:
+            return True
+        with self.__lock:
+            elapsed = time.monotonic() - self.__started
+            expected = sum(self.__durations) / len(self.__durations) if self.__durations else 0
+            if self.deadline_seconds and elapsed + expected > self.deadline_seconds:
+                self.deferred += 1
+                return False
+            if self.max_tokens and self.used_tokens() + self.__reserved + estimate.tokens > self.max_tokens:
+                self.deferred += 1
+                return False
+            self.__reserved += estimate.tokens
+            return True
+
+    def release(self, estimate: WorkEstimate, duration: float):
+        """Ends the reservation of an admitted unit once its LLM requests are done."""
+        if not estimate.tokens:
+            return
+        with self.__lock:
+            self.__reserved -= estimate.tokens
+            self.__durations.append(duration)
+
+    @staticmethod
+    def used_tokens() -> int:
+        """Tokens of the LLM requests finished so far, estimated where the provider reported no usage."""
+        return int(Instrumentation.counter("llm.tokens"))
+
+    def log_stats(self):
+        if self.deferred:
+            Log.print_yellow(f"Scheduler deferred {self.deferred} work units: "
+                             f"{self.used_tokens()} tokens used of MAX_TOKENS {self.max_tokens or 'unlimited'}, "
+                             f"{time.monotonic() - self.__started:.0f}s elapsed of DEADLINE_SECONDS "
+                             f"{self.deadline_seconds or 'unlimited'}")
@@ -0,0 +1,61 @@
+import heapq
+import os
+import shutil
+from typing import Dict, List
+from log import Log
+
+# Subdirectory of the shard directory with the generation manifest entries recorded by each shard
+MANIFESTS_DIR = ".manifests"
+
+
+def shard_files(files: List[str], costs: Dict[str, int], shard_index: int, shard_total: int) -> List[str]:
+    """
+    Returns the files of one shard, in the order of files. Files are assigned most expensive first to the least loaded
+    shard (ties broken by path and shard index), so every runner computes the same balanced partition.
+    """
+    if shard_total <= 1:
+        return list(files)
+    loads = [(0, index) for index in range(shard_total)]
+    assignment = {}
+    for file in sorted(files, key=lambda file: (-costs.get(file, 0), file)):
+        load, index = heapq.heappop(loads)
+        assignment[file] = index
+        heapq.heappush(loads, (load + max(1, costs.get(file, 0)), index))
+    return [file for file in files if assignment[file] == shard_index]
+
+
+def export_shard(files: List[str], shard_dir: str):
+    """Copies the unit test files written by this shard to shard_dir, keeping their repository paths."""
+    for file in files:
+        target = os.path.join(shard_dir, file)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(file, target)
+    Log.print_green(f"Exported {len(files)} unit test files to {shard_dir}")
+
+
+def import_shards(shard_dir: str) -> List[str]:
+    """Copies the unit test files exported by all shards from shard_dir into the working tree."""
+    imported = []
+    for root, dirs, names in os.walk(shard_dir):
+        if root == shard_dir and MANIFESTS_DIR in dirs:
+            dirs.remove(MANIFESTS_DIR)
+        for name in names:
+            source = os.path.join(root, name)
+            file = os.path.relpath(source, shard_dir)
+            os.makedirs(os.path.dirname(file) or ".", exist_ok=True)
+            shutil.copyfile(source, file)
+            imported.append(file)
+    Log.print_green(f"Imported {len(imported)} unit test files from {shard_dir}")
+    return sorted(imported)
+
+
+def shard_manifest_path(shard_dir: str, shard_index: int) -> str:
+    return os.path.join(shard_dir, MANIFESTS_DIR, f"{shard_index}.json")
+
+
+def shard_manifests(shard_dir: str) -> List[str]:
+    """The generation manifest entries exported by all shards."""
+    directory = os.path.join(shard_dir, MANIFESTS_DIR)
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))]
@@ -0,0 +1,170 @@
+import ast
+import hashlib
+import json
+import os
+import threading
+from typing import Dict
+from code_symbols import STRING_LITERAL, find_symbols, strip_comments
+from log import Log
+
+# Bump when the skeleton format changes, so indexes written by older versions are rebuilt
+SKELETON_VERSION = 1
+
+# Assignments longer than this are shortened to "name = ..."
+MAX_ASSIGNMENT_LENGTH = 200
+
+BRACE_EXTENSIONS = ('.java', '.kt', '.js', '.ts', '.swift', '.c', '.h', '.scala', '.groovy')
+
+
+def extract_skeleton(content: str, extension: str) -> str:
+    """
+    Returns the skeleton of a source file: imports, constants, class and function signatures and docstrings,
+    with function bodies elided. Files that cannot be parsed, or of other languages, are returned unchanged.
+    """
+    if extension == '.py':
+        return _python_skeleton(content)
+    if extension in BRACE_EXTENSIONS:
+        return _brace_skeleton(content, extension)
+    return content
+
+
+def git_blob_sha(content: str) -> str:
+    """The SHA git gives a blob with this content, for files the snapshot does not know."""
+    data = content.encode('utf-8')
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class SkeletonIndex:
+    """
+    Skeletons of source files keyed by blob SHA, so unchanged files are never parsed again.
+    Persisted as JSON at path when one is given; save keeps only the entries used since the previous save.
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.__skeletons: Dict[str, str] = {}
+        self.__used = set()
+        self.__lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                if data.get("version") == SKELETON_VERSION:
+                    self.__skeletons = data.get("skeletons", {})
+            except (OSError, ValueError) as e:
+                Log.print_yellow(f"Ignoring unreadable skeleton index {path}:", e)
+
+    def skeleton(self, file: str, content: str, blob_sha: str = None) -> str:
+        key = blob_sha or git_blob_sha(content)
+        with self.__lock:
+            self.__used.add(key)
+            skeleton = self.__skeletons.get(key)
+            if skeleton is not None:
+                self.hits += 1
+                return skeleton
+            self.misses += 1
+        skeleton = extract_skeleton(content, os.path.splitext(file)[1])
+        with self.__lock:
+            self.__skeletons[key] = skeleton
+        return skeleton
+
+    def save(self):
+        with self.__lock:
+            if not self.__used:
+                # Nothing was looked up, e.g. a daemon job that reused its warm dependency graph
+                return
+            # A daemon worker keeps the index between jobs; each save starts the bookkeeping of the next job
+            skeletons = {key: value for key, value in self.__skeletons.items() if key in self.__used}
+            self.__skeletons = dict(skeletons)
+            self.__used = set()
+            hits, misses = self.hits, self.misses
+            self.hits = self.misses = 0
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({"version": SKELETON_VERSION, "skeletons": skeletons}, f)
+        os.replace(temp_path, self.path)
+        Log.print_green(f"Skeleton index: {hits} reused, {misses} parsed, saved to {self.path}")
+
+
+def _python_skeleton(content: str) -> str:
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return content
+    tree.body = _python_members(tree.body, module=True)
+    return ast.unparse(tree) + "\n"
+
+
+def _python_members(body, module=False):
+    members = []
+    for index, node in enumerate(body):
+        if index == 0 and _is_docstring(node):
+            members.append(node)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            members.append(node)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            if len(ast.unparse(node)) > MAX_ASSIGNMENT_LENGTH and node.value is not None:
+                node.value = ast.Constant(Ellipsis)
+            members.append(node)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if _is_private(node.name):
+                continue
+            docstring = [node.body[0]] if _is_docstring(node.body[0]) else []
+            node.body = docstring + [ast.Expr(ast.Constant(Ellipsis))]
+            members.append(node)
+        elif isinstance(node, ast.ClassDef):
+            if _is_private(node.name) and module:
+                continue
+            node.body = _python_members(node.body) or [ast.Expr(ast.Constant(Ellipsis))]
+            members.append(node)
+        elif module and isinstance(node, ast.Try):
+            # Optional imports: try: import x / except ImportError: ...
+            imports = [child for child in node.body if isinstance(child, (ast.Import, ast.ImportFrom))]
+            members.extend(imports)
+    return members
+
+
+def _is_docstring(node) -> bool:
+    return isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+
+
+def _is_private(name: str) -> bool:
+    return name.startswith('_') and not (name.startswith('__') and name.endswith('__'))
+
+
+def _brace_skeleton(content: str, extension: str) -> str:
+    lines = content.splitlines()
+    elided = []
+    covered_until = 0
+    for symbol in find_symbols(content, extension):
+        if symbol.kind != 'function' or symbol.start <= covered_until:
+            continue
+        covered_until = symbol.end
+        body_start = _opening_brace_line(lines, symbol.start, symbol.end)
+        if body_start < symbol.end:
+            elided.append((body_start, symbol.end))
+
+    skeleton = []
+    next_line = 1
+    for body_start, end in elided:
+        skeleton += lines[next_line - 1:body_start]
+        closing = lines[end - 1]
+        indent = closing[:len(closing) - len(closing.lstrip())]
+        skeleton += [f"{indent}    /* ... */", closing if closing.lstrip().startswith('}') else f"{indent}}}"]
+        next_line = end + 1
+    skeleton += lines[next_line - 1:]
+    return "\n".join(skeleton) + "\n"
+
+
+def _opening_brace_line(lines, start: int, end: int) -> int:
+    in_block_comment = False
+    for line_number in range(start, end + 1):
+        code, in_block_comment = strip_comments(STRING_LITERAL.sub('""', lines[line_number - 1]), in_block_comment)
+        if '{' in code:
+            return line_number
+    return end
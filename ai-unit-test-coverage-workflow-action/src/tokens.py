@@ -0,0 +1,3 @@
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token) used for budgeting prompts."""
+    return len(text) // 4 + 1
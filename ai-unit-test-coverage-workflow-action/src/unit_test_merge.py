@@ -0,0 +1,217 @@
+import ast
+import re
+from typing import List, Optional
+from code_symbols import STRING_LITERAL, Symbol, find_symbols, strip_comments
+
+IMPORT_LINE = re.compile(r'^\s*(?:import\s|@testable\s+import\s|#\s*include\s|using\s|from\s+\S+\s+import\s|'
+                         r'(?:const|let|var)\s+[\w{}\s,]+=\s*require\()')
+ANNOTATION = re.compile(r'@[\w.:]+(?:\([^)]*\))?\s*')
+VARIABLE_NAME = re.compile(r'\b(?:val|var|let|const)\s+([A-Za-z_]\w*)')
+IDENTIFIER = re.compile(r'([A-Za-z_]\w*)\s*$')
+
+
+def merge_test_files(existing: str, generated: str, extension: str) -> Optional[str]:
+    """
+    Merges a generated (possibly partial) test file into the existing one: missing imports and class fields are added,
+    tests with the same name are replaced and new tests are appended, while all other existing tests are kept.
+    Returns None when either side cannot be parsed, since a partial generated file cannot replace the existing one.
+    """
+    if not existing.strip():
+        return generated if find_symbols(generated, extension) else None
+    if not generated.strip():
+        return existing
+    if extension == '.py':
+        merged = _merge_python(existing, generated)
+    else:
+        merged = _merge_braces(existing, generated, extension)
+    return merged
+
+
+def _merge_python(existing: str, generated: str):
+    try:
+        existing_tree = ast.parse(existing)
+        generated_tree = ast.parse(generated)
+    except (SyntaxError, ValueError):
+        return None
+
+    existing_lines = existing.splitlines()
+    generated_lines = generated.splitlines()
+    edits = []
+
+    existing_imports = [node for node in existing_tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    known_imports = {ast.get_source_segment(existing, node) for node in existing_imports}
+    new_imports = [ast.get_source_segment(generated, node) for node in generated_tree.body
+                   if isinstance(node, (ast.Import, ast.ImportFrom))
+                   and ast.get_source_segment(generated, node) not in known_imports]
+    if new_imports:
+        after = existing_imports[-1].end_lineno if existing_imports else 0
+        edits.append((after + 1, after, "\n".join(new_imports)))
+
+    definitions = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+    existing_definitions = {node.name: node for node in existing_tree.body if isinstance(node, definitions)}
+    main_guard = next((node for node in existing_tree.body if isinstance(node, ast.If)
+                       and isinstance(node.test, ast.Compare) and isinstance(node.test.left, ast.Name)
+                       and node.test.left.id == '__name__'), None)
+    append_at = main_guard.lineno if main_guard else len(existing_lines) + 1
+    appended = []
+
+    for node in generated_tree.body:
+        if not isinstance(node, definitions):
+            continue
+        source = _python_node_source(generated_lines, node)
+        current = existing_definitions.get(node.name)
+        if current is None:
+            appended.append(source)
+        elif isinstance(node, ast.ClassDef) and isinstance(current, ast.ClassDef):
+            edits.extend(_merge_python_class(existing_lines, current, generated_lines, node))
+        else:
+            edits.append((_python_node_start(current), current.end_lineno, source))
+
+    if appended:
+        text = "\n\n" + "\n\n\n".join(appended) + ("\n\n\n" if main_guard else "")
+        edits.append((append_at, append_at - 1, text))
+    return _apply_edits(existing_lines, edits)
+
+
+def _merge_python_class(existing_lines: List[str], existing_class: ast.ClassDef,
+                        generated_lines: List[str], generated_class: ast.ClassDef):
+    edits = []
+    methods = {node.name: node for node in existing_class.body
+               if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    appended = []
+    for node in generated_class.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        source = _python_node_source(generated_lines, node)
+        if node.name in methods:
+            current = methods[node.name]
+            edits.append((_python_node_start(current), current.end_lineno, source))
+        else:
+            appended.append(source)
+    if appended:
+        end = existing_class.end_lineno
+        edits.append((end + 1, end, "\n" + "\n\n".join(appended)))
+    return edits
+
+
+def _python_node_start(node) -> int:
+    return min([node.lineno] + [decorator.lineno for decorator in getattr(node, 'decorator_list', [])])
+
+
+def _python_node_source(lines: List[str], node) -> str:
+    return "\n".join(lines[_python_node_start(node) - 1:node.end_lineno])
+
+
+def _merge_braces(existing: str, generated: str, extension: str):
+    existing_symbols = find_symbols(existing, extension)
+    generated_symbols = find_symbols(generated, extension)
+    if not existing_symbols or not generated_symbols:
+        return None
+
+    existing_lines = existing.splitlines()
+    generated_lines = generated.splitlines()
+    edits = []
+
+    known_imports = {line.strip() for line in existing_lines if IMPORT_LINE.match(line)}
+    new_imports = []
+    for line in generated_lines:
+        if IMPORT_LINE.match(line) and line.strip() not in known_imports:
+            known_imports.add(line.strip())
+            new_imports.append(line)
+    if new_imports:
+        import_lines = [index + 1 for index, line in enumerate(existing_lines) if IMPORT_LINE.match(line)]
+        package_lines = [index + 1 for index, line in enumerate(existing_lines) if line.startswith('package ')]
+        after = (import_lines or package_lines or [0])[-1]
+        edits.append((after + 1, after, "\n".join(new_imports)))
+
+    existing_tests = {symbol.qualified_name: symbol for symbol in _outer_functions(existing_symbols)}
+    existing_classes = {symbol.qualified_name: symbol for symbol in existing_symbols if symbol.kind == 'class'}
+    # Fields and properties the generated tests use (mocks, fixtures) are added to their class when it lacks them
+    for generated_class in (symbol for symbol in generated_symbols if symbol.kind == 'class'):
+        current = existing_classes.get(generated_class.qualified_name)
+        if not current:
+            continue
+        known_members = {name for name, _, _ in _class_members(existing_lines, current, existing_symbols)}
+        new_members = ["\n".join(generated_lines[start - 1:end])
+                       for name, start, end in _class_members(generated_lines, generated_class, generated_symbols)
+                       if name not in known_members]
+        if new_members:
+            body_start = _class_body_start(existing_lines, current)
+            edits.append((body_start, body_start - 1, "\n".join(new_members) + "\n"))
+    last_class = max(existing_classes.values(), key=lambda symbol: symbol.end, default=None)
+    insertions = {}
+    for symbol in _outer_functions(generated_symbols):
+        source = "\n".join(generated_lines[symbol.start - 1:symbol.end])
+        current = existing_tests.get(symbol.qualified_name)
+        if current:
+            edits.append((current.start, current.end, source))
+            continue
+        # New tests go at the end of their class, or at the end of the file for top-level tests
+        container = existing_classes.get(symbol.parent) or (last_class if symbol.parent else None)
+        position = container.end if container else len(existing_lines) + 1
+        insertions.setdefault(position, []).append(source)
+
+    for position, sources in insertions.items():
+        edits.append((position, position - 1, "\n" + "\n\n".join(sources)))
+    return _apply_edits(existing_lines, edits)
+
+
+def _class_body_start(lines: List[str], class_symbol: Symbol) -> int:
+    """The line after the opening brace of a class."""
+    in_block_comment = False
+    for line_number in range(class_symbol.start, class_symbol.end + 1):
+        code, in_block_comment = strip_comments(STRING_LITERAL.sub('""', lines[line_number - 1]), in_block_comment)
+        if '{' in code:
+            return line_number + 1
+    return class_symbol.end
+
+
+def _class_members(lines: List[str], class_symbol: Symbol, symbols: List[Symbol]):
+    """
+    The fields, properties and other non-function members declared directly in a class, as (name, start, end)
+    tuples over 1-based inclusive lines, with their annotations.
+    """
+    nested = [symbol for symbol in symbols
+              if symbol is not class_symbol and class_symbol.start <= symbol.start and symbol.end <= class_symbol.end]
+    members = []
+    statement = None
+    depth = 0
+    in_block_comment = False
+    for line_number in range(_class_body_start(lines, class_symbol), class_symbol.end):
+        if any(symbol.start <= line_number <= symbol.end for symbol in nested):
+            continue
+        code, in_block_comment = strip_comments(STRING_LITERAL.sub('""', lines[line_number - 1]), in_block_comment)
+        code = code.strip()
+        if statement is None:
+            if not code or code.startswith('}'):
+                continue
+            statement = [line_number, line_number, ""]
+        statement[1] = line_number
+        statement[2] += " " + code
+        depth += code.count('{') + code.count('(') - code.count('}') - code.count(')')
+        if depth > 0 or ANNOTATION.fullmatch(code) or code.endswith((',', '=', '+', '-', '.', ':')):
+            continue
+        head = re.split(r'[={;(]', ANNOTATION.sub('', statement[2]))[0]
+        match = VARIABLE_NAME.search(head) or IDENTIFIER.search(re.split(r'(?<!:):(?!:)', head)[0])
+        if match:
+            members.append((match.group(1), statement[0], statement[1]))
+        statement, depth = None, 0
+    return members
+
+
+def _outer_functions(symbols: List[Symbol]) -> List[Symbol]:
+    functions = [symbol for symbol in symbols if symbol.kind == 'function']
+    return [symbol for symbol in functions
+            if not any(other is not symbol and other.start <= symbol.start and symbol.end <= other.end
+                       for other in functions)]
+
+
+def _apply_edits(lines: List[str], edits) -> str:
+    """
+    Applies (start, end, text) edits over 1-based inclusive line ranges, bottom-up.
+    An edit with end == start - 1 inserts text before line start.
+    """
+    lines = list(lines)
+    for start, end, text in sorted(edits, key=lambda edit: (edit[0], edit[1]), reverse=True):
+        lines[start - 1:end] = text.splitlines()
+    return "\n".join(lines) + "\n"
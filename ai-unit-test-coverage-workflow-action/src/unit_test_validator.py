@@ -0,0 +1,163 @@
+import contextlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from code_symbols import STRING_LITERAL, strip_comments
+from build_commands import get_test_file_command
+from build_runner import run_build
+from log import Log
+
+FENCED_BLOCK = re.compile(r'```[\w+#.-]*[ \t]*\n(.*?)(?:\n```|\Z)', re.DOTALL)
+CLOSING_DELIMITERS = {')': '(', ']': '[', '}': '{'}
+
+# Maximum characters of a failure message fed back to the bot
+MAX_ERROR_LENGTH = 4000
+
+# Build tools whose tests can safely run in parallel in the same working tree
+PARALLEL_SAFE_BUILD_TOOLS = {'pytest', 'npm'}
+
+_test_run_lock = threading.Lock()
+
+
+class _CandidateGate:
+    """Counts the candidates run_test_file has written into the working tree, and lets a commit wait them out."""
+
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__written = 0
+        self.__paused = False
+
+    @contextlib.contextmanager
+    def candidate(self):
+        with self.__condition:
+            self.__condition.wait_for(lambda: not self.__paused)
+            self.__written += 1
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__written -= 1
+                self.__condition.notify_all()
+
+    @contextlib.contextmanager
+    def exclusive(self):
+        with self.__condition:
+            self.__condition.wait_for(lambda: not self.__paused)
+            self.__paused = True
+            self.__condition.wait_for(lambda: not self.__written)
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__paused = False
+                self.__condition.notify_all()
+
+
+_candidates = _CandidateGate()
+
+
+def without_candidates_in_tree():
+    """
+    Context manager during which no unvalidated candidate is in the working tree: it waits for the running
+    validations to restore their test files and holds new ones back, e.g. while the unit tests are committed.
+    """
+    return _candidates.exclusive()
+
+
+def strip_markdown_fences(content: str) -> str:
+    """Returns the code of the largest fenced block when the bot wrapped its answer in markdown."""
+    blocks = FENCED_BLOCK.findall(content)
+    if not blocks:
+        return content
+    return max(blocks, key=len).strip() + "\n"
+
+
+def check_syntax(path: str, content: str) -> str:
+    """
+    Cheap, language-aware syntax check of a test file. Returns an error message, or an empty string.
+    Runs in worker processes, so it must stay a picklable module-level function.
+    """
+    extension = os.path.splitext(path)[1]
+    if extension == '.py':
+        try:
+            compile(content, path, 'exec')
+        except SyntaxError as e:
+            return f"SyntaxError: {e.msg} at line {e.lineno}: {(e.text or '').strip()}"
+        return ""
+    if extension == '.js' and shutil.which('node'):
+        return _check_with_tool(['node', '--check'], extension, content)
+    if extension == '.swift' and shutil.which('swiftc'):
+        return _check_with_tool(['swiftc', '-parse'], extension, content)
+    return check_delimiters(content)
+
+
+def check_delimiters(content: str) -> str:
+    """Checks that brackets are balanced, ignoring strings and comments."""
+    stack = []
+    in_block_comment = False
+    for line_number, line in enumerate(content.splitlines(), 1):
+        code, in_block_comment = strip_comments(STRING_LITERAL.sub('""', line), in_block_comment)
+        for char in code:
+            if char in '([{':
+                stack.append((char, line_number))
+            elif char in CLOSING_DELIMITERS:
+                if not stack or stack[-1][0] != CLOSING_DELIMITERS[char]:
+                    return f"Unbalanced '{char}' at line {line_number}"
+                stack.pop()
+    if stack:
+        char, line_number = stack[-1]
+        return f"Unclosed '{char}' opened at line {line_number}"
+    return ""
+
+
+def run_test_file(build_tool: str, test_file: str, content: str, timeout: float) -> str:
+    """
+    Temporarily writes content to test_file, runs only that test file and restores the previous file.
+    Returns the tail of the output when the tests fail, or an empty string.
+    """
+    command = get_test_file_command(build_tool, test_file)
+    if not command:
+        return ""
+
+    lock = contextlib.nullcontext() if build_tool.lower() in PARALLEL_SAFE_BUILD_TOOLS else _test_run_lock
+    with lock, _candidates.candidate():
+        return _run_candidate(command, test_file, content, timeout)
+
+
+def _run_candidate(command: str, test_file: str, content: str, timeout: float) -> str:
+    previous = None
+    if os.path.exists(test_file):
+        with open(test_file, 'r') as f:
+            previous = f.read()
+    try:
+        os.makedirs(os.path.dirname(test_file) or ".", exist_ok=True)
+        with open(test_file, 'w') as f:
+            f.write(content)
+        Log.print_green(f"Running affected tests: {command}")
+        result = run_build(command, timeout, echo=False)
+        if result.timed_out:
+            return f"Running {command} timed out after {timeout}s"
+        if result.passed:
+            return ""
+        return result.output_tail[-MAX_ERROR_LENGTH:]
+    finally:
+        if previous is None:
+            os.remove(test_file)
+        else:
+            with open(test_file, 'w') as f:
+                f.write(previous)
+
+
+def _check_with_tool(command, extension: str, content: str) -> str:
+    with tempfile.NamedTemporaryFile('w', suffix=extension, delete=False) as f:
+        f.write(content)
+    try:
+        result = subprocess.run(command + [f.name], capture_output=True, text=True, timeout=60)
+        return "" if result.returncode == 0 else (result.stdout + result.stderr)[-MAX_ERROR_LENGTH:]
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    finally:
+        os.remove(f.name)
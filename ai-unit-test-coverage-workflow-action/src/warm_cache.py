@@ -0,0 +1,39 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+from instrumentation import Instrumentation
+
+
+class WarmCache:
+    """
+    Objects kept between the jobs of a generation daemon worker: bot clients with their HTTP pools and rate limiters,
+    the skeleton index and the dependency graph of each repository. Disabled in one-shot runs, where every object is
+    built once anyway.
+    """
+
+    enabled = False
+    __lock = threading.Lock()
+    __objects: Dict[Hashable, Tuple[Hashable, Any]] = {}
+
+    @staticmethod
+    def get(key: Hashable, factory: Callable[[], Any], version: Hashable = ""):
+        """
+        Returns the object kept under key, built by factory on first use. A different version (e.g. the content hash
+        of the files the object was built from) replaces the kept object; a None version is never reused.
+        """
+        if not WarmCache.enabled:
+            return factory()
+        with WarmCache.__lock:
+            kept = WarmCache.__objects.get(key)
+            if kept and version is not None and kept[0] == version:
+                Instrumentation.increment("warm_cache.hits")
+                return kept[1]
+        value = factory()
+        with WarmCache.__lock:
+            WarmCache.__objects[key] = (version, value)
+        Instrumentation.increment("warm_cache.misses")
+        return value
+
+    @staticmethod
+    def clear():
+        with WarmCache.__lock:
+            WarmCache.__objects = {}
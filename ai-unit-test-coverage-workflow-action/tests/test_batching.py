@@ -0,0 +1,59 @@
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ai.ai_bot import AiBot
+from batching import BatchItem, plan_batches, split_batch_response
+from dependency_graph import DependencyGraph
+
+
+def test_plan_batches_respects_budget_and_file_limit():
+    files = ['a.py', 'big.py', 'b.py', 'c.py', 'd.py']
+    file_tokens = {'a.py': 300, 'b.py': 300, 'c.py': 300, 'd.py': 100}
+    assert plan_batches(files, file_tokens, 700, 8) == [['big.py'], ['a.py', 'b.py'], ['c.py', 'd.py']]
+    assert plan_batches(files, file_tokens, 10000, 3) == [['big.py'], ['a.py', 'b.py', 'c.py'], ['d.py']]
+
+
+def test_split_batch_response_round_trips_the_prompt_format():
+    items = [BatchItem("def a(): pass", "", "tests/test_a.py", ""),
+             BatchItem("def b(): pass", "", "tests/test_b.py", "")]
+    prompt = AiBot.build_batch_test_generation_prompt(items, "")
+    assert "File 2 of 2" in prompt and "tests/test_b.py" in prompt
+
+    response = ("Here you go\n"
+                "<<<UNIT TEST FILE: tests/test_a.py>>>\n```python\ndef test_a():\n    pass\n```\n<<<END UNIT TEST FILE>>>\n"
+                "<<<UNIT TEST FILE: tests/test_other.py>>>\ndef test_x(): pass\n<<<END UNIT TEST FILE>>>\n"
+                "<<<UNIT TEST FILE: tests/test_b.py>>>\n<<<END UNIT TEST FILE>>>\n")
+    assert split_batch_response(response, ['tests/test_a.py', 'tests/test_b.py']) == {
+        'tests/test_a.py': "def test_a():\n    pass\n"}
+    assert split_batch_response("not delimited", ['tests/test_a.py']) == {}
+
+
+def test_batch_falls_back_to_single_requests(monkeypatch):
+    for name, value in {'BRANCH_NAME': 'main', 'MASTER_BRANCH_NAME': 'main', 'TARGET_EXTENSIONS': 'py',
+                        'BUILD_TOOL': 'pytest', 'GENERATE_MODE': 'FULL', 'SRC_PATH': 'src', 'TEST_PATH': 'tests',
+                        'VALIDATE_TESTS': 'false', 'BATCH_TOKEN_BUDGET': '1000'}.items():
+        monkeypatch.setenv(name, value)
+    import github_test_coverage
+    from env_vars import EnvVars
+    monkeypatch.setattr(github_test_coverage, 'vars', EnvVars(), raising=False)
+
+    files = ['src/a.py', 'src/b.py', 'src/c.py']
+    ai = MagicMock()
+    ai.ai_generate_batch_test_coverage.return_value = (
+        "<<<UNIT TEST FILE: tests/test_a.py>>>\ndef test_a(): pass\n<<<END UNIT TEST FILE>>>\n"
+        "<<<UNIT TEST FILE: tests/test_c.py>>>\ndef test_c(): pass\n<<<END UNIT TEST FILE>>>\n")
+    ai.ai_generate_test_coverage.return_value = "def test_b(): pass\n"
+    written = []
+    with patch('github_test_coverage.get_file_content',
+               side_effect=lambda path: f"def {path[-4]}(): pass\n" if path in files else ''), \
+            patch('github_test_coverage.overwrite_unit_test_file',
+                  side_effect=lambda path, content: written.append((path, content))):
+        github_test_coverage.generate_unit_tests(ai, files, DependencyGraph({}), 2)
+
+    assert ai.ai_generate_batch_test_coverage.call_count == 1
+    assert ai.ai_generate_test_coverage.call_args.kwargs['unit_test_file_path'] == 'tests/test_b.py'
+    assert written == [('tests/test_a.py', "def test_a(): pass\n"), ('tests/test_b.py', "def test_b(): pass\n"),
+                       ('tests/test_c.py', "def test_c(): pass\n")]
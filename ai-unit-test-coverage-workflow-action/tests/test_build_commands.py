@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from build_commands import get_affected_tests_command, get_test_file_command
+
+TEST_FILES = ['src/test/java/com/example/CalcTest.java', 'src/test/java/com/example/MathTest.java']
+
+
+def test_affected_tests_command_uses_each_tool_selector_without_cleaning():
+    assert get_affected_tests_command('mvn', TEST_FILES) == \
+        'mvn verify -Dtest=CalcTest,MathTest -Dsurefire.failIfNoSpecifiedTests=false'
+    assert get_affected_tests_command('gradle', TEST_FILES) == './gradlew test --tests "*CalcTest" --tests "*MathTest"'
+    assert get_affected_tests_command('sbt', ['src/test/scala/CalcSpec.scala']) == 'sbt coverage "testOnly *CalcSpec"'
+    assert get_affected_tests_command('swift', ['Tests/CalcTests.swift']) == \
+        'swift test --enable-code-coverage --filter "CalcTests"'
+    assert get_affected_tests_command('pytest', ['tests/test_calc.py', 'tests/test a.py']) == \
+        "pytest --cov=src --cov-report=term --cov-report=xml tests/test_calc.py 'tests/test a.py'"
+    assert get_affected_tests_command('npm', ['test/calc.test.js']) == 'npm test -- --coverage test/calc.test.js'
+    assert get_affected_tests_command('none', TEST_FILES) == ""
+    assert all('clean' not in get_affected_tests_command(tool, TEST_FILES)
+               for tool in ['mvn', 'gradle', 'npm', 'pytest', 'swift', 'sbt'])
+
+
+def test_test_file_command_quotes_paths():
+    assert get_test_file_command('pytest', 'tests/test a.py') == "pytest -q 'tests/test a.py'"
+    assert get_test_file_command('npm', 'test/$(x).test.js') == "npm test -- 'test/$(x).test.js'"
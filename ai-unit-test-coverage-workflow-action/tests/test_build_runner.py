@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from build_runner import BuildOutputParser, run_build
+
+
+def test_parser_extracts_coverage_and_failing_tests():
+    parser = BuildOutputParser()
+    for line in ["tests/test_calc.py .F",
+                 "FAILED tests/test_calc.py::test_divide - ZeroDivisionError",
+                 "TOTAL                              120     30    75%",
+                 "[ERROR] testAdd(com.example.CalcTest)  Time elapsed: 0.01 s  <<< FAILURE!",
+                 "CalcTest > subtracts() FAILED",
+                 "FAILED tests/test_calc.py::test_divide - ZeroDivisionError",
+                 "All files |   85.5 |    70 |   90 |   85.5 |"]:
+        parser.feed(line + "\n")
+    assert parser.coverage_percent == 85.5
+    assert parser.failing_tests == ["tests/test_calc.py::test_divide", "testAdd(com.example.CalcTest)",
+                                    "CalcTest > subtracts()"]
+
+
+def test_run_build_streams_output_to_a_log_and_keeps_the_tail(tmp_path):
+    log_path = str(tmp_path / "build.log")
+    result = run_build("for i in $(seq 1 500); do echo line $i; done; echo 'TOTAL 10 1 90%'; exit 3",
+                       log_path=log_path, echo=False)
+    assert result.return_code == 3 and not result.passed and not result.timed_out
+    assert result.coverage_percent == 90.0
+    assert result.output_tail.splitlines()[-1] == "TOTAL 10 1 90%"
+    assert len(result.output_tail.splitlines()) == 200
+    with open(log_path) as f:
+        assert len(f.readlines()) == 501
+
+
+def test_run_build_kills_the_process_tree_on_timeout():
+    started = time.monotonic()
+    result = run_build("echo started; sleep 30 & sleep 30; wait", timeout=0.5, echo=False)
+    assert result.timed_out and not result.passed
+    assert result.output_tail == "started\n"
+    assert time.monotonic() - started < 5
+
+
+def test_run_build_without_a_writable_log_still_drains_the_output(tmp_path):
+    result = run_build("for i in $(seq 1 20000); do echo line $i; done", timeout=30,
+                       log_path=str(tmp_path / "missing" / "build.log"), echo=False)
+    assert result.passed and not result.timed_out
+    assert result.output_tail.splitlines()[-1] == "line 20000"
@@ -0,0 +1,42 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ai import chat_gpt
+from ai.ai_bot import PROMPT_PREFIX_END
+from ai.chat_gpt import ChatGPT
+from ai.http_transport import HttpTransport
+
+
+class FakeStream(list):
+    def close(self):
+        pass
+
+
+class FakeOpenAI:
+    requests = []
+
+    def __init__(self, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        FakeOpenAI.requests.append(kwargs)
+        delta = SimpleNamespace(content="def test_a(): pass\n")
+        return FakeStream([SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=delta)])])
+
+
+def test_prompt_cache_fields_are_sent_only_when_prefix_caching_applies(monkeypatch):
+    monkeypatch.setattr(chat_gpt, 'OpenAI', FakeOpenAI)
+    FakeOpenAI.requests = []
+    prompt = "Instructions\n" + "def util(): pass\n" * 50 + PROMPT_PREFIX_END + "def a(): pass\n"
+    for cache_ttl, cache_min_tokens in ((0, 10), (600, 10_000), (600, 10)):
+        bot = ChatGPT("key", "gpt", HttpTransport(max_retries=0), cache_ttl=cache_ttl,
+                      cache_min_tokens=cache_min_tokens)
+        assert bot.ai_complete(prompt) == "def test_a(): pass\n"
+
+    uncached, too_short, cached = FakeOpenAI.requests
+    for request in (uncached, too_short):
+        assert "prompt_cache_key" not in request and "stream_options" not in request
+    assert cached["prompt_cache_key"] and cached["stream_options"] == {"include_usage": True}
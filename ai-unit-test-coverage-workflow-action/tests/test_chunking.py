@@ -0,0 +1,93 @@
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from chunking import split_into_chunks
+from dependency_graph import DependencyGraph
+
+JAVA_SOURCE = "package com.acme;\n\npublic class Big {\n" + "".join(
+    f"    public int method{i}(int value) {{\n" + "        value += 1;\n" * 40 + "        return value;\n    }\n\n"
+    for i in range(6)) + "}\n"
+
+EXISTING_TEST = '''package com.acme;
+
+class BigTest {
+    @Test
+    void method0Works() {
+        assertEquals(41, new Big().method0(0));
+    }
+
+    @Test
+    void unrelated() {
+    }
+}
+'''
+
+
+def test_split_into_chunks_groups_methods_with_their_tests():
+    plan = split_into_chunks('src/Big.java', JAVA_SOURCE, EXISTING_TEST, 500)
+    assert [chunk.symbols for chunk in plan.chunks] == [['Big.method0', 'Big.method1'], ['Big.method2', 'Big.method3'],
+                                                        ['Big.method4', 'Big.method5']]
+    assert 'public int method5(int value) {\n        /* ... */' in plan.outline
+    assert 'method0Works' in plan.chunks[0].unit_test and 'unrelated' not in plan.chunks[0].unit_test
+    assert plan.chunks[1].unit_test.startswith('package com.acme;')
+    assert split_into_chunks('src/Big.java', JAVA_SOURCE, '', 100000) is None
+
+
+def test_chunked_generation_merges_partial_test_files(monkeypatch):
+    for name, value in {'BRANCH_NAME': 'main', 'MASTER_BRANCH_NAME': 'main', 'TARGET_EXTENSIONS': 'py',
+                        'BUILD_TOOL': 'pytest', 'GENERATE_MODE': 'FULL', 'SRC_PATH': 'src', 'TEST_PATH': 'tests',
+                        'MAX_CONCURRENCY': '3', 'CHUNK_TOKEN_THRESHOLD': '100', 'CHUNK_TOKENS': '60'}.items():
+        monkeypatch.setenv(name, value)
+    import github_test_coverage
+    from env_vars import EnvVars
+    monkeypatch.setattr(github_test_coverage, 'vars', EnvVars(), raising=False)
+
+    source = "".join(f"def f{i}(x):\n" + "    x += 1\n" * 20 + "    return x\n\n\n" for i in range(3))
+
+    def fake_generate(code, **kwargs):
+        name = code.split('(')[0].split()[-1]
+        return f"import pytest\nfrom src.big import {name}\n\n\ndef test_{name}():\n    assert {name}(0) == 20\n"
+
+    ai = MagicMock()
+    ai.ai_generate_test_coverage.side_effect = fake_generate
+    with patch('github_test_coverage.get_file_content', side_effect=lambda path: source if path == 'src/big.py' else ''):
+        unit_test_file, content = github_test_coverage.generate_unit_test_for_file(ai, 'src/big.py', DependencyGraph({}))
+
+    assert unit_test_file == 'tests/test_big.py'
+    assert ai.ai_generate_test_coverage.call_count == 3
+    assert content.count("import pytest") == 1
+    assert all(f"def test_f{i}():" in content for i in range(3))
+    compile(content, unit_test_file, 'exec')
+    assert 'def f0(x):\n    ...' in ai.ai_generate_test_coverage.call_args.kwargs['all_source_files']
+
+
+def test_chunked_generation_skips_parts_that_cannot_be_merged(monkeypatch):
+    for name, value in {'BRANCH_NAME': 'main', 'MASTER_BRANCH_NAME': 'main', 'TARGET_EXTENSIONS': 'py',
+                        'BUILD_TOOL': 'pytest', 'GENERATE_MODE': 'FULL', 'SRC_PATH': 'src', 'TEST_PATH': 'tests',
+                        'MAX_CONCURRENCY': '3', 'CHUNK_TOKEN_THRESHOLD': '100', 'CHUNK_TOKENS': '60'}.items():
+        monkeypatch.setenv(name, value)
+    import github_test_coverage
+    from env_vars import EnvVars
+    monkeypatch.setattr(github_test_coverage, 'vars', EnvVars(), raising=False)
+
+    source = "".join(f"def f{i}(x):\n" + "    x += 1\n" * 20 + "    return x\n\n\n" for i in range(3))
+    existing = "def test_existing():\n    assert True\n"
+
+    def fake_generate(code, **kwargs):
+        name = code.split('(')[0].split()[-1]
+        if name == 'f1':
+            return f"def test_{name}(self:\n"
+        return f"def test_{name}():\n    assert {name}(0) == 20\n"
+
+    ai = MagicMock()
+    ai.ai_generate_test_coverage.side_effect = fake_generate
+    files = {'src/big.py': source, 'tests/test_big.py': existing}
+    with patch('github_test_coverage.get_file_content', side_effect=lambda path: files.get(path, '')):
+        _, content = github_test_coverage.generate_unit_test_for_file(ai, 'src/big.py', DependencyGraph({}))
+
+    assert all(f"def {name}():" in content for name in ('test_existing', 'test_f0', 'test_f2'))
+    assert 'test_f1' not in content
+    compile(content, 'tests/test_big.py', 'exec')
@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ai.ai_bot import AiBot
+from ai.composite_bot import CompositeBot, MIN_SAMPLES
+
+
+class FakeBot(AiBot):
+    def __init__(self, answer, delay=0.0, error=None):
+        self.answer = answer
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def ai_complete(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.answer
+
+
+def test_fails_over_to_the_next_backend():
+    broken = FakeBot("", error=RuntimeError("503"))
+    bot = CompositeBot([("ollama", broken), ("gemini", FakeBot("from gemini"))])
+    assert bot.ai_complete("prompt") == "from gemini"
+    assert bot.stats["ollama"].failures == 1
+
+
+def test_fails_over_on_empty_or_placeholder_content():
+    empty, placeholder = FakeBot(""), FakeBot("[Gemini API: No valid response]")
+    bot = CompositeBot([("ollama", empty), ("gemini", placeholder), ("chatgpt", FakeBot("from chatgpt"))])
+    assert bot.ai_complete("prompt") == "from chatgpt"
+    assert bot.stats["ollama"].failures == bot.stats["gemini"].failures == 1
+    # Without any content from every backend, the result is empty, as from a single backend
+    assert CompositeBot([("ollama", FakeBot("")), ("gemini", FakeBot(" \n"))]).ai_complete("prompt") == ""
+
+
+def test_routes_large_prompts_to_the_second_backend():
+    local, cloud = FakeBot("local"), FakeBot("cloud")
+    bot = CompositeBot([("ollama", local), ("gemini", cloud)], route_tokens=10)
+    assert bot.ai_complete("small") == "local"
+    assert bot.ai_complete("x" * 400) == "cloud"
+
+
+def test_unhealthy_backends_are_tried_last():
+    broken, healthy = FakeBot("", error=RuntimeError("500")), FakeBot("ok")
+    bot = CompositeBot([("ollama", broken), ("gemini", healthy)])
+    for _ in range(3):
+        bot.ai_complete("prompt")
+    assert bot.ai_complete("prompt") == "ok"
+    assert broken.calls == 3
+
+
+def test_hedges_a_request_slower_than_its_percentile():
+    primary, secondary = FakeBot("primary"), FakeBot("secondary")
+    bot = CompositeBot([("ollama", primary), ("gemini", secondary)], hedge_percentile=95)
+    for _ in range(MIN_SAMPLES):
+        assert bot.ai_complete("prompt") == "primary"
+    assert secondary.calls == 0
+
+    primary.delay = 1.0
+    started = time.monotonic()
+    assert bot.ai_complete("prompt") == "secondary"
+    assert time.monotonic() - started < 0.5
@@ -0,0 +1,61 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from coverage_report import CoverageReport
+
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content)
+    return str(path)
+
+
+def test_coverage_py_xml(tmp_path):
+    report = CoverageReport.load(write(tmp_path, 'coverage.xml', """<?xml version="1.0" ?>
+<coverage><packages><package name="src"><classes>
+<class filename="src/calc.py"><lines>
+<line number="1" hits="1"/><line number="2" hits="0"/><line number="3" hits="0"/><line number="5" hits="1"/>
+</lines></class></classes></package></packages></coverage>"""))
+
+    coverage = report.find('src/calc.py')
+    assert coverage.percent == 50.0
+    assert coverage.uncovered_ranges() == '2-3'
+
+
+def test_jacoco_xml_matches_by_path_suffix(tmp_path):
+    report = CoverageReport.load(write(tmp_path, 'jacoco.xml', """<report name="demo">
+<package name="com/acme"><sourcefile name="Calc.java">
+<line nr="3" mi="0" ci="2"/><line nr="4" mi="3" ci="0"/>
+</sourcefile></package></report>"""))
+
+    coverage = report.find('src/main/java/com/acme/Calc.java')
+    assert coverage.uncovered_lines == {4}
+    assert report.find('src/main/java/com/other/Calc.java') is None
+
+
+def test_lcov_and_json_formats(tmp_path):
+    lcov = CoverageReport.load(write(tmp_path, 'lcov.info',
+                                     "TN:\nSF:/work/repo/src/sum.js\nDA:1,1\nDA:2,0\nend_of_record\n"))
+    assert lcov.find('src/sum.js').uncovered_lines == {2}
+
+    coverage_json = CoverageReport.load(write(tmp_path, 'coverage.json', json.dumps(
+        {"files": {"src/calc.py": {"executed_lines": [1, 2], "missing_lines": [4]}}})))
+    assert coverage_json.find('src/calc.py').uncovered_ranges() == '4'
+
+    # A function on lines 1-6 run 3 times, with a branch from line 3, column 9 to line 5, column 6 never taken
+    llvm_json = CoverageReport.load(write(tmp_path, 'llvm.json', json.dumps(
+        {"data": [{"files": [{"filename": "/work/Sources/Calc.swift",
+                              "segments": [[1, 20, 3, True, True, False], [3, 9, 0, True, True, False],
+                                           [5, 6, 3, True, False, False], [6, 2, 0, False, False, False]]}]}]})))
+    calc = llvm_json.find('Sources/Calc.swift')
+    assert (calc.covered_lines, calc.uncovered_lines) == ({1, 2, 3, 6}, {4, 5})
+
+
+def test_swift_report_is_found_in_the_build_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('.build/x86_64-unknown-linux-gnu/debug/codecov')
+    write(tmp_path / '.build/x86_64-unknown-linux-gnu/debug/codecov', 'Calc.json', '{"data": []}')
+    assert CoverageReport.find_report('swift') == '.build/x86_64-unknown-linux-gnu/debug/codecov/Calc.json'
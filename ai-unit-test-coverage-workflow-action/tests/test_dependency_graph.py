@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from dependency_graph import DependencyGraph
+
+SEPARATOR = "\n---\n"
+
+
+def test_python_imports_resolve_absolute_and_relative():
+    graph = DependencyGraph({
+        'src/app.py': 'from src.calc import add\nfrom .util import helper\n',
+        'src/calc.py': 'import src.util\n',
+        'src/util.py': 'def helper():\n    pass\n',
+        'src/unused.py': '',
+    })
+
+    assert graph.edges['src/app.py'] == {'src/calc.py', 'src/util.py'}
+    assert graph.neighbourhood('src/calc.py', 2) == ['src/util.py']
+
+
+def test_jvm_imports_and_same_package_references():
+    graph = DependencyGraph({
+        'src/main/java/com/acme/Service.java': 'package com.acme;\nimport com.acme.model.User;\nclass Service { Repo repo; }',
+        'src/main/java/com/acme/Repo.java': 'package com.acme;\nclass Repo {}',
+        'src/main/java/com/acme/model/User.java': 'package com.acme.model;\nclass User {}',
+    })
+
+    assert graph.edges['src/main/java/com/acme/Service.java'] == {
+        'src/main/java/com/acme/Repo.java', 'src/main/java/com/acme/model/User.java'}
+
+
+def test_js_and_c_dependencies():
+    graph = DependencyGraph({
+        'src/index.ts': "import { sum } from './math';\nconst x = require('./lib');",
+        'src/math.ts': '',
+        'src/lib/index.js': '',
+        'src/calc.c': '#include "calc.h"\n#include <stdio.h>',
+        'src/calc.h': '',
+    })
+
+    assert graph.edges['src/index.ts'] == {'src/math.ts', 'src/lib/index.js'}
+    assert graph.edges['src/calc.c'] == {'src/calc.h'}
+
+
+def test_build_context_respects_depth_and_budget():
+    graph = DependencyGraph({
+        'src/a.py': 'import src.b',
+        'src/b.py': 'import src.c\n' + 'x = 1\n' * 200,
+        'src/c.py': 'y = 2',
+    })
+
+    assert graph.neighbourhood('src/a.py', 1) == ['src/b.py']
+    context = graph.build_context('src/a.py', 2, 100, SEPARATOR)
+    assert 'File: src/c.py' in context
+    assert 'File: src/b.py' not in context
+
+
+def test_build_context_puts_shared_dependencies_first():
+    graph = DependencyGraph({
+        'src/a.py': 'import src.z_common\nimport src.b',
+        'src/b.py': 'import src.z_common',
+        'src/c.py': 'import src.z_common',
+        'src/z_common.py': 'x = 1',
+    })
+
+    context = graph.build_context('src/a.py', 1, 1000, SEPARATOR)
+    assert context.index('File: src/z_common.py') < context.index('File: src/b.py')
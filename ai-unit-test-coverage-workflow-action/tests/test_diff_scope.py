@@ -0,0 +1,187 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from diff_scope import build_diff_scope, parse_changed_lines, split_diff_by_file
+from unit_test_merge import merge_test_files
+
+SOURCE = """def add(x, y):
+    return x + y
+
+
+def divide(x, y):
+    if y == 0:
+        raise ValueError("Cannot divide by zero!")
+    return x / y
+
+
+def multiply(x, y):
+    return x * y
+"""
+
+DIFF = """diff --git a/src/calc.py b/src/calc.py
+index 1111111..2222222 100644
+--- a/src/calc.py
++++ b/src/calc.py
+@@ -4,5 +4,7 @@ def add(x, y):
+ 
+ def divide(x, y):
+-    return x / y
++    if y == 0:
++        raise ValueError("Cannot divide by zero!")
++    return x / y
+ 
+ 
+"""
+
+UNIT_TEST = """import unittest
+from src.calc import add, divide
+
+
+class TestCalc(unittest.TestCase):
+    def test_add(self):
+        self.assertEqual(add(1, 2), 3)
+
+    def test_divide(self):
+        self.assertEqual(divide(4, 2), 2)
+"""
+
+
+def test_parse_changed_lines_maps_hunks_to_new_file():
+    assert parse_changed_lines(DIFF) == {6, 7, 8}
+
+
+def test_split_diff_by_file():
+    diffs = split_diff_by_file(DIFF + DIFF.replace('calc.py', 'util.py'))
+    assert sorted(diffs) == ['src/calc.py', 'src/util.py']
+    assert diffs['src/calc.py'].startswith('diff --git a/src/calc.py')
+
+
+def test_build_diff_scope_sends_changed_functions_and_their_tests():
+    scope = build_diff_scope('src/calc.py', SOURCE, DIFF, UNIT_TEST)
+
+    assert scope.symbols == ['divide']
+    assert 'def divide' in scope.code and 'def add' not in scope.code and 'def multiply' not in scope.code
+    assert 'def test_divide' in scope.unit_test and 'def test_add' not in scope.unit_test
+    assert scope.unit_test.startswith('import unittest')
+
+
+def test_merge_python_keeps_existing_tests():
+    generated = """import unittest
+import pytest
+from src.calc import divide
+
+
+class TestCalc(unittest.TestCase):
+    def test_divide(self):
+        self.assertEqual(divide(9, 3), 3)
+
+    def test_divide_by_zero(self):
+        with self.assertRaises(ValueError):
+            divide(1, 0)
+"""
+    merged = merge_test_files(UNIT_TEST, generated, '.py')
+
+    assert 'import pytest' in merged
+    assert 'def test_add' in merged
+    assert 'divide(9, 3)' in merged and 'divide(4, 2)' not in merged
+    assert merged.index('def test_divide(') < merged.index('def test_divide_by_zero')
+
+
+def test_merge_java_replaces_and_appends_methods():
+    existing = """import org.junit.Test;
+
+public class CalcTest {
+    @Test
+    public void testAdd() {
+        assertEquals(3, add(1, 2));
+    }
+}
+"""
+    generated = """import org.junit.Test;
+import static org.junit.Assert.assertThrows;
+
+public class CalcTest {
+    @Test
+    public void testDivideByZero() {
+        assertThrows(ArithmeticException.class, () -> divide(1, 0));
+    }
+}
+"""
+    merged = merge_test_files(existing, generated, '.java')
+
+    assert 'import static org.junit.Assert.assertThrows;' in merged
+    assert 'public void testAdd()' in merged
+    assert merged.index('testAdd') < merged.index('testDivideByZero') < merged.rindex('}')
+
+
+def test_merge_of_an_unparsable_partial_keeps_nothing():
+    generated = """class TestCalc(unittest.TestCase):
+    def test_divide(self:
+        self.assertEqual(divide(9, 3), 3)
+"""
+    assert merge_test_files(UNIT_TEST, generated, '.py') is None
+    assert merge_test_files(UNIT_TEST, "", '.py') == UNIT_TEST
+
+
+def test_merge_java_adds_the_fields_of_generated_tests():
+    existing = """import org.junit.Test;
+
+public class CalcTest {
+    private Calc c = new Calc();
+
+    @Test
+    public void testAdd() {
+        assertEquals(3, c.add(1, 2));
+    }
+}
+"""
+    generated = """import org.junit.Test;
+import org.mockito.Mock;
+
+public class CalcTest {
+    @Mock
+    private Store store;
+    private Calc c = new Calc();
+
+    @Test
+    public void testSave() {
+        c.save(store);
+    }
+}
+"""
+    merged = merge_test_files(existing, generated, '.java')
+
+    assert merged.count('private Calc c') == 1
+    assert merged.index('class CalcTest') < merged.index('    @Mock\n    private Store store;') < merged.index('testAdd')
+    assert 'public void testSave()' in merged
+
+
+def test_merge_kotlin_adds_the_properties_of_generated_tests():
+    existing = """class CalcTest {
+    private val calc = Calc()
+
+    @Test
+    fun add() {
+        assertEquals(3, calc.add(1, 2))
+    }
+}
+"""
+    generated = """class CalcTest {
+    @MockK lateinit var store: Store
+    private val clock = Clock.fixed(
+        Instant.EPOCH, ZoneOffset.UTC)
+    private val calc = Calc()
+
+    @Test
+    fun save() {
+        calc.save(store, clock)
+    }
+}
+"""
+    merged = merge_test_files(existing, generated, '.kt')
+
+    assert merged.count('private val calc') == 1
+    assert '    @MockK lateinit var store: Store\n    private val clock = Clock.fixed(\n' in merged
+    assert merged.index('private val clock') < merged.index('fun add()') < merged.index('fun save()')
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+import daemon_client
+from generation_daemon import FairQueue, GenerationDaemon, Job, make_handler
+from stub_llm_server import StubLlmConfig, StubLlmServer
+from synthetic_repo import create_synthetic_repo
+
+
+def test_fair_queue_rotates_repositories_and_skips_busy_ones():
+    queue = FairQueue()
+    for job_id, repo in [("1", "a"), ("2", "a"), ("3", "a"), ("4", "b"), ("5", "c")]:
+        queue.push(Job(job_id, repo, {}, ""))
+    assert queue.pop(set()).id == "1"
+    assert queue.pop({"b"}).id == "5"
+    assert queue.pop(set()).id == "4"
+    assert queue.pop({"a"}) is None
+    assert [queue.pop(set()).id for _ in range(2)] == ["2", "3"]
+    assert len(queue) == 0
+
+
+def job_env(tmp_path):
+    return {
+        "BOT": "ollama", "LLM_KEY": "stub-key", "LLM_MODEL": "stub-model", "GITHUB_TOKEN": "stub-token",
+        "REPO_OWNER": "benchmark", "REPO_NAME": "synthetic", "BRANCH_NAME": "main", "MASTER_BRANCH_NAME": "main",
+        "TARGET_EXTENSIONS": "py", "BUILD_TOOL": "none", "GENERATE_MODE": "FULL", "SRC_PATH": "src",
+        "TEST_PATH": "tests", "RUN_AFFECTED_TESTS": "false",
+        # A shard job neither builds nor pushes
+        "SHARD_TOTAL": "2", "SHARD_INDEX": "0", "SHARD_DIR": str(tmp_path / "shard"),
+    }
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
+
+
+def test_daemon_runs_jobs_with_warm_caches(tmp_path, monkeypatch):
+    repo = str(tmp_path / "repo")
+    create_synthetic_repo(repo, 4)
+    env = job_env(tmp_path)
+    with StubLlmServer() as stub, GenerationDaemon(1, str(tmp_path / "logs")) as daemon:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(daemon))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        monkeypatch.chdir(repo)
+        for name, value in dict(env, LLM_URL=stub.url).items():
+            monkeypatch.setenv(name, value)
+        daemon_url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            assert daemon_client.run_job(daemon_url) == 0
+            assert daemon_client.run_job(daemon_url) == 0
+        finally:
+            server.shutdown()
+
+        first, second = daemon.jobs()
+        with open(second.log_path) as f:
+            assert "warm_cache.hits" in f.read()
+    assert os.listdir(tmp_path / "shard" / "tests")
+
+
+def test_daemon_fails_the_job_of_a_dead_worker_and_replaces_it(tmp_path):
+    repo = str(tmp_path / "repo")
+    create_synthetic_repo(repo, 2)
+    with StubLlmServer(StubLlmConfig(latency=60)) as slow, StubLlmServer() as fast, \
+            GenerationDaemon(1, str(tmp_path / "logs")) as daemon:
+        stuck = daemon.submit(repo, dict(job_env(tmp_path), LLM_URL=slow.url))
+        wait_for(lambda: slow.requests)
+        for worker in multiprocessing.active_children():
+            os.kill(worker.pid, signal.SIGKILL)
+        wait_for(lambda: stuck.status == "failed")
+        assert "worker exited" in stuck.error
+
+        job = daemon.submit(repo, dict(job_env(tmp_path), LLM_URL=fast.url))
+        wait_for(lambda: job.status not in ("queued", "running"))
+        assert job.status == "succeeded"
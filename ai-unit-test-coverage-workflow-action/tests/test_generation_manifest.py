@@ -0,0 +1,78 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from generation_manifest import GenerationManifest, ManifestEntry
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def test_full_run_selects_only_files_whose_inputs_changed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name, value in {'BOT': 'ollama', 'OLLAMA_MODEL': 'llama3', 'SRC_PATH': 'src', 'TEST_PATH': 'tests',
+                        'TARGET_EXTENSIONS': 'py'}.items():
+        monkeypatch.setenv(name, value)
+    import github_test_coverage
+    from env_vars import EnvVars
+    monkeypatch.setattr(github_test_coverage, 'vars', EnvVars(), raising=False)
+    monkeypatch.setattr(github_test_coverage, 'snapshot', None)
+    files = ['src/a.py', 'src/b.py', 'src/c.py', 'src/d.py', 'README.md']
+    for file in files:
+        write(file, f"# {file}\n")
+    for name in 'abcd':
+        write(f'tests/test_{name}.py', f"def test_{name}(): pass\n")
+
+    manifest = GenerationManifest('tests/.ai-unit-test-manifest.json')
+    assert github_test_coverage.select_changed_since_generation(files, manifest) == files
+    github_test_coverage.record_generation(manifest, files, ['tests/test_a.py', 'tests/test_b.py',
+                                                             'tests/test_c.py', 'tests/test_d.py'])
+    manifest.save()
+
+    # The next run: a changed source, an edited test and a deleted source
+    write('src/a.py', "# changed\n")
+    write('tests/test_b.py', "def test_edited(): pass\n")
+    os.remove('src/d.py')
+    manifest = GenerationManifest('tests/.ai-unit-test-manifest.json')
+    files = files[:3] + files[4:]
+    assert github_test_coverage.select_changed_since_generation(files, manifest) == ['src/a.py', 'src/b.py',
+                                                                                    'README.md']
+    assert manifest.unchanged == 1
+    manifest.save()
+    assert 'src/d.py' not in open('tests/.ai-unit-test-manifest.json').read()
+
+    # Diff-scoped generations only add the tests of the changed functions
+    write('src/b.py', "# changed in a pull request\n")
+    github_test_coverage.record_generation(manifest, ['src/b.py'], ['tests/test_b.py'], {'src/b.py': "diff"})
+    assert 'src/b.py' in github_test_coverage.select_changed_since_generation(files, manifest)
+
+    monkeypatch.setenv('OLLAMA_MODEL', 'qwen2.5-coder')
+    monkeypatch.setattr(github_test_coverage, 'vars', EnvVars(), raising=False)
+    manifest = GenerationManifest('tests/.ai-unit-test-manifest.json')
+    assert 'src/c.py' in github_test_coverage.select_changed_since_generation(files, manifest)
+
+
+def test_merge_adds_the_entries_recorded_by_shards(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write('src/a.py', "")
+    write('src/b.py', "")
+    entry_a = ManifestEntry('tests/test_a.py', 'a1', 't1', 'ollama', 'llama3', 'v1')
+    entry_b = ManifestEntry('tests/test_b.py', 'b1', 't2', 'ollama', 'llama3', 'v1')
+    for index, (file, entry) in enumerate([('src/a.py', entry_a), ('src/b.py', entry_b)]):
+        shard = GenerationManifest('tests/.ai-unit-test-manifest.json')
+        shard.record(file, entry)
+        shard.save(f'shard/{index}.json', recorded_only=True)
+
+    manifest = GenerationManifest('tests/.ai-unit-test-manifest.json')
+    manifest.merge('shard/0.json')
+    manifest.merge('shard/1.json')
+    manifest.save()
+
+    manifest = GenerationManifest('tests/.ai-unit-test-manifest.json')
+    assert manifest.is_current('src/a.py', entry_a)
+    assert manifest.is_current('src/b.py', entry_b)
+    assert not manifest.is_current('src/b.py', entry_b._replace(prompt_version='v2'))
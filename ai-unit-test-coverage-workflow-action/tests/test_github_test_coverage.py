@@ -1,5 +1,6 @@
 import os
 import sys
+import pytest
 from unittest.mock import patch, MagicMock
 
 SRC_CODE = """
@@ -165,11 +166,16 @@ REQUIRED_ENV = {
     'GITHUB_TOKEN': 'dummy-token',
     'GITHUB_HEAD_REF': 'main',
     'GITHUB_BASE_REF': 'main',
+    'BRANCH_NAME': 'main',
+    'MASTER_BRANCH_NAME': 'main',
     'TARGET_EXTENSIONS': 'py',
     'BUILD_TOOL': 'pytest',
     'GENERATE_MODE': 'FULL',
     'SRC_PATH': 'src',
-    'TEST_PATH': 'tests'
+    'TEST_PATH': 'tests',
+    'RUN_AFFECTED_TESTS': 'false',
+    # main() runs in this repository; the generation manifest would be written to its tests directory
+    'SKIP_UNCHANGED': 'false'
 }
 
 def set_required_env(monkeypatch, overrides=None):
@@ -194,6 +200,8 @@ def mock_overwrite_unit_test_file(file_path: str, content: str):
 def test_bot_selection_gemini(mock_ai_generate, mock_get_file_content, mock_overwrite_unit_test_file, monkeypatch):
     set_required_env(monkeypatch, {'BOT': 'gemini'})
     with patch('github_test_coverage.Git') as MockGit, \
+            patch('repo_snapshot.RepoSnapshot.list_files', return_value=['src/calc.py']), \
+            patch('repo_snapshot.RepoSnapshot.get_blob_sha', return_value=None), \
             patch('git.Git.get_diff_files', return_value=['src/calc.py']), \
             patch('git.Git.get_remote_name', return_value='origin'), \
             patch('subprocess.run', side_effect=dummy_subprocess_run):
@@ -201,3 +209,106 @@ def test_bot_selection_gemini(mock_ai_generate, mock_get_file_content, mock_over
         src.github_test_coverage.main()
         mock_ai_generate.assert_called()
 # Patch imports for the test context
+
+
+def test_generate_unit_tests_continues_after_failure(monkeypatch):
+    set_required_env(monkeypatch, {'MAX_CONCURRENCY': '4', 'VALIDATE_TESTS': 'false'})
+    import github_test_coverage
+    from dependency_graph import DependencyGraph
+    from env_vars import EnvVars
+    monkeypatch.setattr(github_test_coverage, 'vars', EnvVars(), raising=False)
+
+    files = ['src/a.py', 'src/b.py', 'src/c.py']
+    def fake_generate(code, **kwargs):
+        if code == 'b':
+            raise RuntimeError("boom")
+        return f"test {code}"
+
+    ai = MagicMock()
+    ai.ai_generate_test_coverage.side_effect = fake_generate
+    written = []
+    with patch('github_test_coverage.get_file_content',
+               side_effect=lambda path: path.split('/')[-1][0] if path in files else ''), \
+            patch('github_test_coverage.overwrite_unit_test_file',
+                  side_effect=lambda path, content: written.append((path, content))):
+        github_test_coverage.generate_unit_tests(ai, files, DependencyGraph({}), 4)
+
+    assert written == [('tests/test_a.py', 'test a'), ('tests/test_c.py', 'test c')]
+
+
+def test_chunked_files_stay_within_max_concurrency(monkeypatch):
+    set_required_env(monkeypatch, {'MAX_CONCURRENCY': '2', 'VALIDATE_TESTS': 'false', 'CHUNK_TOKEN_THRESHOLD': '20',
+                                   'CHUNK_TOKENS': '20'})
+    import threading
+    import time
+    import github_test_coverage
+    from dependency_graph import DependencyGraph
+    from env_vars import EnvVars
+    monkeypatch.setattr(github_test_coverage, 'vars', EnvVars(), raising=False)
+
+    files = ['src/a.py', 'src/b.py']
+    source = "".join(f"def function_{index}(value):\n    return value * {index} + {index}\n\n" for index in range(8))
+    lock = threading.Lock()
+    in_flight = [0, 0]
+    def fake_generate(**kwargs):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        return "def test_chunk():\n    assert True\n"
+
+    ai = MagicMock()
+    ai.ai_generate_test_coverage.side_effect = fake_generate
+    with patch('github_test_coverage.get_file_content', side_effect=lambda path: source if path in files else ''), \
+            patch('github_test_coverage.overwrite_unit_test_file'):
+        github_test_coverage.generate_unit_tests(ai, files, DependencyGraph({}), 2)
+
+    assert ai.ai_generate_test_coverage.call_count > len(files)
+    assert in_flight[1] <= 2
+
+
+def test_validate_and_repair_feeds_errors_back(monkeypatch):
+    set_required_env(monkeypatch, {'MAX_REPAIR_ATTEMPTS': '1'})
+    import github_test_coverage
+    from concurrent.futures import ThreadPoolExecutor
+    from env_vars import EnvVars
+    monkeypatch.setattr(github_test_coverage, 'vars', EnvVars(), raising=False)
+
+    ai = MagicMock()
+    ai.ai_generate_test_coverage.return_value = "```python\ndef test_fixed():\n    assert True\n```"
+    with ThreadPoolExecutor(max_workers=1) as syntax_checker:
+        content = github_test_coverage.validate_and_repair(ai, 'tests/test_calc.py', 'def test_broken(:\n', SRC_CODE,
+                                                           '', [], syntax_checker)
+
+    assert content == "def test_fixed():\n    assert True\n"
+    assert 'SyntaxError' in ai.ai_generate_test_coverage.call_args.kwargs['hints']
+
+
+def test_diff_scoped_repairs_are_merged_into_the_existing_test(monkeypatch):
+    set_required_env(monkeypatch, {'MAX_REPAIR_ATTEMPTS': '1'})
+    import github_test_coverage
+    from concurrent.futures import ThreadPoolExecutor
+    from env_vars import EnvVars
+    monkeypatch.setattr(github_test_coverage, 'vars', EnvVars(), raising=False)
+
+    existing = "def test_add():\n    assert add(1, 2) == 3\n"
+    ai = MagicMock()
+    ai.ai_generate_test_coverage.return_value = "def test_divide():\n    assert divide(4, 2) == 2\n"
+    with ThreadPoolExecutor(max_workers=1) as syntax_checker:
+        content = github_test_coverage.validate_and_repair(ai, 'tests/test_calc.py', existing + "\n\ndef test_divide(:\n",
+                                                           SRC_CODE, '', [], syntax_checker, existing)
+
+    assert "def test_add():" in content and "def test_divide():" in content
+    assert 'complete' not in ai.ai_generate_test_coverage.call_args.kwargs['hints']
+
+
+def test_main_closes_the_snapshot_of_a_failing_job(monkeypatch):
+    set_required_env(monkeypatch, {'BOT': 'ollama', 'OLLAMA_MODEL': 'llama3'})
+    import github_test_coverage
+    with patch('github_test_coverage.RepoSnapshot') as MockSnapshot, \
+            patch('github_test_coverage.Git.get_remote_name', side_effect=RuntimeError("no remote")):
+        with pytest.raises(RuntimeError):
+            github_test_coverage.main()
+    MockSnapshot.return_value.close.assert_called_once()
@@ -0,0 +1,53 @@
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from ai.http_transport import HttpTransport, RateLimiter
+
+
+def make_response(status_code, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    if status_code >= 400:
+        response.raise_for_status.side_effect = RuntimeError(f"HTTP {status_code}")
+    return response
+
+
+def test_post_retries_and_honours_retry_after():
+    transport = HttpTransport(max_retries=3)
+    responses = [make_response(429, {'Retry-After': '7'}), make_response(503), make_response(200)]
+    with patch.object(transport.session, 'post', side_effect=responses) as mock_post, \
+            patch('ai.http_transport.time.sleep') as mock_sleep:
+        response = transport.post('http://llm', json={})
+
+    assert response is responses[-1]
+    assert mock_post.call_count == 3
+    assert mock_sleep.call_args_list[0].args[0] == 7.0
+    assert mock_sleep.call_args_list[1].args[0] <= 2
+
+
+def test_post_raises_after_max_retries():
+    transport = HttpTransport(max_retries=1)
+    with patch.object(transport.session, 'post', side_effect=[make_response(500), make_response(500)]), \
+            patch('ai.http_transport.time.sleep'):
+        try:
+            transport.post('http://llm', json={})
+            assert False, "expected the last 500 to be raised"
+        except RuntimeError as e:
+            assert str(e) == "HTTP 500"
+
+
+def test_rate_limiter_waits_when_bucket_is_empty():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    with patch('ai.http_transport.time.sleep', side_effect=StopIteration) as mock_sleep:
+        limiter.acquire(tokens=500)
+        try:
+            limiter.acquire(tokens=500)
+        except StopIteration:
+            pass
+
+    # 400 tokens are missing at 10 tokens per second
+    assert abs(mock_sleep.call_args.args[0] - 40) < 0.5
@@ -0,0 +1,52 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+from instrumentation import Instrumentation
+
+
+def test_spans_are_summarized_by_name():
+    Instrumentation.reset()
+    for index, tokens in enumerate((10, 20, 30)):
+        with Instrumentation.span("llm.request", bot="fake", index=index) as span:
+            span.update(completion_tokens=tokens, ttft_seconds=tokens / 10)
+    with pytest.raises(RuntimeError):
+        with Instrumentation.span("git", command="diff"):
+            raise RuntimeError("boom")
+    Instrumentation.increment("files.written", 2)
+
+    summary = Instrumentation.summary()
+    assert summary["llm.request"]["count"] == 3
+    assert summary["llm.request"]["completion_tokens"] == 60
+    assert summary["llm.request"]["ttft_seconds_avg"] == 2.0
+    assert "ttft_seconds" not in summary["llm.request"] and "index" not in summary["llm.request"]
+    assert summary["llm.request"]["p50_seconds"] <= summary["llm.request"]["max_seconds"]
+    assert Instrumentation.spans("git")[0]["attributes"] == {"command": "diff", "error": "RuntimeError"}
+
+
+def test_percentile():
+    assert Instrumentation.percentile([], 95) == 0.0
+    assert Instrumentation.percentile([1, 2, 3, 4, 5], 50) == 3
+    assert Instrumentation.percentile([1, 2, 3, 4, 5], 100) == 5
+
+
+def test_write_report_json_and_chrome(tmp_path):
+    Instrumentation.reset()
+    with Instrumentation.span("build", command="pytest"):
+        pass
+    Instrumentation.increment("files.processed")
+
+    json_path = tmp_path / "report.json"
+    Instrumentation.write_report(str(json_path))
+    report = json.loads(json_path.read_text())
+    assert report["summary"]["build"]["count"] == 1
+    assert report["counters"] == {"files.processed": 1}
+
+    chrome_path = tmp_path / "trace.json"
+    Instrumentation.write_report(str(chrome_path), "chrome")
+    events = json.loads(chrome_path.read_text())["traceEvents"]
+    assert events[0]["name"] == "build" and events[0]["ph"] == "X"
+    assert events[0]["args"] == {"command": "pytest"}
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from repo_snapshot import RepoSnapshot
+
+
+def git(*args):
+    subprocess.run(["git", *args], check=True, capture_output=True)
+
+
+def test_snapshot_reads_index_refs_and_written_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q")
+    git("config", "user.email", "test@example.com")
+    git("config", "user.name", "test")
+    os.makedirs("src")
+    with open("src/calc.py", "w") as f:
+        f.write("def add(x, y):\n    return x + y\n")
+    git("add", ".")
+    git("commit", "-q", "-m", "first")
+    with open("src/calc.py", "w") as f:
+        f.write("def add(x, y):\n    return y + x\n")
+    git("commit", "-q", "-am", "second")
+
+    snapshot = RepoSnapshot()
+    try:
+        assert snapshot.list_files() == ["src/calc.py"]
+        assert snapshot.read_file("src/calc.py") == "def add(x, y):\n    return y + x\n"
+        assert snapshot.read_at("HEAD~1", "src/calc.py") == "def add(x, y):\n    return x + y\n"
+        assert snapshot.read_at("HEAD", "src/missing.py") is None
+        assert snapshot.read_at("HEAD", "src/my calc.py") is None
+        assert snapshot.read_at("HEAD~1", "src/calc.py") == "def add(x, y):\n    return x + y\n"
+
+        with open("src/calc.py", "w") as f:
+            f.write("rewritten")
+        snapshot.invalidate("src/calc.py")
+        assert snapshot.read_file("src/calc.py") == "rewritten"
+    finally:
+        snapshot.close()
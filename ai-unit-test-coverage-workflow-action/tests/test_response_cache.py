@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from ai.ai_bot import AiBot
+from ai.cached_bot import CachedBot
+from ai.gemini_bot import NO_VALID_RESPONSE
+from ai.response_cache import ResponseCache
+
+
+class CountingBot(AiBot):
+    def __init__(self):
+        self.calls = 0
+
+    def ai_complete(self, prompt):
+        self.calls += 1
+        return f"tests for {len(prompt)} chars"
+
+
+def test_cache_hit_skips_bot(tmp_path):
+    cache = ResponseCache(str(tmp_path), 1024 * 1024, 60)
+    bot = CountingBot()
+    cached = CachedBot(bot, cache, 'gemini', 'model-a')
+
+    first = cached.ai_generate_test_coverage(code='x', unit_test='', all_source_files='', unit_test_file_path='t.py')
+    second = cached.ai_generate_test_coverage(code='x', unit_test='', all_source_files='', unit_test_file_path='t.py')
+
+    assert first == second
+    assert bot.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_placeholder_and_empty_answers_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path), 1024 * 1024, 60)
+    bot = CountingBot()
+    answers = iter([NO_VALID_RESPONSE, "", "def test_x(): pass"])
+    bot.ai_complete = lambda prompt: next(answers)
+    cached = CachedBot(bot, cache, 'gemini', 'model-a')
+
+    assert [cached.ai_complete('prompt') for _ in range(4)] == [NO_VALID_RESPONSE, "", "def test_x(): pass",
+                                                                "def test_x(): pass"]
+
+
+def test_key_depends_on_bot_and_model():
+    keys = {
+        ResponseCache.make_key('gemini', 'model-a', 'prompt'),
+        ResponseCache.make_key('gemini', 'model-b', 'prompt'),
+        ResponseCache.make_key('ollama', 'model-a', 'prompt'),
+    }
+    assert len(keys) == 3
+
+
+def test_evict_drops_expired_and_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path), 1024 * 1024, 60)
+    # The skeleton index shares the directory, in a subdirectory the cache leaves alone
+    os.makedirs(tmp_path / 'skeletons')
+    (tmp_path / 'skeletons' / 'skeletons.json').write_text('{}')
+    for key in ('old', 'a', 'b'):
+        cache.put(key, 'gemini', 'model', 'x' * 100)
+    now = time.time()
+    os.utime(tmp_path / 'old.json', (now - 120, now - 120))
+    os.utime(tmp_path / 'a.json', (now - 30, now - 30))
+    entry_size = os.path.getsize(tmp_path / 'b.json')
+
+    cache.max_bytes = entry_size
+    cache.evict()
+
+    assert sorted(os.listdir(tmp_path)) == ['b.json', 'skeletons']
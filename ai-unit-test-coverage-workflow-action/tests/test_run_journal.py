@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from run_journal import RunJournal
+
+SOURCE = "def add(a, b):\n    return a + b\n"
+OLD_TEST = "def test_old(): pass\n"
+NEW_TEST = "def test_add():\n    assert add(1, 2) == 3\n"
+
+
+def test_resume_restores_written_files_after_a_killed_run(tmp_path):
+    journal = RunJournal(str(tmp_path))
+    journal.record('src/calc.py', SOURCE, 'tests/test_calc.py', OLD_TEST, NEW_TEST)
+    journal.record('src/other.py', SOURCE, 'tests/test_other.py', "", None)
+    # A killed run leaves a cut-short last line
+    with open(tmp_path / "journal.jsonl", 'a') as f:
+        f.write('{"file": "src/cut.py", "sour')
+
+    journal = RunJournal(str(tmp_path))
+    assert journal.resume('src/calc.py', SOURCE, 'tests/test_calc.py', OLD_TEST) == NEW_TEST
+    assert journal.resume('src/calc.py', SOURCE, 'tests/test_calc.py', NEW_TEST) == NEW_TEST
+    assert journal.resume('src/calc.py', SOURCE + "\n", 'tests/test_calc.py', OLD_TEST) is None
+    assert journal.resume('src/calc.py', SOURCE, 'tests/test_calc.py', "def test_edited(): pass\n") is None
+    assert journal.resume('src/other.py', SOURCE, 'tests/test_other.py', "") is None
+    assert journal.resumed == 2
+
+
+def test_close_compacts_journal_and_outputs(tmp_path):
+    journal = RunJournal(str(tmp_path))
+    journal.record('src/calc.py', SOURCE, 'tests/test_calc.py', "", OLD_TEST)
+    journal.record('src/calc.py', SOURCE, 'tests/test_calc.py', "", NEW_TEST)
+    journal.close()
+
+    with open(tmp_path / "journal.jsonl") as f:
+        assert len(f.readlines()) == 1
+    assert len(os.listdir(tmp_path / "outputs")) == 1
+    assert RunJournal(str(tmp_path)).resume('src/calc.py', SOURCE, 'tests/test_calc.py', "") == NEW_TEST
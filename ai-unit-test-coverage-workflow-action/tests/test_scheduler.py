@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ai.stream_guard import StreamGuard
+from instrumentation import Instrumentation
+from scheduler import Scheduler, WorkEstimate
+
+
+def test_order_puts_most_value_per_token_first():
+    estimates = {
+        'a.py': WorkEstimate(900, 100, 10),
+        'b.py': WorkEstimate(90, 10, 50),
+        'c.py': WorkEstimate(400, 100, 100),
+        'd.py': WorkEstimate(0, 0, 0),
+    }
+    assert Scheduler.order([['a.py'], ['d.py'], ['b.py', 'c.py']], estimates) == [['b.py', 'c.py'], ['a.py'], ['d.py']]
+
+
+def test_admit_defers_work_beyond_the_token_budget():
+    Instrumentation.reset()
+    scheduler = Scheduler(max_tokens=1000)
+    first = WorkEstimate(500, 100, 1)
+    assert scheduler.admit(first)
+    assert not scheduler.admit(WorkEstimate(400, 100, 1))
+    assert scheduler.admit(WorkEstimate(300, 100, 1))
+
+    # An aborted stream without usage counts its estimated prompt and the tokens streamed so far
+    guard = StreamGuard(max_output_tokens=150, prompt_tokens=700)
+    for _ in range(2):
+        guard.add("x" * 400)
+    assert guard.finish() == "" and guard.aborted
+    scheduler.release(first, 1.0)
+    assert not scheduler.admit(WorkEstimate(200, 0, 1))
+    assert scheduler.deferred == 2
+
+
+def test_admit_stops_before_the_deadline():
+    scheduler = Scheduler(deadline_seconds=10, started=0)
+    assert not scheduler.admit(WorkEstimate(1, 1, 1))
+    scheduler = Scheduler(deadline_seconds=3600)
+    estimate = WorkEstimate(1, 1, 1)
+    assert scheduler.admit(estimate)
+    scheduler.release(estimate, 4000)
+    assert not scheduler.admit(estimate)
@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sharding import export_shard, import_shards, shard_files
+
+
+def test_shard_files_partitions_deterministically_and_balanced():
+    files = [f"src/module{index}.py" for index in range(20)]
+    costs = {file: (index * 37) % 11 * 100 + 50 for index, file in enumerate(files)}
+    shards = [shard_files(files, costs, index, 3) for index in range(3)]
+
+    assert sorted(sum(shards, [])) == sorted(files)
+    assert shards == [shard_files(list(reversed(files)), costs, index, 3)[::-1] for index in range(3)]
+    loads = [sum(costs[file] for file in shard) for shard in shards]
+    assert max(loads) - min(loads) <= max(costs.values())
+    assert shards[0] == [file for file in files if file in shards[0]]
+    assert shard_files(files, costs, 0, 1) == files
+
+
+def test_export_and_import_shards_round_trip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("tests/pkg")
+    with open("tests/pkg/test_a.py", 'w') as f:
+        f.write("def test_a(): pass\n")
+    export_shard(["tests/pkg/test_a.py"], "shards")
+    os.remove("tests/pkg/test_a.py")
+
+    assert import_shards("shards") == [os.path.join("tests", "pkg", "test_a.py")]
+    with open("tests/pkg/test_a.py") as f:
+        assert f.read() == "def test_a(): pass\n"
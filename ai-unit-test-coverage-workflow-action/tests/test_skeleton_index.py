@@ -0,0 +1,78 @@
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from skeleton_index import SkeletonIndex, extract_skeleton, git_blob_sha
+
+PYTHON_SOURCE = '''"""Shapes."""
+import math
+
+UNIT = "cm"
+
+
+class Circle:
+    """A circle."""
+    sides = 0
+
+    def __init__(self, radius: float):
+        self.radius = radius
+
+    def area(self) -> float:
+        """Area in square units."""
+        return math.pi * self.radius ** 2
+
+    def _cache(self):
+        return {}
+
+
+def _helper():
+    return 1
+'''
+
+JAVA_SOURCE = '''package com.acme;
+
+import java.util.List;
+
+public class Service {
+    private final Repo repo;
+
+    /** Finds users by name. */
+    public List<User> find(String name) {
+        if (name == null) {
+            return List.of();
+        }
+        return repo.find(name);
+    }
+}
+'''
+
+
+def test_python_skeleton_keeps_signatures_and_docstrings():
+    skeleton = extract_skeleton(PYTHON_SOURCE, '.py')
+    assert 'import math' in skeleton and "UNIT = 'cm'" in skeleton
+    assert 'def __init__(self, radius: float):\n        ...' in skeleton
+    assert 'def area(self) -> float:\n        """Area in square units."""\n        ...' in skeleton
+    assert 'math.pi' not in skeleton and '_cache' not in skeleton and '_helper' not in skeleton
+
+
+def test_brace_skeleton_elides_function_bodies():
+    skeleton = extract_skeleton(JAVA_SOURCE, '.java')
+    assert 'private final Repo repo;' in skeleton
+    assert '/** Finds users by name. */\n    public List<User> find(String name) {\n        /* ... */\n    }\n}' in skeleton
+    assert 'repo.find(name)' not in skeleton
+
+
+def test_index_reuses_skeletons_by_blob_sha(tmp_path):
+    path = str(tmp_path / 'skeletons.json')
+    index = SkeletonIndex(path)
+    index.skeleton('src/shapes.py', PYTHON_SOURCE, 'abc')
+    index.save()
+
+    reloaded = SkeletonIndex(path)
+    with patch('skeleton_index.extract_skeleton') as extract:
+        assert 'def area' in reloaded.skeleton('src/shapes.py', PYTHON_SOURCE, 'abc')
+        extract.assert_not_called()
+    assert (reloaded.hits, reloaded.misses) == (1, 0)
+    assert git_blob_sha('hello\n') == 'ce013625030ba8dba906f756967f9e9ca394464a'
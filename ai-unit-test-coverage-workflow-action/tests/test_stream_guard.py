@@ -0,0 +1,36 @@
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from ai.stream_guard import StreamGuard
+
+
+def test_finish_joins_chunks_and_records_stats():
+    guard = StreamGuard()
+    assert guard.add("def test_")
+    assert guard.add(None)
+    assert guard.add("add(): pass")
+    guard.set_usage(prompt_tokens=12, output_tokens=5)
+
+    assert guard.finish() == "def test_add(): pass"
+    assert guard.output_tokens == 5
+    assert guard.metrics()['prompt_tokens'] == 12
+    assert StreamGuard.pop_last() is guard
+    assert StreamGuard.pop_last() is None
+
+
+def test_aborts_on_output_token_limit():
+    guard = StreamGuard(max_output_tokens=2)
+    assert guard.add("abcd")
+    assert not guard.add("efghijkl")
+    assert guard.finish() == ""
+    assert "output tokens" in guard.aborted
+
+
+def test_aborts_on_wall_clock_limit():
+    with patch('ai.stream_guard.time.monotonic', side_effect=[0, 1, 1, 20]):
+        guard = StreamGuard(timeout_seconds=10)
+        assert guard.add("a")
+        assert not guard.add("b")
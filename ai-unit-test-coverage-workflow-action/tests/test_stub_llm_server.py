@@ -0,0 +1,83 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from ai.gemini_bot import CACHE_EXPIRY_MARGIN, GeminiBot
+from ai.http_transport import HttpTransport
+from ai.ollama_bot import OllamaBot
+from ai.stream_guard import StreamGuard
+from repo_snapshot import RepoSnapshot
+from stub_llm_server import StubLlmConfig, StubLlmServer
+from synthetic_repo import create_synthetic_repo
+
+PROMPT = "Unit Test File Path (use this to generate the correct package name):\ntests/test_calc.py\n"
+
+
+def test_stub_streams_valid_tests_to_the_bots():
+    with StubLlmServer(StubLlmConfig(output_tokens=100)) as stub:
+        transport = HttpTransport(max_retries=0)
+        for bot in (OllamaBot(stub.url, "stub", transport), GeminiBot(f"{stub.url}/v1beta/models", "key", "stub", transport)):
+            content = bot.ai_complete(PROMPT)
+            compile(content, "test_calc.py", "exec")
+            assert "class TestGenerated" in content
+        assert stub.requests == 2
+
+
+def test_gemini_uploads_a_reused_prompt_prefix_once():
+    with StubLlmServer() as stub:
+        bot = GeminiBot(f"{stub.url}/v1beta/models", "key", "stub", HttpTransport(max_retries=0),
+                        cache_ttl=600, cache_min_tokens=10)
+        context = "File: src/util.py\n" + "def util(): pass\n" * 50
+        for name in ('a', 'b', 'c'):
+            bot.ai_generate_test_coverage(code=f"def {name}(): pass", unit_test="", all_source_files=context,
+                                          unit_test_file_path=f"tests/test_{name}.py")
+            guard = StreamGuard.pop_last()
+
+        assert len(stub.cached_contents) == 1
+        cached_prefix = next(iter(stub.cached_contents.values()))
+        assert context in cached_prefix and "tests/test_a.py" not in cached_prefix
+        assert guard.cached_tokens == len(cached_prefix) // 4
+
+
+def test_stub_injects_rate_limits_that_are_retried():
+    with StubLlmServer(StubLlmConfig(rate_limit_rate=0.5, seed=1)) as stub:
+        bot = OllamaBot(stub.url, "stub", HttpTransport(max_retries=20, backoff_base=0.001, backoff_max=0.01))
+        for _ in range(5):
+            assert bot.ai_complete(PROMPT)
+        assert stub.rate_limited > 0
+        assert stub.requests == 5 + stub.rate_limited
+
+
+def test_synthetic_repo_is_a_git_repository(tmp_path, monkeypatch):
+    sources = create_synthetic_repo(str(tmp_path), 6, "py:1,java:1,js:1", functions_per_file=3)
+    assert len(sources) == 6
+    monkeypatch.chdir(tmp_path)
+    snapshot = RepoSnapshot()
+    try:
+        assert set(sources) <= set(snapshot.list_files())
+    finally:
+        snapshot.close()
+
+
+def test_gemini_recreates_expired_and_rejected_cached_contents():
+    with StubLlmServer() as stub:
+        bot = GeminiBot(f"{stub.url}/v1beta/models", "key", "stub", HttpTransport(max_retries=0),
+                        cache_ttl=CACHE_EXPIRY_MARGIN, cache_min_tokens=10)
+        context = "File: src/util.py\n" + "def util(): pass\n" * 50
+        generate = lambda name: bot.ai_generate_test_coverage(code=f"def {name}(): pass", unit_test="",
+                                                              all_source_files=context,
+                                                              unit_test_file_path=f"tests/test_{name}.py")
+        for name in ('a', 'b', 'c'):
+            generate(name)
+        # Created on the second use, then again on the third as its TTL has (almost) run out
+        assert len(stub.cached_contents) == 2
+
+        bot.cache_ttl = 600
+        generate('d')
+        stub.cached_contents.clear()
+        content = generate('e')
+        assert "class TestGenerated" in content and not stub.cached_contents
+        generate('f')
+        assert len(stub.cached_contents) == 1
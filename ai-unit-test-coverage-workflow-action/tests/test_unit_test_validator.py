@@ -0,0 +1,52 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from unit_test_validator import check_syntax, run_test_file, strip_markdown_fences, without_candidates_in_tree
+
+
+def test_strip_markdown_fences():
+    answer = "Here are the tests:\n```python\nimport unittest\n\nclass T(unittest.TestCase):\n    pass\n```\nDone."
+    assert strip_markdown_fences(answer) == "import unittest\n\nclass T(unittest.TestCase):\n    pass\n"
+    assert strip_markdown_fences("plain = 1\n") == "plain = 1\n"
+
+
+def test_check_syntax_python_and_brace_languages():
+    assert check_syntax('tests/test_calc.py', 'def test_ok():\n    assert True\n') == ""
+    assert 'line 1' in check_syntax('tests/test_calc.py', 'def test_broken(:\n    pass\n')
+
+    assert check_syntax('CalcTest.java', 'class CalcTest { void t() { f("}"); } }') == ""
+    assert check_syntax('CalcTest.kt', 'class CalcTest {\n  fun t() {\n') == "Unclosed '{' opened at line 2"
+
+
+def test_run_test_file_restores_previous_content(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('tests')
+    with open('tests/test_calc.py', 'w') as f:
+        f.write('original')
+
+    error = run_test_file('unknown-tool', 'tests/test_calc.py', 'def test_x(): pass', 10)
+
+    assert error == ""
+    with open('tests/test_calc.py') as f:
+        assert f.read() == 'original'
+
+
+def test_without_candidates_in_tree_waits_for_running_validations(tmp_path, monkeypatch):
+    import threading
+    import time
+    import unit_test_validator
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(unit_test_validator, 'get_test_file_command', lambda build_tool, test_file: 'sleep 0.5')
+    os.makedirs('tests')
+    with open('tests/test_calc.py', 'w') as f:
+        f.write('original')
+
+    validation = threading.Thread(target=run_test_file, args=('pytest', 'tests/test_calc.py', 'candidate', 10))
+    validation.start()
+    while open('tests/test_calc.py').read() != 'candidate':
+        time.sleep(0.01)
+    with without_candidates_in_tree():
+        assert open('tests/test_calc.py').read() == 'original'
+    validation.join()